@@ -1,11 +1,84 @@
 # ai_brain.py
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+import json
 import os
 from groq import Groq
+from llm_resilience import ResilientLLM
 
 load_dotenv()
 
-client = Groq()
+# Retries are handled by ResilientLLM, so turn off the SDK's own retry loop
+client = Groq(max_retries=0)
+llm = ResilientLLM(client, name="brain")
+
+# Recognized commands
+KNOWN_COMMANDS = [
+    "install",
+    "open",
+    "send email",
+    "remember",
+    "recall",
+    "compact memories",
+    "play music",
+]
+
+
+PLAN_SYSTEM_PROMPT = (
+    "You are a helpful AI assistant that turns user prompts into a plan of actions. Your name is 'SANE'\n"
+    'Reply ONLY with JSON like {"actions": [{"verb": "...", "argument": "...", "depends_on": []}]}\n'
+    "Allowed verbs and their arguments:\n"
+    "- install: the app name\n"
+    "- open: the website or search\n"
+    "- send email: 'to <address> saying <message>' (add 'about <subject>' before 'saying' if given)\n"
+    "- remember: the information to store\n"
+    "- recall: what to look up (may be empty)\n"
+    "- compact memories: empty (merges duplicate memories)\n"
+    "- play music: empty\n"
+    "- chat: the user's question, copied exactly\n"
+    "Use one action per separate request, in the order the user gave them.\n"
+    "depends_on lists the indices of earlier actions that must finish first; "
+    "leave it empty unless an action needs another one's result.\n"
+    "If nothing fits, return a single chat action with the original prompt."
+)
+
+
+@dataclass
+class Action:
+    """
+    One step of a plan, e.g. Action("install", "vlc").
+    `depends_on` holds indices of earlier actions in the same plan.
+    """
+
+    verb: str
+    argument: str = ""
+    depends_on: list = field(default_factory=list)
+
+    def to_command(self):
+        """
+        The command string understood by task_router.route_task.
+        """
+        return f"{self.verb} {self.argument}".strip()
+
+
+@dataclass
+class Plan:
+    actions: list
+    prompt: str = ""
+
+    def describe(self):
+        return "; ".join(action.to_command() for action in self.actions)
+
+
+def _local_action(prompt):
+    """
+    Offline fallback used when the LLM is unreachable: keep prompts that already
+    look like a command, treat everything else as chat.
+    """
+    text = prompt.strip()
+    if any(text.lower().startswith(cmd) for cmd in KNOWN_COMMANDS):
+        return text.lower()
+    return f"chat {text}"
 
 
 def prompt_to_action(prompt):
@@ -13,50 +86,117 @@ def prompt_to_action(prompt):
     Summarize a lengthy user instruction into a clear, short command like 'send email', 'install vs code', or 'open web'.
     If no command is detected, default to 'chat <prompt>'.
     """
-    response = client.chat.completions.create(
-        model="llama3-8b-8192",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a helpful AI assistant that translates user prompts into specific actions. Your name is 'SANE'\n"
-                    "You must ONLY answer with one of these formats:\n"
-                    "- install <app>\n"
-                    "- open <app>\n"
-                    "- send email\n"
-                    "- remember <info>\n"
-                    "- recall <info>\n"
-                    "- play music\n"
-                    "If none fit, reply exactly as: chat <original prompt>\n"
-                    "NEVER add anything else."
-                ),
-            },
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.1,
-        stream=False,
-    )
+    try:
+        response = llm.create(
+            model="llama3-8b-8192",
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a helpful AI assistant that translates user prompts into specific actions. Your name is 'SANE'\n"
+                        "You must ONLY answer with one of these formats:\n"
+                        "- install <app>\n"
+                        "- open <app>\n"
+                        "- send email\n"
+                        "- remember <info>\n"
+                        "- recall <info>\n"
+                        "- compact memories\n"
+                        "- play music\n"
+                        "If none fit, reply exactly as: chat <original prompt>\n"
+                        "NEVER add anything else."
+                    ),
+                },
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.1,
+            stream=False,
+        )
+    except Exception as e:
+        print(f"[ERROR] LLM unavailable, using local fallback: {e}")
+        return _local_action(prompt)
+
     action = response.choices[0].message.content.strip().lower()
     # print(f"AI decided: {action}")
 
-    # Recognized commands
-    known_commands = [
-        "install",
-        "open",
-        "send email",
-        "remember",
-        "recall",
-        "play music",
-    ]
-
     # Check if action starts with known command
-    if any(action.startswith(cmd) for cmd in known_commands):
+    if any(action.startswith(cmd) for cmd in KNOWN_COMMANDS):
         return action
     else:
         # Otherwise fallback: treat as chat
         return f"chat {prompt.strip()}"
 
 
+def _action_from_command(command, prompt):
+    """
+    Turn a legacy command string ('install vlc') into an Action.
+    """
+    for verb in KNOWN_COMMANDS:
+        if command.startswith(verb):
+            return Action(verb, command[len(verb) :].strip())
+    return Action("chat", prompt.strip())
+
+
+def _parse_plan(content, prompt):
+    """
+    Validate the model's JSON plan. Unknown verbs become chat, bad
+    dependencies are dropped. Returns None if the JSON is unusable.
+    """
+    try:
+        data = json.loads(content)
+        raw_actions = data["actions"] if isinstance(data, dict) else data
+    except (json.JSONDecodeError, KeyError, TypeError):
+        return None
+    if not isinstance(raw_actions, list) or not raw_actions:
+        return None
+
+    actions = []
+    for raw in raw_actions:
+        if not isinstance(raw, dict):
+            continue
+        verb = str(raw.get("verb", "")).strip().lower()
+        argument = str(raw.get("argument") or "").strip()
+        if verb not in KNOWN_COMMANDS:
+            verb, argument = "chat", argument or prompt.strip()
+        raw_depends_on = raw.get("depends_on")
+        if not isinstance(raw_depends_on, list):
+            raw_depends_on = [raw_depends_on]
+        depends_on = [
+            index
+            for index in raw_depends_on
+            if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < len(actions)
+        ]
+        actions.append(Action(verb, argument, depends_on))
+    return Plan(actions, prompt) if actions else None
+
+
+def prompt_to_plan(prompt):
+    """
+    Turn a user prompt into a Plan of one or more actions with a single LLM call,
+    e.g. "install vlc and open youtube" -> [install vlc, open youtube].
+    """
+    try:
+        response = llm.create(
+            model="llama3-8b-8192",
+            messages=[
+                {"role": "system", "content": PLAN_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.1,
+            response_format={"type": "json_object"},
+            stream=False,
+        )
+    except Exception as e:
+        print(f"[ERROR] LLM unavailable, using local fallback: {e}")
+        return Plan([_action_from_command(_local_action(prompt), prompt)], prompt)
+
+    content = response.choices[0].message.content.strip()
+    plan = _parse_plan(content, prompt)
+    if plan is None:
+        # The model ignored the JSON format; read its answer as a single command
+        plan = Plan([_action_from_command(content.lower(), prompt)], prompt)
+    return plan
+
+
 if __name__ == "__main__":
     # Example usage
     user_input = "What is the capital of india?"
@@ -0,0 +1,130 @@
+# cancellation.py
+"""
+Cooperative cancellation for handlers.
+
+task_router runs each handler under a CancellationToken with a deadline.
+Long-running code checks `cancellation.check()` between steps, or registers
+`on_cancel(callback)` to interrupt something blocking (kill a subprocess,
+close an HTTP stream) the moment the deadline passes.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class Cancelled(Exception):
+    """
+    Raised by check() once the current operation has been cancelled.
+    """
+
+
+class CancellationToken:
+    def __init__(self, timeout=None, clock=time.monotonic):
+        self._clock = clock
+        self.deadline = clock() + timeout if timeout is not None else None
+        self.reason = None
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def remaining(self):
+        """
+        Seconds until the deadline (never negative), or None without a deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self._clock())
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[DEBUG] Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """
+        Run `callback()` when the token is cancelled (right away if it already
+        is). Returns a function that unregisters it.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._unregister(callback)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self):
+        if self.deadline is not None and self._clock() >= self.deadline:
+            self.cancel("deadline exceeded")
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def wait(self, timeout=None):
+        """
+        Block until cancelled or `timeout` passes. Returns True if cancelled.
+        """
+        return self._event.wait(timeout)
+
+
+# Token of the handler running in this context (None = not cancellable)
+_current = ContextVar("cancellation", default=None)
+
+
+def current():
+    return _current.get()
+
+
+def is_cancelled():
+    token = _current.get()
+    return token is not None and token.cancelled
+
+
+def check():
+    """
+    Raise Cancelled if the current handler has been cancelled.
+    """
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def on_cancel(callback):
+    """
+    Run `callback()` if the current handler is cancelled inside this block.
+    """
+    token = _current.get()
+    unregister = token.on_cancel(callback) if token is not None else (lambda: None)
+    try:
+        yield
+    finally:
+        unregister()
+
+
+@contextmanager
+def use(token):
+    """
+    Make `token` the current cancellation token inside the block.
+    """
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
@@ -0,0 +1,237 @@
+# cassette.py
+"""
+Record / replay of LLM calls and package-manager commands.
+
+In record mode every LLM request made through ResilientLLM and every
+install_apps._run_command call is executed for real and written to a
+JSON-lines cassette file. In replay mode the same requests are answered
+from the cassette instead, without network or subprocesses, optionally
+reproducing the original latencies (including the gaps between streamed
+chunks).
+
+Enable for a whole run with environment variables:
+
+    SANE_CASSETTE=run.jsonl SANE_CASSETTE_MODE=record python main.py
+    SANE_CASSETTE=run.jsonl SANE_CASSETTE_MODE=replay SANE_CASSETTE_TIMING=1 python main.py
+
+or in code with `with cassette.use("run.jsonl", "replay"): ...`.
+Only successful calls are recorded; errors propagate as usual. A stream the
+caller stopped reading early (e.g. on a deadline) is recorded as far as it
+got and marked "incomplete"; its replay ends at the same place.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+RECORD = "record"
+REPLAY = "replay"
+
+# Request fields that do not change the answer
+_IGNORED_KEYS = {"timeout"}
+
+
+class CassetteMiss(Exception):
+    """
+    Raised in replay mode when a request was never recorded.
+    """
+
+
+def request_key(kind, payload):
+    """
+    Stable hash of a request, used to match replays to recordings.
+    """
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in _IGNORED_KEYS}
+    blob = json.dumps([kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class Cassette:
+    def __init__(self, path, mode=REPLAY, simulate_timing=False, time_scale=1.0, sleep=time.sleep):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.simulate_timing = simulate_timing
+        self.time_scale = time_scale
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._recordings = defaultdict(list)  # key -> entries in recorded order
+        self._cursor = defaultdict(int)  # key -> next entry to replay
+        if mode == REPLAY:
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)  # record mode always starts a fresh cassette
+
+    @classmethod
+    def from_env(cls):
+        path = os.environ.get("SANE_CASSETTE")
+        if not path:
+            return None
+        return cls(
+            path,
+            mode=os.environ.get("SANE_CASSETTE_MODE", REPLAY),
+            simulate_timing=os.environ.get("SANE_CASSETTE_TIMING", "").lower()
+            in {"1", "true", "yes", "on"},
+        )
+
+    # --- LLM calls ---
+
+    def llm_call(self, request, call):
+        """
+        Serve or record one chat completion. `call()` performs the real request.
+        """
+        key = request_key("llm", request)
+        if self.mode == REPLAY:
+            return self._replay_llm(self._next(key, request))
+
+        start = time.perf_counter()
+        response = call()
+        if request.get("stream"):
+            return self._record_stream(key, request, response, start)
+        self._write(
+            {
+                "kind": "llm",
+                "key": key,
+                "request": _jsonable(request),
+                "content": response.choices[0].message.content,
+                "latency": time.perf_counter() - start,
+            }
+        )
+        return response
+
+    def _record_stream(self, key, request, stream, start):
+        chunks = []
+        first_byte = time.perf_counter() - start
+
+        def write(**extra):
+            self._write(
+                {
+                    "kind": "llm",
+                    "key": key,
+                    "request": _jsonable(request),
+                    "latency": first_byte,
+                    "chunks": chunks,
+                    **extra,
+                }
+            )
+
+        try:
+            for chunk in stream:
+                chunks.append(
+                    {
+                        "t": time.perf_counter() - start,
+                        "content": chunk.choices[0].delta.content,
+                    }
+                )
+                yield chunk
+        except GeneratorExit:
+            # Closed before the end; a replay of the run must still find it
+            write(incomplete=True)
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+        write()
+
+    def _replay_llm(self, entry):
+        self._wait(entry.get("latency", 0))
+        if "chunks" not in entry:
+            message = SimpleNamespace(content=entry["content"])
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self._replay_stream(entry)
+
+    def _replay_stream(self, entry):
+        previous = entry.get("latency", 0)
+        for chunk in entry["chunks"]:
+            self._wait(chunk["t"] - previous)
+            previous = chunk["t"]
+            delta = SimpleNamespace(content=chunk["content"])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    # --- Subprocess calls ---
+
+    def command(self, command, run):
+        """
+        Serve or record one command result. `run()` executes it for real.
+        """
+        key = request_key("command", list(command))
+        if self.mode == REPLAY:
+            entry = self._next(key, command)
+            self._wait(entry.get("duration", 0))
+            return dict(entry["result"])
+
+        start = time.perf_counter()
+        result = run()
+        self._write(
+            {
+                "kind": "command",
+                "key": key,
+                "command": list(command),
+                "result": result,
+                "duration": time.perf_counter() - start,
+            }
+        )
+        return result
+
+    # --- Storage ---
+
+    def _next(self, key, request):
+        with self._lock:
+            entries = self._recordings.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recording in {self.path} for request: {request!r}")
+            index = self._cursor[key]
+            # Replay identical requests in recorded order, then keep repeating the last
+            self._cursor[key] = min(index + 1, len(entries) - 1)
+            return entries[index]
+
+    def _write(self, entry):
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            self._recordings[entry["key"]].append(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]].append(entry)
+
+    def _wait(self, seconds):
+        if self.simulate_timing and seconds > 0:
+            self._sleep(seconds * self.time_scale)
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+# The cassette in effect for this process (None = normal operation)
+_active = Cassette.from_env()
+
+
+def current():
+    return _active
+
+
+@contextmanager
+def use(path, mode=REPLAY, **kwargs):
+    """
+    Record or replay all LLM and command calls made inside the block.
+    """
+    global _active
+    previous = _active
+    _active = Cassette(path, mode, **kwargs)
+    try:
+        yield _active
+    finally:
+        _active = previous
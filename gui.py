@@ -1,18 +1,134 @@
+import os
+import threading
 import customtkinter as ctk
-from ai_brain import prompt_to_action
-from task_router import route_task
+import interaction
+import warmup
+from ai_brain import prompt_to_plan
+from task_router import execute_plan
+from transcript import PAGE_SIZE, Transcript, UpdateBuffer, format_message
+
+# Chat conversation to resume; another front-end using the same ID shares it
+SESSION_ID = os.environ.get("SANE_SESSION", "default")
+# Widget updates are applied at most once per frame (~60 fps)
+FRAME_MS = 16
+
+
+class TranscriptView:
+    """
+    Keeps the text widget in sync with a Transcript: appends new messages,
+    removes the ones that leave the scrollback and pages older ones back in.
+    """
+
+    def __init__(self, textbox, transcript):
+        self.textbox = textbox
+        self.transcript = transcript
+        self._streamed = None  # text shown so far for the answer in progress
+
+    def add_message(self, role, text):
+        message = self.transcript.append(role, text)
+        self.textbox.insert(ctk.END, format_message(message))
+        self._trim()
+
+    def begin_answer(self):
+        self.transcript.append("assistant")
+        self.textbox.insert(ctk.END, "Jarvis: ")
+        self._streamed = ""
+
+    def add_chunk(self, text):
+        self.transcript.extend_last(text)
+        self.textbox.insert(ctk.END, text)
+        self._streamed += text
+
+    def finish_answer(self, result):
+        if result != self._streamed:
+            # Plans with several actions answer with more than the streamed chat
+            lines = self._streamed.count("\n")
+            self.textbox.delete(f"end-1c linestart -{lines} lines", ctk.END)
+            self.transcript.replace_last(result)
+            self.textbox.insert(ctk.END, format_message(self.transcript.messages[-1]))
+        else:
+            self.textbox.insert(ctk.END, "\n\n")
+        self._streamed = None
+        self._trim()
+
+    def apply(self, events):
+        at_bottom = self.textbox.yview()[1] >= 1.0
+        for kind, payload in events:
+            if kind == "chunk":
+                self.add_chunk(payload)
+            elif kind == "done":
+                self.finish_answer(str(payload))
+        if at_bottom:
+            self.textbox.see(ctk.END)
+
+    def load_older(self):
+        """
+        Page older messages in from the archive, keeping the view where it was.
+        """
+        older = self.transcript.load_older(PAGE_SIZE)
+        if not older:
+            return
+        text = "".join(format_message(message) for message in older)
+        self.textbox.insert("1.0", text)
+        lines = text.count("\n")
+        self.textbox.see(f"{lines + 1}.0")
+
+    def _trim(self):
+        if self._streamed is not None:
+            return  # never cut the widget while an answer is streaming
+        dropped = self.transcript.trim()
+        if dropped:
+            lines = sum(format_message(message).count("\n") for message in dropped)
+            self.textbox.delete("1.0", f"{lines + 1}.0")
 
 
 def ask_ai():
+    global worker
     user_input = entry.get()
-    if not user_input.strip():
+    if not user_input.strip() or (worker and worker.is_alive()):
         return
-    text_area.insert(ctk.END, f"You: {user_input}\n")
-    action = prompt_to_action(user_input)
-    response = route_task(action)
-    text_area.insert(ctk.END, f"Jarvis: {response}\n\n")
+    view.add_message("user", user_input)
+    view.begin_answer()
+    text_area.see(ctk.END)
     entry.delete(0, ctk.END)
 
+    # The model is called off the UI thread so the window stays responsive
+    worker = threading.Thread(target=answer, args=(user_input,), daemon=True)
+    worker.start()
+    root.after(FRAME_MS, pump)
+
+
+def answer(user_input):
+    try:
+        with interaction.use_emitter(updates.chunk):
+            plan = prompt_to_plan(user_input)
+            response = execute_plan(plan, session_id=SESSION_ID)
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        response = "Sorry, something went wrong."
+    updates.put("done", response)
+
+
+def pump():
+    """
+    Apply everything the worker produced since the last frame in one go.
+    """
+    events = updates.drain()
+    if events:
+        view.apply(events)
+    if not any(kind == "done" for kind, _ in events):
+        root.after(FRAME_MS, pump)
+
+
+def on_scroll(event=None):
+    # Let the scroll happen first, then page in history if we reached the top
+    root.after_idle(load_history_at_top)
+
+
+def load_history_at_top():
+    if text_area.yview()[0] <= 0.0 and view.transcript.has_older:
+        view.load_older()
+
 
 ctk.set_appearance_mode("System")  # Light, Dark, or System
 ctk.set_default_color_theme("blue")  # Can be blue, green, dark-blue etc.
@@ -33,5 +149,12 @@ button.pack(side=ctk.LEFT)
 
 text_area = ctk.CTkTextbox(root, wrap="word", width=680, height=400)
 text_area.pack(padx=10, pady=(0, 10), fill=ctk.BOTH, expand=True)
+for sequence in ("<MouseWheel>", "<Button-4>", "<Prior>"):
+    text_area.bind(sequence, on_scroll, add="+")
+
+worker = None
+updates = UpdateBuffer()
+view = TranscriptView(text_area, Transcript.from_env())
 
+warmup.start()
 root.mainloop()
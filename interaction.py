@@ -0,0 +1,58 @@
+# interaction.py
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Front-ends (console, GUI, server) plug in how questions are asked and how
+# partial output is shown. Handlers only call confirm() and emit().
+_confirmer = ContextVar("confirmer", default=None)
+_emitter = ContextVar("emitter", default=None)
+
+# Console prompts from concurrent handlers must not interleave
+_console_lock = threading.Lock()
+
+
+def confirm(question):
+    """
+    Ask the user a yes/no question and return True for yes.
+    Falls back to input() when no front-end confirmer is installed.
+    """
+    handler = _confirmer.get()
+    if handler is not None:
+        return bool(handler(question))
+    with _console_lock:
+        answer = input(f"{question} (yes/no): ")
+    return answer.strip().lower() in ["yes", "y"]
+
+
+def emit(text):
+    """
+    Send a piece of partial output (e.g. a streamed LLM chunk) to the front-end.
+    """
+    handler = _emitter.get()
+    if handler is not None:
+        handler(text)
+
+
+@contextmanager
+def use_confirmer(handler):
+    """
+    Route confirm() calls made in this context to `handler(question) -> bool`.
+    """
+    token = _confirmer.set(handler)
+    try:
+        yield
+    finally:
+        _confirmer.reset(token)
+
+
+@contextmanager
+def use_emitter(handler):
+    """
+    Route emit() calls made in this context to `handler(text)`.
+    """
+    token = _emitter.set(handler)
+    try:
+        yield
+    finally:
+        _emitter.reset(token)
@@ -0,0 +1,334 @@
+# llm_resilience.py
+import random
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import groq
+
+import cancellation
+import cassette
+import metrics
+import singleflight
+
+# Defaults for every LLM call made through ResilientLLM
+DEFAULT_TIMEOUT = 20.0  # seconds per attempt
+MAX_ATTEMPTS = 3
+BASE_DELAY = 0.5  # first backoff step, doubled per attempt
+MAX_DELAY = 8.0  # cap for the exponential backoff
+MAX_RETRY_AFTER = 30.0  # give up instead of blocking longer than this on a rate limit
+
+# HTTP statuses that indicate a temporary provider problem
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Shared pool for hedged (duplicate) requests
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+# Identical requests in flight at the same time, shared by every ResilientLLM
+_flights = singleflight.Group()
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when the circuit breaker is open and the call is rejected without trying.
+    """
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open circuit breaker.
+
+    After `failure_threshold` consecutive transient failures the circuit opens and
+    calls fail fast. Once `reset_timeout` seconds have passed a single trial call
+    is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if (
+            self._state == self.OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self):
+        """
+        Return True if a call may proceed right now.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release_trial(self):
+        """
+        Give back a half-open trial slot whose call never reached the provider.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+
+def is_transient(exc):
+    """
+    Decide whether an exception is worth retrying (network, timeout, 429, 5xx).
+    """
+    if isinstance(
+        exc,
+        (
+            groq.APIConnectionError,  # includes APITimeoutError
+            groq.RateLimitError,
+            groq.InternalServerError,
+            TimeoutError,
+            ConnectionError,
+        ),
+    ):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+def _parse_duration(value):
+    """
+    Parse durations like '7.66s', '250ms' or '2m59.56s' into seconds.
+    """
+    parts = _DURATION_RE.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after(exc):
+    """
+    Return how long the provider asked us to wait (in seconds), or None.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+
+    # Groq reports per-bucket reset times on rate limit responses
+    if getattr(exc, "status_code", None) == 429:
+        resets = [
+            _parse_duration(headers.get(name))
+            for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        ]
+        resets = [reset for reset in resets if reset is not None]
+        if resets:
+            return max(resets)
+    return None
+
+
+def backoff_delay(attempt, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    """
+    Exponential backoff with full jitter for the given (0-based) retry attempt.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2**attempt)))
+
+
+class ResilientLLM:
+    """
+    Wraps a Groq client with per-call timeouts, retries with jittered backoff,
+    optional hedged requests and a circuit breaker.
+
+    Use `create(**kwargs)` exactly like `client.chat.completions.create`.
+    Identical requests made at the same time share one call (see singleflight).
+    """
+
+    def __init__(
+        self,
+        client,
+        name="llm",
+        timeout=DEFAULT_TIMEOUT,
+        max_attempts=MAX_ATTEMPTS,
+        base_delay=BASE_DELAY,
+        max_delay=MAX_DELAY,
+        max_retry_after=MAX_RETRY_AFTER,
+        hedge=False,
+        hedge_quantile=0.95,
+        hedge_min_samples=20,
+        breaker=None,
+        coalesce=True,
+        sleep=time.sleep,
+    ):
+        self.client = client
+        self.name = name
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.coalesce = coalesce
+        self._sleep = sleep
+
+    def create(self, **kwargs):
+        """
+        Call the chat completions API. Raises CircuitOpenError when failing fast,
+        otherwise the last error once all attempts are used up.
+
+        If the same request (model, messages and parameters) is already in
+        flight, wait for it instead of sending another; streamed responses are
+        replayed to every caller. Not done while a cassette is active, so each
+        call still ends up on the tape; hedging is off then too.
+        """
+        if not self.coalesce or cassette.current() is not None:
+            return self._create(**kwargs)
+
+        key = (id(self.client), singleflight.request_key(kwargs))
+        response, shared = _flights.do(
+            key, lambda: self._create(**kwargs), stream=bool(kwargs.get("stream"))
+        )
+        if shared:
+            metrics.incr(f"{self.name}.coalesced")
+        return response
+
+    def _create(self, **kwargs):
+        # Before taking a (possibly half-open trial) slot from the breaker
+        cancellation.check()
+        if not self.breaker.allow():
+            metrics.incr(f"{self.name}.short_circuited")
+            raise CircuitOpenError(
+                f"{self.name}: provider unavailable, circuit breaker is open."
+            )
+
+        kwargs.setdefault("timeout", self.timeout)
+        # A backup request would use up (or record) a second cassette entry
+        use_hedge = self.hedge and not kwargs.get("stream") and cassette.current() is None
+
+        for attempt in range(self.max_attempts):
+            # Don't start (or retry) a call the caller has given up on; the
+            # trial slot taken for it must not stay taken
+            try:
+                cancellation.check()
+            except cancellation.Cancelled:
+                self.breaker.release_trial()
+                raise
+            metrics.incr(f"{self.name}.calls")
+            start = time.perf_counter()
+            try:
+                if use_hedge:
+                    response = self._call_hedged(kwargs)
+                else:
+                    response = self._call(kwargs)
+            except Exception as exc:
+                if not is_transient(exc):
+                    # The provider answered (e.g. a bad request), so it is healthy
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                metrics.incr(f"{self.name}.failures")
+                print(f"[LOG] {self.name} attempt {attempt + 1} failed: {exc}")
+
+                if attempt == self.max_attempts - 1 or not self.breaker.allow():
+                    raise
+                delay = retry_after(exc)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                elif delay > self.max_retry_after:
+                    raise
+                metrics.incr(f"{self.name}.retries")
+                self._sleep(delay)
+            else:
+                self.breaker.record_success()
+                metrics.observe(f"{self.name}.latency", time.perf_counter() - start)
+                return response
+
+    def _call(self, kwargs):
+        tape = cassette.current()
+        if tape is not None:
+            return tape.llm_call(
+                kwargs, lambda: self.client.chat.completions.create(**kwargs)
+            )
+        return self.client.chat.completions.create(**kwargs)
+
+    def _hedge_delay(self):
+        """
+        Delay before sending a backup request: the recent p95 latency, once we
+        have enough samples to trust it.
+        """
+        if metrics.registry.samples(f"{self.name}.latency") < self.hedge_min_samples:
+            return None
+        return metrics.percentile(f"{self.name}.latency", self.hedge_quantile)
+
+    def _call_hedged(self, kwargs):
+        """
+        Send the request, and if it is slower than usual send a second copy;
+        return whichever succeeds first.
+        """
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._call(kwargs)
+
+        primary = _hedge_executor.submit(self._call, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        metrics.incr(f"{self.name}.hedged")
+        backup = _hedge_executor.submit(self._call, kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        metrics.incr(f"{self.name}.hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
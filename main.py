@@ -1,12 +1,15 @@
+import sys
 from voice_input import listen
 from speak import speak
-from ai_brain import prompt_to_action
-from task_router import route_task
+from ai_brain import prompt_to_plan
+from task_router import execute_plan
+import warmup
 # from dotenv import load_dotenv
 # import os
 
 
 def main():
+    warmup.start()
     speak("Hello! I am your assistant. How can I help you today?")
 
     while True:
@@ -19,8 +22,8 @@ def main():
             speak("Goodbye!")
             break
         try:
-            # Ask AI what action to take (like 'install chrome')
-            action = prompt_to_action(prompt)
+            # Ask AI which actions to take (like 'install chrome' and 'open youtube')
+            plan = prompt_to_plan(prompt)
             # print(f"AI decided: {action}")
 
             # # Route the action to the right module (install, open website, etc.)
@@ -29,7 +32,7 @@ def main():
             # speak(result)
 
             # ...existing code...
-            result = route_task(action)
+            result = execute_plan(plan)
             print(f"[DEBUG] result: {result}")
             speak(str(result))
         except Exception as e:
@@ -37,6 +40,20 @@ def main():
             speak("Sorry, something went wrong.")
 
 
+def main_voice():
+    """
+    Hands-free mode: listening, thinking and speaking run concurrently,
+    and talking over the assistant interrupts it.
+    """
+    from voice_pipeline import VoicePipeline
+
+    warmup.start()
+    VoicePipeline().run()
+
+
 if __name__ == "__main__":
-    # main()
-    from gui import *
+    if "--voice" in sys.argv:
+        main_voice()
+    else:
+        # main()
+        from gui import *
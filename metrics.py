@@ -0,0 +1,109 @@
+# metrics.py
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Number of recent latency samples kept per metric (for percentiles)
+WINDOW_SIZE = 200
+
+
+class Metrics:
+    """
+    Thread-safe in-process counters, gauges and rolling latency windows.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._window_size = window_size
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._latencies = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def count(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, seconds):
+        """
+        Record one latency sample (in seconds) for the given metric.
+        """
+        with self._lock:
+            window = self._latencies.get(name)
+            if window is None:
+                window = self._latencies[name] = deque(maxlen=self._window_size)
+            window.append(seconds)
+
+    def percentile(self, name, q):
+        """
+        Return the q-th percentile (0.0 - 1.0) of recent samples, or None if empty.
+        """
+        with self._lock:
+            samples = sorted(self._latencies.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[index]
+
+    def samples(self, name):
+        with self._lock:
+            return len(self._latencies.get(name, ()))
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Context manager that observes the wall time of its body under `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Return a JSON-serializable view of all metrics.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            latencies = {name: sorted(window) for name, window in self._latencies.items()}
+
+        latency = {}
+        for name, samples in latencies.items():
+            if not samples:
+                continue
+            latency[name] = {
+                "count": len(samples),
+                "p50": samples[int(round(0.5 * (len(samples) - 1)))],
+                "p95": samples[int(round(0.95 * (len(samples) - 1)))],
+                "max": samples[-1],
+            }
+        return {"counters": counters, "gauges": gauges, "latency": latency}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._latencies.clear()
+
+
+# ✅ Process-wide registry used by the assistant modules
+registry = Metrics()
+
+incr = registry.incr
+count = registry.count
+set_gauge = registry.set_gauge
+observe = registry.observe
+percentile = registry.percentile
+timed = registry.timed
+snapshot = registry.snapshot
+reset = registry.reset
@@ -0,0 +1,69 @@
+import re
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from modules.fuzzy_index import NgramIndex
+
+# Fuzzy score needed to suggest an app
+SUGGEST_SCORE = 0.55
+# Trigram score needed to be considered at all (before re-scoring)
+CANDIDATE_SCORE = 0.2
+
+# `name` is the canonical whitelist name (None unless the input is an exact
+# name or alias), `confidence` is 0.0 - 1.0 and `suggestions` lists close
+# matches, best first. A fuzzy match is only ever a suggestion: "tor browser"
+# is not "brave browser", and installing the wrong app can't be undone.
+Resolution = namedtuple("Resolution", ["name", "confidence", "suggestions"])
+
+
+def compact(text):
+    """
+    Lowercase and drop everything but letters and digits ("VS-Code" -> "vscode").
+    """
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+class AppIndex:
+    """
+    Resolves user spellings of app names to canonical whitelist names.
+
+    Built once from the whitelist and an alias table: exact names and aliases
+    are looked up in a dict, everything else goes through a character
+    trigram index and comes back as suggestions.
+    """
+
+    def __init__(self, names, aliases=None):
+        self._canonical = {}  # compact spelling -> canonical name
+        for name in names:
+            self._canonical[compact(name)] = name
+        for alias, name in (aliases or {}).items():
+            if name not in names:
+                raise ValueError(f"Alias '{alias}' points to unknown app '{name}'")
+            self._canonical.setdefault(compact(alias), name)
+        self._ngrams = NgramIndex(self._canonical)
+
+    def resolve(self, text):
+        key = compact(text)
+        if not key:
+            return Resolution(None, 0.0, [])
+
+        name = self._canonical.get(key)
+        if name is not None:
+            return Resolution(name, 1.0, [])
+
+        # Trigrams find candidates cheaply; an edit-based ratio then rescues
+        # transpositions and short names ("pyhton", "crome") trigrams score low.
+        # Keep the best score per canonical name, since aliases share one.
+        scores = {}
+        candidates = self._ngrams.search(key, limit=10, min_score=CANDIDATE_SCORE)
+        for spelling, score in candidates:
+            score = max(score, SequenceMatcher(None, key, spelling).ratio())
+            name = self._canonical[spelling]
+            scores[name] = max(score, scores.get(name, 0.0))
+        ranked = sorted(
+            ((name, score) for name, score in scores.items() if score >= SUGGEST_SCORE),
+            key=lambda item: (-item[1], item[0]),
+        )
+        if not ranked:
+            return Resolution(None, 0.0, [])
+        return Resolution(None, ranked[0][1], [name for name, _ in ranked[:3]])
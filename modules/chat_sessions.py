@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# ✅ One append-only JSON-lines file per session in user's home directory
+SESSIONS_DIR = str(Path.home() / ".sane_sessions")
+
+DEFAULT_IDLE_TIMEOUT = 30 * 60  # seconds before an unused session leaves memory
+DEFAULT_MAX_LOADED = 64
+# Messages kept in memory (and sent to the model) per session; the file keeps all
+DEFAULT_MAX_MESSAGES = 40
+
+# Session IDs become file names, so keep them to a safe character set
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class ChatSession:
+    """
+    One conversation. Messages live in memory while the session is loaded and
+    every new message is appended to the session's file as a single line.
+    """
+
+    def __init__(self, session_id, path, max_messages=DEFAULT_MAX_MESSAGES):
+        self.session_id = session_id
+        self.path = path
+        self.max_messages = max_messages
+        self.messages = []
+        self.lock = threading.RLock()
+        self.last_access = 0.0
+        self._offset = 0  # bytes of the file already read into `messages`
+
+    def history(self, system_prompt=None):
+        """
+        Return a copy of the conversation, optionally prefixed by a system prompt.
+        """
+        with self.lock:
+            self._sync()
+            messages = list(self.messages)
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return messages
+
+    def append(self, role, content):
+        self.extend([{"role": role, "content": content}])
+
+    def append_turn(self, user_content, assistant_content):
+        """
+        Record a user message and the assistant's answer together.
+        """
+        self.extend(
+            [
+                {"role": "user", "content": user_content},
+                {"role": "assistant", "content": assistant_content},
+            ]
+        )
+
+    def extend(self, messages):
+        lines = "".join(
+            json.dumps({**message, "ts": round(time.time(), 3)}, separators=(",", ":"))
+            + "\n"
+            for message in messages
+        )
+        with self.lock:
+            # Pick up turns another process appended since we last looked
+            self._sync()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                self._offset = f.tell()
+            self.messages.extend(messages)
+            self._trim()
+
+    def _sync(self):
+        """
+        Read any lines appended to the file after `_offset`.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # partially written line, read it next time
+                self._offset += len(line.encode("utf-8"))
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[DEBUG] Skipping corrupt line in {self.path}")
+                    continue
+                self.messages.append(
+                    {"role": record["role"], "content": record["content"]}
+                )
+        self._trim()
+
+    def _trim(self):
+        if self.max_messages and len(self.messages) > self.max_messages:
+            del self.messages[: -self.max_messages]
+
+
+class SessionStore:
+    """
+    Thread-safe collection of chat sessions keyed by session ID.
+
+    Sessions are loaded from disk only when first accessed and dropped from
+    memory again after `idle_timeout` seconds without use (or when more than
+    `max_loaded` are resident); their files stay on disk.
+    """
+
+    def __init__(
+        self,
+        directory=SESSIONS_DIR,
+        idle_timeout=DEFAULT_IDLE_TIMEOUT,
+        max_loaded=DEFAULT_MAX_LOADED,
+        max_messages=DEFAULT_MAX_MESSAGES,
+        clock=time.monotonic,
+    ):
+        self.directory = directory
+        self.idle_timeout = idle_timeout
+        self.max_loaded = max_loaded
+        self.max_messages = max_messages
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # LRU order, most recent last
+
+    def get(self, session_id):
+        """
+        Return the session, loading it from disk on first access.
+        """
+        if not SESSION_ID_PATTERN.match(session_id or ""):
+            raise ValueError(f"Invalid session ID: {session_id!r}")
+
+        with self._lock:
+            now = self._clock()
+            session = self._sessions.get(session_id)
+            if session is None:
+                os.makedirs(self.directory, exist_ok=True)
+                session = ChatSession(
+                    session_id, self._path(session_id), self.max_messages
+                )
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.last_access = now
+            self._evict(now)
+        return session
+
+    def exists(self, session_id):
+        return os.path.exists(self._path(session_id))
+
+    def list_sessions(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name[: -len(".jsonl")]
+            for name in os.listdir(self.directory)
+            if name.endswith(".jsonl")
+        )
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            try:
+                os.remove(self._path(session_id))
+            except FileNotFoundError:
+                pass
+
+    def loaded_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def evict_idle(self):
+        """
+        Drop idle sessions from memory. Returns how many were evicted.
+        """
+        with self._lock:
+            return self._evict(self._clock())
+
+    def _evict(self, now):
+        evicted = 0
+        for session_id, session in list(self._sessions.items()):
+            too_many = len(self._sessions) > self.max_loaded
+            if not too_many and now - session.last_access < self.idle_timeout:
+                break  # LRU order: everything after this is more recent
+            del self._sessions[session_id]
+            evicted += 1
+        return evicted
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.jsonl")
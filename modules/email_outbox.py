@@ -0,0 +1,332 @@
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from collections import namedtuple
+from email.message import EmailMessage
+from pathlib import Path
+
+import metrics
+from llm_resilience import backoff_delay
+
+# ✅ Queued emails in user's home directory, one JSON file per message
+OUTBOX_DIR = str(Path.home() / ".sane_outbox")
+
+BATCH_SIZE = 20  # messages sent per pass over one connection
+MAX_ATTEMPTS = 5
+BASE_DELAY = 2.0  # first retry delay in seconds, doubled per attempt
+MAX_DELAY = 300.0
+IDLE_TIMEOUT = 60.0  # close the SMTP connection after this long without mail
+
+SmtpConfig = namedtuple(
+    "SmtpConfig", ["host", "port", "user", "password", "sender", "starttls", "timeout"]
+)
+
+
+def config_from_env():
+    """
+    SMTP settings from SMTP_HOST / _PORT / _USER / _PASSWORD / _FROM / _STARTTLS,
+    or None when no host is configured.
+    """
+    host = os.environ.get("SMTP_HOST")
+    if not host:
+        return None
+    port = int(os.environ.get("SMTP_PORT", 587))
+    user = os.environ.get("SMTP_USER") or None
+    starttls = os.environ.get("SMTP_STARTTLS", "1" if port == 587 else "0")
+    return SmtpConfig(
+        host=host,
+        port=port,
+        user=user,
+        password=os.environ.get("SMTP_PASSWORD") or None,
+        sender=os.environ.get("SMTP_FROM") or user,
+        starttls=starttls.lower() in {"1", "true", "yes", "on"},
+        timeout=float(os.environ.get("SMTP_TIMEOUT", 30)),
+    )
+
+
+def is_transient(exc):
+    """
+    4xx replies and dropped connections are worth retrying; 5xx are not.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class SmtpConnection:
+    """
+    One SMTP connection kept open between messages and reopened when it drops.
+    """
+
+    def __init__(self, config, factory=None):
+        self.config = config
+        self._factory = factory or (smtplib.SMTP_SSL if config.port == 465 else smtplib.SMTP)
+        self._smtp = None
+        self.connects = 0
+
+    @property
+    def is_open(self):
+        return self._smtp is not None
+
+    def send(self, message):
+        """
+        Send one EmailMessage, reconnecting once if the server hung up on us.
+        """
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._connection().send_message(message)
+
+    def _connection(self):
+        if self._smtp is None:
+            smtp = self._factory(self.config.host, self.config.port, timeout=self.config.timeout)
+            try:
+                smtp.ehlo()
+                if self.config.starttls:
+                    smtp.starttls()
+                    smtp.ehlo()
+                if self.config.user:
+                    smtp.login(self.config.user, self.config.password or "")
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self.connects += 1
+        return self._smtp
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+
+class Outbox:
+    """
+    Persistent email queue drained by a background worker.
+
+    `enqueue` only writes the message to disk and returns. The worker sends
+    queued messages in batches over one reused SMTP connection, retries
+    temporary failures with backoff and moves permanent failures to
+    `<directory>/failed`. Messages left on disk are sent after a restart.
+    """
+
+    def __init__(
+        self,
+        connection,
+        directory=OUTBOX_DIR,
+        batch_size=BATCH_SIZE,
+        max_attempts=MAX_ATTEMPTS,
+        base_delay=BASE_DELAY,
+        max_delay=MAX_DELAY,
+        idle_timeout=IDLE_TIMEOUT,
+        clock=time.time,
+    ):
+        self.connection = connection
+        self.directory = directory
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue = {}  # id -> entry, in enqueue order
+        self._sending = 0
+        self._stopped = False
+        self._worker = None
+        self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queue) + self._sending
+
+    # --- Producer side ---
+
+    def enqueue(self, to, subject, body):
+        """
+        Queue a message and return its ID immediately.
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "to": to,
+            "subject": subject,
+            "body": body,
+            "created": self._clock(),
+            "attempts": 0,
+            "next_attempt": 0.0,
+        }
+        self._write(entry)
+        with self._lock:
+            self._queue[entry["id"]] = entry
+            self._update_depth()
+            self._wakeup.notify()
+        return entry["id"]
+
+    # --- Worker ---
+
+    def start(self):
+        with self._lock:
+            if self._worker is None:
+                self._stopped = False
+                self._worker = threading.Thread(
+                    target=self._run, name="email-outbox", daemon=True
+                )
+                self._worker.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        with self._lock:
+            self._stopped = True
+            self._wakeup.notify()
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.join(timeout)
+
+    def flush(self, timeout=10.0):
+        """
+        Wait until nothing is queued or being sent. Returns True if drained.
+        """
+        deadline = time.monotonic() + timeout
+        while len(self):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        idle_since = time.monotonic()
+        while True:
+            with self._lock:
+                batch = self._next_batch()
+                while not batch and not self._stopped:
+                    wait = self._seconds_until_due()
+                    if self.connection.is_open:
+                        idle_left = self.idle_timeout - (time.monotonic() - idle_since)
+                        if idle_left <= 0:
+                            break
+                        wait = idle_left if wait is None else min(wait, idle_left)
+                    self._wakeup.wait(wait)
+                    batch = self._next_batch()
+                if self._stopped:
+                    for entry in batch:
+                        self._queue[entry["id"]] = entry
+                    break
+                self._sending = len(batch)
+
+            if not batch:
+                self.connection.close()  # idle for too long
+                continue
+            for entry in batch:
+                self._deliver(entry)
+                with self._lock:
+                    self._sending -= 1
+                    self._update_depth()
+            idle_since = time.monotonic()
+        self.connection.close()
+
+    def _next_batch(self):
+        now = self._clock()
+        batch = [
+            entry for entry in self._queue.values() if entry["next_attempt"] <= now
+        ][: self.batch_size]
+        for entry in batch:
+            del self._queue[entry["id"]]
+        return batch
+
+    def _seconds_until_due(self):
+        if not self._queue:
+            return None
+        due = min(entry["next_attempt"] for entry in self._queue.values())
+        return max(0.0, due - self._clock())
+
+    def _deliver(self, entry):
+        start = time.perf_counter()
+        try:
+            self.connection.send(self._message(entry))
+        except Exception as e:
+            if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                self.connection.close()  # the connection may be broken, start fresh
+            entry["attempts"] += 1
+            if is_transient(e) and entry["attempts"] < self.max_attempts:
+                delay = backoff_delay(entry["attempts"] - 1, self.base_delay, self.max_delay)
+                entry["next_attempt"] = self._clock() + delay
+                entry["error"] = str(e)
+                self._write(entry)
+                metrics.incr("email.retries")
+                print(f"[LOG] Email to {entry['to']} failed ({e}); retrying in {delay:.1f}s.")
+                with self._lock:
+                    self._queue[entry["id"]] = entry
+                return
+            entry["error"] = str(e)
+            self._move_to_failed(entry)
+            metrics.incr("email.failed")
+            print(f"[ERROR] Giving up on email to {entry['to']}: {e}")
+            return
+
+        self._remove(entry)
+        metrics.incr("email.sent")
+        metrics.observe("email.send", time.perf_counter() - start)
+        metrics.observe("email.delivery", self._clock() - entry["created"])
+
+    def _message(self, entry):
+        message = EmailMessage()
+        message["From"] = self.connection.config.sender or "sane@localhost"
+        message["To"] = entry["to"]
+        message["Subject"] = entry["subject"]
+        message.set_content(entry["body"])
+        return message
+
+    def _update_depth(self):
+        metrics.set_gauge("email.queue_depth", len(self._queue) + self._sending)
+
+    # --- Persistence ---
+
+    def _path(self, entry_id, folder=""):
+        return os.path.join(self.directory, folder, f"{entry_id}.json")
+
+    def _write(self, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(entry["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _remove(self, entry):
+        try:
+            os.remove(self._path(entry["id"]))
+        except FileNotFoundError:
+            pass
+
+    def _move_to_failed(self, entry):
+        os.makedirs(os.path.join(self.directory, "failed"), exist_ok=True)
+        self._write(entry)
+        os.replace(self._path(entry["id"]), self._path(entry["id"], "failed"))
+
+    def _load(self):
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    entries.append(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"[DEBUG] Skipping unreadable outbox file {name}: {e}")
+        for entry in sorted(entries, key=lambda entry: entry["created"]):
+            entry["next_attempt"] = 0.0  # retry right away after a restart
+            self._queue[entry["id"]] = entry
+        self._update_depth()
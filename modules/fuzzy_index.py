@@ -0,0 +1,67 @@
+from collections import Counter, defaultdict
+
+
+def ngrams(text, n=3):
+    """
+    Character n-grams of `text`, padded so short words still produce some.
+    """
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """
+    Inverted index from character n-grams to keys, for fast fuzzy lookup.
+
+    Scores are the Dice coefficient of the n-gram sets (1.0 = same n-grams).
+    """
+
+    def __init__(self, keys=(), n=3):
+        self.n = n
+        self._postings = defaultdict(set)
+        self._sizes = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, key):
+        return key in self._sizes
+
+    def add(self, key):
+        if key in self._sizes:
+            return
+        grams = ngrams(key, self.n)
+        self._sizes[key] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def remove(self, key):
+        if self._sizes.pop(key, None) is None:
+            return
+        for gram in ngrams(key, self.n):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def search(self, text, limit=5, min_score=0.0):
+        """
+        Return up to `limit` (key, score) pairs, best first.
+        """
+        grams = ngrams(text, self.n)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        results = []
+        for key, overlap in shared.items():
+            score = 2.0 * overlap / (len(grams) + self._sizes[key])
+            if score >= min_score:
+                results.append((key, score))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
@@ -2,19 +2,27 @@ import subprocess
 import platform
 import os
 import shutil
+import signal
 import json
+import threading
 from pathlib import Path
 import re
 from dotenv import load_dotenv
 from groq import Groq
+from llm_resilience import ResilientLLM
+import cancellation
+import cassette
+import interaction
+from modules.app_index import AppIndex
 
 # Load environment variables and initialize the LLM client
 load_dotenv()
 try:
-    client = Groq()
+    client = Groq(max_retries=0)  # retries are handled by ResilientLLM
 except Exception as e:
     print(f"[ERROR] Failed to initialize Groq client: {e}")
     client = None
+llm = ResilientLLM(client, name="install_resolver")
 
 # ✅ External memory file in user's home directory
 MEMORY_FILE = str(Path.home() / ".jarvis_memory.json")
@@ -51,6 +59,81 @@ WHITELIST = [
     "skype",
 ]
 
+# ✅ Other names people use for whitelisted apps -> canonical WHITELIST name
+APP_ALIASES = {
+    "vs code": "visual studio code",
+    "vscode": "visual studio code",
+    "code": "visual studio code",
+    "google chrome": "chrome",
+    "mozilla firefox": "firefox",
+    "vlc media player": "vlc",
+    "node": "nodejs",
+    "node.js": "nodejs",
+    "python": "python3",
+    "jdk": "java",
+    "openjdk": "java",
+    "pycharm community": "pycharm",
+    "sublime": "sublime text",
+    "brave": "brave browser",
+    "libre office": "libreoffice",
+    "7-zip": "7zip",
+    "docker desktop": "docker",
+    "telegram desktop": "telegram",
+    "signal desktop": "signal",
+}
+
+# Package IDs per package manager, where they differ from the WHITELIST name
+PACKAGE_IDS = {
+    "winget": {
+        "visual studio code": "Microsoft.VisualStudioCode",
+        "sublime text": "SublimeHQ.SublimeText.4",
+        "brave browser": "Brave.Brave",
+        "libreoffice": "TheDocumentFoundation.LibreOffice",
+        "7zip": "7zip.7zip",
+        "nodejs": "OpenJS.NodeJS",
+        "docker": "Docker.DockerDesktop",
+    },
+    "brew": {
+        "visual studio code": "visual-studio-code",
+        "sublime text": "sublime-text",
+        "brave browser": "brave-browser",
+        "7zip": "sevenzip",
+        "nodejs": "node",
+        "python3": "python",
+    },
+    "apt": {
+        "visual studio code": "code",
+        "sublime text": "sublime-text",
+        "brave browser": "brave-browser",
+        "7zip": "p7zip-full",
+        "java": "default-jdk",
+    },
+    "dnf": {
+        "visual studio code": "code",
+        "sublime text": "sublime-text",
+        "7zip": "p7zip",
+        "java": "java-latest-openjdk",
+    },
+    "yum": {
+        "visual studio code": "code",
+        "7zip": "p7zip",
+        "java": "java-latest-openjdk",
+    },
+}
+
+# Built once at load time so name lookups never scan the whitelist
+APP_INDEX = AppIndex(WHITELIST, APP_ALIASES)
+
+# Longest stdout/stderr kept from a package manager command
+MAX_OUTPUT_CHARS = 4000
+# Seconds between asking a cancelled command to stop and killing it
+KILL_GRACE = 3.0
+
+# Filled in by warm_up() at startup; until then every lookup is done live
+_package_manager_cache = {}
+_path_cache = {}  # name -> result of shutil.which
+_cache_lock = threading.Lock()
+
 # A dictionary of known winget error codes and their meanings
 # See: https://learn.microsoft.com/en-us/windows/win32/wininet/wininet-errors
 WINGET_ERROR_CODES = {
@@ -89,6 +172,16 @@ def save_memory(memory):
 
 
 def _get_package_manager_commands():
+    """
+    Returns the package manager commands detected at warm-up, or detects them now.
+    """
+    with _cache_lock:
+        if "commands" in _package_manager_cache:
+            return _package_manager_cache["commands"]
+    return _detect_package_manager()
+
+
+def _detect_package_manager():
     """
     Determines the operating system and returns the appropriate package manager commands.
     """
@@ -143,25 +236,110 @@ def _get_package_manager_commands():
     return None  # No supported package manager found
 
 
+def _which(name):
+    """
+    shutil.which, answered from the warm-up cache when it has the name.
+    """
+    with _cache_lock:
+        if name in _path_cache:
+            path = _path_cache[name]
+            if path is None or os.path.exists(path):
+                return path
+    return shutil.which(name)
+
+
+def _forget_paths(*names):
+    """
+    Drop cached PATH lookups that an install is about to make stale.
+    """
+    with _cache_lock:
+        for name in names:
+            _path_cache.pop(name, None)
+
+
+def warm_up():
+    """
+    Detect the package manager and look up every whitelisted app (and its
+    package name) on PATH, so the first install request doesn't have to.
+    Returns a short description for the warm-up report.
+    """
+    commands = _detect_package_manager()
+    names = set(WHITELIST)
+    if commands:
+        names.update(_package_id(app, commands["name"]) for app in WHITELIST)
+    paths = {name: shutil.which(name) for name in names}
+    with _cache_lock:
+        _package_manager_cache["commands"] = commands
+        _path_cache.update(paths)
+    found = sum(1 for app in WHITELIST if paths[app])
+    manager = commands["name"] if commands else "no package manager"
+    return f"{manager}, {found}/{len(WHITELIST)} apps on PATH"
+
+
+def _package_id(app_name, pkg_manager_name):
+    """
+    Returns the name to pass to the given package manager for a whitelisted app.
+    """
+    return PACKAGE_IDS.get(pkg_manager_name, {}).get(app_name, app_name)
+
+
 def _run_command(command):
     """
     Runs a shell command and returns its output and success status.
     """
+    tape = cassette.current()
+    if tape is not None:
+        return _limit_output(tape.command(command, lambda: _execute_command(command)))
+    return _limit_output(_execute_command(command))
+
+
+def _limit_output(result):
+    """
+    Keep only the end of very long stdout/stderr (package managers can print
+    megabytes of progress output); the end is where the errors are.
+    """
+    for key in ("stdout", "stderr"):
+        text = result.get(key) or ""
+        if len(text) > MAX_OUTPUT_CHARS:
+            result[key] = "...\n" + text[-MAX_OUTPUT_CHARS:]
+    return result
+
+
+def _execute_command(command):
+    """
+    Actually runs the command (see _run_command). If the route's deadline
+    passes, the command and everything it started are stopped.
+    """
+    cancellation.check()
+    # sudo may need the terminal to ask for a password, and a new session
+    # would drop it; sudo relays SIGTERM to its command instead
+    own_group = os.name != "nt" and not _uses_sudo(command)
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             command,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            check=False,  # We handle success/failure manually
             shell=False,  # Always prefer shell=False for security and predictability
+            # Own process group, so cancelling also stops the command's children
+            start_new_session=own_group,
         )
+        with cancellation.on_cancel(lambda: _stop_process_tree(process, own_group)):
+            stdout, stderr = process.communicate()
+        if cancellation.is_cancelled():
+            return {
+                "success": False,
+                "stdout": stdout.strip(),
+                "stderr": "Cancelled because the command took too long.",
+                "exit_code": process.returncode,
+            }
         # Determine success based on returncode
-        success = result.returncode == 0
+        success = process.returncode == 0
         return {
             "success": success,
-            "stdout": result.stdout.strip(),
-            "stderr": result.stderr.strip(),
-            "exit_code": result.returncode,
+            "stdout": stdout.strip(),
+            "stderr": stderr.strip(),
+            "exit_code": process.returncode,
         }
     except FileNotFoundError:
         return {
@@ -179,6 +357,44 @@ def _run_command(command):
         }
 
 
+def _uses_sudo(command):
+    return bool(command) and os.path.basename(command[0]) == "sudo"
+
+
+def _stop_process_tree(process, own_group=True):
+    """
+    Ask the command and its children to stop, then kill them after KILL_GRACE.
+
+    A command in its own process group is signalled as a group. A sudo
+    command shares our terminal's group, so only sudo itself is signalled:
+    it forwards SIGTERM to the root process it started, which we are not
+    allowed to signal directly.
+    """
+    if process.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        return
+    send = (lambda sig: _signal_group(process, sig)) if own_group else process.send_signal
+    send(signal.SIGTERM)
+    timer = threading.Timer(
+        KILL_GRACE,
+        lambda: process.poll() is None and send(signal.SIGKILL),
+    )
+    timer.daemon = True
+    timer.start()
+
+
+def _signal_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
 def _resolve_package_id_with_llm(app_name, pkg_manager_name, error_output):
     """
     Uses an LLM to find the correct package ID from an error message.
@@ -197,7 +413,7 @@ def _resolve_package_id_with_llm(app_name, pkg_manager_name, error_output):
     )
 
     try:
-        response = client.chat.completions.create(
+        response = llm.create(
             model="llama3-8b-8192",
             messages=[
                 {"role": "system", "content": prompt},
@@ -225,10 +441,12 @@ def _resolve_package_id_with_llm(app_name, pkg_manager_name, error_output):
         return None
 
 
-def is_installed(app_name, pkg_manager_commands):
+def is_installed(app_name, pkg_manager_commands, package_id=None):
     """
     Checks if an application is installed using memory, common paths, or package manager.
+    `package_id` is the manager-specific name, if it differs from `app_name`.
     """
+    package = package_id or app_name
     memory = load_memory()
     if app_name in memory:
         saved_path = memory[app_name]
@@ -241,7 +459,7 @@ def is_installed(app_name, pkg_manager_commands):
             save_memory(memory)
 
     # Check common system paths using shutil.which
-    if shutil.which(app_name):
+    if _which(app_name) or (package != app_name and _which(package)):
         print(f"[PATH] Found {app_name} in system PATH.")
         return True
 
@@ -252,20 +470,20 @@ def is_installed(app_name, pkg_manager_commands):
 
         if os_name == "Windows":
             # winget list output needs to be parsed
-            result = _run_command(check_cmd + [app_name])
-            if result["success"] and app_name.lower() in result["stdout"].lower():
+            result = _run_command(check_cmd + [package])
+            if result["success"] and package.lower() in result["stdout"].lower():
                 print(f"[winget] Found {app_name} via winget list.")
                 return True
         elif os_name == "Darwin":
             # brew list output needs to be parsed
             result = _run_command(check_cmd)
-            if result["success"] and app_name.lower() in result["stdout"].lower():
+            if result["success"] and package.lower() in result["stdout"].lower():
                 print(f"[brew] Found {app_name} via brew list.")
                 return True
         elif os_name == "Linux":
             if "apt-get" in pkg_manager_commands["install_cmd"]:
                 # dpkg -s <package>
-                result = _run_command(check_cmd + [app_name])
+                result = _run_command(check_cmd + [package])
                 if (
                     result["success"]
                     and pkg_manager_commands["check_success_pattern"]
@@ -278,8 +496,8 @@ def is_installed(app_name, pkg_manager_commands):
                 or "yum" in pkg_manager_commands["install_cmd"]
             ):
                 # dnf/yum list installed <package>
-                result = _run_command(check_cmd + [app_name])
-                if result["success"] and app_name.lower() in result["stdout"].lower():
+                result = _run_command(check_cmd + [package])
+                if result["success"] and package.lower() in result["stdout"].lower():
                     print(
                         f"[{pkg_manager_commands['install_cmd'][1]}] Found {app_name} via package manager list."
                     )
@@ -317,27 +535,35 @@ def handle(action):
     Handles a user command like 'install chrome' by attempting to install the app
     using the appropriate package manager, with checks and confirmations.
     """
-    app_name = action.replace("install", "").strip().lower()
+    requested = action.replace("install", "").strip().lower()
+
+    resolution = APP_INDEX.resolve(requested)
+    if resolution.name is None:
+        message = f"'{requested}' is not whitelisted for installation."
+        if resolution.suggestions:
+            options = " or ".join(f"'{name}'" for name in resolution.suggestions)
+            message += f" Did you mean {options}?"
+        return message
 
-    if app_name not in WHITELIST:
-        return f"'{app_name}' is not whitelisted for installation."
+    app_name = resolution.name
+    if app_name != requested:
+        print(f"[LOG] Resolved alias '{requested}' to '{app_name}'.")
 
     pkg_manager_commands = _get_package_manager_commands()
     if not pkg_manager_commands:
         return "No supported package manager found on this system."
 
-    if is_installed(app_name, pkg_manager_commands):
+    package_id = _package_id(app_name, pkg_manager_commands["name"])
+    if is_installed(app_name, pkg_manager_commands, package_id):
         return f"'{app_name}' is already installed."
 
     # --- First Attempt ---
-    user_confirm = input(
-        f"Are you sure you want to install '{app_name}'? (yes/no): "
-    ).lower()
-    if user_confirm not in ["yes", "y"]:
+    if not interaction.confirm(f"Are you sure you want to install '{app_name}'?"):
         return f"Installation of '{app_name}' cancelled by user."
 
     print(f"Attempting to install '{app_name}'...")
-    install_cmd = pkg_manager_commands["install_cmd"] + [app_name]
+    _forget_paths(app_name, package_id)
+    install_cmd = pkg_manager_commands["install_cmd"] + [package_id]
     install_result = _run_command(install_cmd)
 
     # --- Success or Retry Logic ---
@@ -359,12 +585,9 @@ def handle(action):
         if package_id:
             # --- Second Attempt with specific ID ---
             print(f"Found specific package ID: '{package_id}'.")
-            retry_confirm = input(
-                "Do you want to try installing with this ID? (yes/no): "
-            ).lower()
-
-            if retry_confirm in ["yes", "y"]:
+            if interaction.confirm("Do you want to try installing with this ID?"):
                 print(f"Retrying installation with ID '{package_id}'...")
+                _forget_paths(package_id)
                 retry_cmd = pkg_manager_commands["install_cmd"] + [package_id]
                 retry_result = _run_command(retry_cmd)
 
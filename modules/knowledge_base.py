@@ -1,43 +1,368 @@
 import json
-from datetime import datetime
+import os
+import re
+import shutil
+import threading
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import chain, islice
 
-def handle(action):
+import cancellation
+import interaction
+from modules.memory_dedup import DuplicateIndex, normalize, signature
+
+MEMORY_FILE = "memory.json"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# How many memories a single recall answer lists
+PAGE_SIZE = 20
+
+_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+# Duplicate index for the memory file as last seen: (file state, index)
+_dedup_cache = (None, None)
+# Time index recall answers from, for the file as last seen: (file state, MemoryIndex)
+_recall_cache = (None, None)
+# Held for every load -> modify -> save of MEMORY_FILE (and the caches of it);
+# the server runs handlers on several threads at once
+_lock = threading.RLock()
+_UNITS = {"minute": "minutes", "hour": "hours", "day": "days", "week": "weeks"}
+
+
+class MemoryIndex:
     """
-    Handles remembering and recalling information.
+    Memories sorted by timestamp so time ranges are found with bisect instead
+    of a full scan. Timestamps use TIMESTAMP_FORMAT, which sorts correctly as text.
     """
+
+    def __init__(self, memories):
+        self._items = sorted(memories, key=lambda item: item.get("timestamp", ""))
+        self._keys = [item.get("timestamp", "") for item in self._items]
+
+    def __len__(self):
+        return len(self._items)
+
+    def _bounds(self, start=None, end=None):
+        lo = bisect_left(self._keys, _format(start)) if start else 0
+        hi = bisect_left(self._keys, _format(end)) if end else len(self._keys)
+        return lo, max(lo, hi)
+
+    def count(self, start=None, end=None):
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+
+    def iter_range(self, start=None, end=None, newest_first=False):
+        """
+        Yield memories with start <= timestamp < end, lazily.
+        """
+        lo, hi = self._bounds(start, end)
+        indices = range(hi - 1, lo - 1, -1) if newest_first else range(lo, hi)
+        for i in indices:
+            yield self._items[i]
+
+
+def _format(moment):
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+def load_memories():
     try:
-        with open("memory.json", "r") as f:
-            memories = json.load(f)
+        with open(MEMORY_FILE, "r") as f:
+            return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
-        memories = []
+        return []
+
+
+def save_memories(memories):
+    """
+    Write the memories through a temporary file, so a concurrent reader never
+    sees a half-written file (which would load as no memories at all).
+    """
+    global _recall_cache
+    tmp_path = f"{MEMORY_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(memories, f, indent=4)
+    os.replace(tmp_path, MEMORY_FILE)
+    # A rewrite can keep the size and (on coarse clocks) the mtime
+    _recall_cache = (None, None)
+
+
+def memory_index():
+    """
+    MemoryIndex over the stored memories, rebuilt only when the file changed.
+    """
+    global _recall_cache
+    with _lock:
+        state = _file_state()
+        cached_state, index = _recall_cache
+        if state is None or state != cached_state:
+            index = MemoryIndex(load_memories())
+            _recall_cache = (state, index) if state else (None, None)
+        return index
+
+
+def duplicate_index(memories):
+    """
+    Near-duplicate index over the memories, keyed by list position. Signatures
+    stored with each memory are reused; missing ones are computed and added.
+    """
+    index = DuplicateIndex()
+    for position, item in enumerate(memories):
+        item["signature"] = index.add(position, item["data"], item.get("signature"))
+    return index
+
+
+def _file_state():
+    """
+    Identifies the current contents of MEMORY_FILE (None if it can't be read).
+    """
+    try:
+        stat = os.stat(MEMORY_FILE)
+    except OSError:
+        return None
+    return (os.path.abspath(MEMORY_FILE), stat.st_mtime_ns, stat.st_size)
+
+
+def _cached_duplicate_index(memories):
+    """
+    Reuse the index built for the file as we last wrote it, so a remember
+    costs a few bucket lookups instead of re-indexing every memory.
+    """
+    state, index = _dedup_cache
+    if state is None or state != _file_state() or len(index) != len(memories):
+        index = duplicate_index(memories)
+    return index
+
+
+def _save_indexed(memories, index):
+    global _dedup_cache
+    save_memories(memories)
+    state = _file_state()
+    _dedup_cache = (state, index) if state else (None, None)
+
+
+def compact_memories(memories):
+    """
+    Merge near-duplicate memories, oldest first; the newest wording and
+    timestamp win. Returns (compacted memories, number merged).
+    """
+    index = DuplicateIndex()
+    kept = []
+    for item in sorted(memories, key=lambda item: item.get("timestamp", "")):
+        sig = item.get("signature") or signature(item["data"])
+        match = index.find(item["data"], sig)
+        if match is None:
+            kept.append({**item, "signature": sig})
+            index.add(len(kept) - 1, item["data"], sig)
+            continue
+        kept[match[0]].update(data=item["data"], timestamp=item["timestamp"], signature=sig)
+        index.add(match[0], item["data"], sig)
+    kept.sort(key=lambda item: item.get("timestamp", ""))
+    return kept, len(memories) - len(kept)
+
 
+def _remember(memories, argument):
+    """
+    Store a memory, or update the stored one if it says nearly the same thing.
+    """
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    sig = signature(argument)
+    index = _cached_duplicate_index(memories)
+    match = index.find(argument, sig)
+    if match is None:
+        memories.append({"timestamp": timestamp, "data": argument, "signature": sig})
+        index.add(len(memories) - 1, argument, sig)
+        _save_indexed(memories, index)
+        return f"I will remember that: '{argument}'"
+
+    item = memories[match[0]]
+    if normalize(item["data"]) == normalize(argument):
+        return f"I already remember that: '{item['data']}'"
+    previous = item["data"]
+    item.update(data=argument, timestamp=timestamp, signature=sig)
+    index.add(match[0], argument, sig)
+    _save_indexed(memories, index)
+    return f"I updated what I remembered: '{previous}' is now '{argument}'"
+
+
+def iter_memories(
+    memories, query=None, start=None, end=None, offset=0, limit=None, newest_first=False
+):
+    """
+    Lazily yield stored memories, optionally filtered by text `query` and the
+    time range [start, end), skipping `offset` matches and stopping after `limit`.
+    """
+    index = memories if isinstance(memories, MemoryIndex) else MemoryIndex(memories)
+    matches = index.iter_range(start, end, newest_first)
+    if query:
+        query = query.lower()
+        matches = (item for item in matches if query in item["data"].lower())
+    stop = offset + limit if limit is not None else None
+    return islice(matches, offset, stop)
+
+
+def parse_time_range(text, now=None):
+    """
+    Pull a time expression out of a recall argument.
+    Returns (remaining_text, start, end, label); start/end are None if absent.
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+
+    patterns = [
+        (rf"\bbetween {_DATE} and {_DATE}\b", None),
+        (rf"\bfrom {_DATE} to {_DATE}\b", None),
+        (rf"\bsince {_DATE}\b", None),
+        (rf"\bbefore {_DATE}\b", None),
+        (rf"\bon {_DATE}\b", None),
+        (r"\b(?:in the )?(?:last|past) (\d+) (minute|hour|day|week)s?\b", None),
+        (r"\btoday\b", (today, None)),
+        (r"\byesterday\b", (today - timedelta(days=1), today)),
+        (r"\bthis week\b", (week_start, None)),
+        (r"\blast week\b", (week_start - timedelta(weeks=1), week_start)),
+        (r"\bthis month\b", (month_start, None)),
+        (
+            r"\blast month\b",
+            ((month_start - timedelta(days=1)).replace(day=1), month_start),
+        ),
+    ]
+
+    for pattern, fixed in patterns:
+        match = re.search(pattern, text)
+        if not match:
+            continue
+        label = match.group(0)
+        if fixed is not None:
+            start, end = fixed
+        elif label.startswith(("between", "from")):
+            start = _parse_date(match.group(1))
+            end = _parse_date(match.group(2)) + timedelta(days=1)
+        elif label.startswith("since"):
+            start, end = _parse_date(match.group(1)), None
+        elif label.startswith("before"):
+            start, end = None, _parse_date(match.group(1))
+        elif label.startswith("on"):
+            start = _parse_date(match.group(1))
+            end = start + timedelta(days=1)
+        else:
+            amount, unit = int(match.group(1)), _UNITS[match.group(2)]
+            start, end = now - timedelta(**{unit: amount}), None
+        remaining = (text[: match.start()] + text[match.end() :]).strip()
+        return remaining, start, end, label
+    return text, None, None, None
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def _parse_page(text):
+    """
+    Pull 'page N' out of a recall argument. Returns (remaining_text, page).
+    """
+    match = re.search(r"\bpage (\d+)\b", text)
+    if not match:
+        return text, 1
+    remaining = (text[: match.start()] + text[match.end() :]).strip()
+    return remaining, max(1, int(match.group(1)))
+
+
+def _recall(argument):
+    """
+    Answer a recall a page at a time. Lines are emitted as they are read from
+    the index, so the GUI shows and TTS speaks them while the rest follows.
+    """
+    argument, page = _parse_page(argument.strip().lower())
+    more_command = f"recall {argument} page {page + 1}".replace("  ", " ")
+    try:
+        query, start, end, label = parse_time_range(argument)
+    except (ValueError, OverflowError):  # "2024-13-01", "last 99999999999 days"
+        return "I couldn't understand that date. Please use a real date like 2024-07-28."
+    # Drop filler left behind by phrases like "recall from last week"
+    query = re.sub(r"^(?:from|in|during|what|anything)\b\s*", "", query).strip()
+
+    index = memory_index()
+    offset = (page - 1) * PAGE_SIZE
+    matches = iter_memories(index, query, start, end, offset)
+    first = next(matches, None)
+
+    if first is None:
+        if query:
+            total = sum(1 for _ in iter_memories(index, query, start, end))
+        else:
+            total = index.count(start, end)
+        if total and offset >= total:
+            return f"There is no page {page}; I only have {total} matching memories."
+        if query:
+            return f"I couldn't find any memories related to '{query}'."
+        if label:
+            return f"I don't have any memories {label}."
+        return "I don't have any memories yet."
+
+    if query:
+        header = "Here's what I found:"
+    elif label:
+        header = f"Here's what I remembered {label}:"
+    else:
+        header = "Here are all my memories:"
+    parts = [header]
+    interaction.emit(header)
+    for item in islice(chain([first], matches), PAGE_SIZE):
+        cancellation.check()
+        line = f"\n- {item['data']}"
+        parts.append(line)
+        interaction.emit(line)
+    shown = len(parts) - 1
+
+    # The matches after this page are only counted, never collected
+    total = offset + shown + sum(1 for _ in matches) if query else index.count(start, end)
+    if total > offset + shown:
+        footer = (
+            f"\n(Showing {offset + 1}-{offset + shown} of {total}. "
+            f"Say '{more_command}' for more.)"
+        )
+        parts.append(footer)
+        interaction.emit(footer)
+    return "".join(parts)
+
+
+def handle(action):
+    """
+    Handles remembering, recalling and compacting (deduplicating) information.
+    """
     action_parts = action.strip().split(maxsplit=1)
     command = action_parts[0].lower()
     argument = action_parts[1] if len(action_parts) > 1 else ""
 
+    if command == "recall":
+        # Reads a snapshot of the index, so other memory commands don't wait
+        # while the answer streams
+        return _recall(argument)
+    with _lock:
+        return _handle(command, argument)
+
+
+def _handle(command, argument):
+    memories = load_memories()
+
     if command == "remember":
         if not argument:
             return "What should I remember?"
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        memories.append({"timestamp": timestamp, "data": argument})
-        
-        with open("memory.json", "w") as f:
-            json.dump(memories, f, indent=4)
-        return f"I will remember that: '{argument}'"
+        return _remember(memories, argument)
+
+    elif command == "compact":
+        compacted, merged = compact_memories(memories)
+        if not merged:
+            return f"No duplicate memories found; I have {len(compacted)} memories."
+        # Merging can't be undone from the compacted file, so keep the old one
+        backup = MEMORY_FILE + ".bak"
+        shutil.copyfile(MEMORY_FILE, backup)
+        save_memories(compacted)
+        return (
+            f"Merged {merged} duplicate memories; {len(compacted)} remain. "
+            f"The previous memories are saved in {backup}."
+        )
 
-    elif command == "recall":
-        if not argument:
-            if memories:
-                return "Here are all my memories:\n" + "\n".join([f"- {item['data']}" for item in memories])
-            else:
-                return "I don't have any memories yet."
-
-        relevant_memories = [item['data'] for item in memories if argument.lower() in item['data'].lower()]
-        
-        if relevant_memories:
-            return "Here's what I found:\n" + "\n".join([f"- {memory}" for memory in relevant_memories])
-        else:
-            return f"I couldn't find any memories related to '{argument}'."
-    
     return "I'm not sure how to handle that."
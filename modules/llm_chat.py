@@ -1,48 +1,131 @@
 from groq import Groq
 from dotenv import load_dotenv
 import os
+import time
+import cancellation
+import interaction
+import metrics
+from llm_resilience import CircuitOpenError, ResilientLLM
+from modules.chat_sessions import DEFAULT_MAX_MESSAGES, SESSIONS_DIR, SessionStore
+from modules.response_cache import ResponseCache, is_history_independent
 
 load_dotenv()
 
 client = Groq(
     api_key=os.environ.get("GROQ_API_KEY"),
+    max_retries=0,  # retries are handled by ResilientLLM
 )
+llm = ResilientLLM(client, name="chat", timeout=30.0)
 
-# Initialize chat history
+# Opt-in answer cache for factual questions (enable with SANE_CHAT_CACHE=1)
+response_cache = ResponseCache.from_env()
+
+SYSTEM_PROMPT = "You are a helpful AI assistant."
+
+# Most recent messages (besides the system prompt) sent along with a question
+MAX_HISTORY_MESSAGES = int(os.environ.get("SANE_CHAT_HISTORY", DEFAULT_MAX_MESSAGES))
+
+# Initialize chat history (the conversation used when no session ID is given)
 chat_history = [
-    {"role": "system", "content": "You are a helpful AI assistant."},
+    {"role": "system", "content": SYSTEM_PROMPT},
 ]
 
+# Persistent per-client conversations, keyed by session ID
+session_store = SessionStore(
+    os.environ.get("SANE_SESSIONS_DIR", SESSIONS_DIR),
+    max_messages=MAX_HISTORY_MESSAGES,
+)
+
+
+def _record_turn(session, prompt, answer):
+    """
+    Add a finished user/assistant exchange to the session (or the global history).
+    """
+    if session is None:
+        chat_history.append({"role": "user", "content": prompt})
+        chat_history.append({"role": "assistant", "content": answer})
+        # Forget the oldest turns, keeping the system prompt
+        if len(chat_history) > MAX_HISTORY_MESSAGES + 1:
+            del chat_history[1 : len(chat_history) - MAX_HISTORY_MESSAGES]
+    else:
+        session.append_turn(prompt, answer)
+
 
-def handle(action):
-    global chat_history
+def handle(action, session_id=None):
+    """
+    Answer a chat prompt. With a `session_id` the conversation is kept in (and
+    resumed from) the persistent session store instead of `chat_history`.
+    """
     prompt = action.replace("chat", "", 1).replace("ask", "", 1).strip()
     if not prompt:
         return "Please provide something to chat about."
 
-    # Add user message to history
-    chat_history.append({"role": "user", "content": prompt})
+    try:
+        session = session_store.get(session_id) if session_id else None
+    except ValueError as e:
+        return str(e)
+
+    start = time.perf_counter()
+    cacheable = response_cache is not None and is_history_independent(prompt)
+    if cacheable:
+        cached = response_cache.get(prompt)
+        if cached is not None:
+            _record_turn(session, prompt, cached)
+            metrics.incr("chat.cache_hits")
+            metrics.observe("chat.latency.cached", time.perf_counter() - start)
+            return cached
+        metrics.incr("chat.cache_misses")
 
+    history = chat_history if session is None else session.history(SYSTEM_PROMPT)
+    messages = history + [{"role": "user", "content": prompt}]
+
+    content = ""
     try:
-        response = client.chat.completions.create(
+        response = llm.create(
             model="llama3-8b-8192",
-            messages=chat_history,
+            messages=messages,
             temperature=0.2,
             stream=True,
         )
-        content = ""
-        for chunk in response:
-            if chunk.choices[0].delta.content is not None:
-                content += chunk.choices[0].delta.content
+        # Closing the stream unblocks a stalled read when the deadline passes
+        with cancellation.on_cancel(lambda: _close_stream(response)):
+            for chunk in response:
+                cancellation.check()
+                if chunk.choices[0].delta.content is not None:
+                    content += chunk.choices[0].delta.content
+                    interaction.emit(chunk.choices[0].delta.content)
 
-        # Add assistant response to history
-        chat_history.append({"role": "assistant", "content": content})
+        # Add the exchange to history
+        _record_turn(session, prompt, content)
+        metrics.observe("chat.latency.model", time.perf_counter() - start)
+        if cacheable and content.strip():
+            response_cache.put(prompt, content.strip())
         return content.strip()
 
+    except CircuitOpenError:
+        return "I can't reach the language model right now. Please try again in a moment."
     except Exception as e:
+        if cancellation.is_cancelled():
+            return _partial_answer(content)
         return f"An error occurred: {e}"
 
 
+def _close_stream(response):
+    close = getattr(response, "close", None)
+    if close:
+        close()
+
+
+def _partial_answer(content):
+    """
+    What to say when the answer was cut off by the route's deadline.
+    The partial answer is not added to the history or the cache.
+    """
+    if content.strip():
+        return f"{content.strip()}\n(Answer cut off because it took too long.)"
+    return "Sorry, the answer took too long. Please try again."
+
+
 if __name__ == "__main__":
     while True:
         user_input = input("You: ")
@@ -0,0 +1,167 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# MinHash signature of 64 values, bucketed as 16 bands of 4. Two texts with
+# shingle overlap 0.75 share a band with ~99.8% probability, at 0.2 with ~2.5%.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Shingle overlap (Jaccard) needed to call two memories the same
+DUPLICATE_SCORE = 0.75
+# How alike two content words must be to count as one ("favourite"/"favorite")
+WORD_MATCH = 0.8
+# Words that can differ between two wordings of the same fact. Negations
+# ("not", "never", "no") are deliberately not here.
+FILLER_WORDS = {
+    "a", "an", "the", "my", "our", "is", "are", "was", "were", "be", "to",
+    "of", "in", "on", "at", "for", "and", "that", "s",
+}
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures are stored in memory.json and must stay comparable
+_rng = random.Random(1337)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text):
+    """
+    Lowercase, drop punctuation and extra spaces ("Bob's  phone!" -> "bobs phone").
+    """
+    text = re.sub(r"[^\w\s]", "", text.lower())
+    return " ".join(text.split())
+
+
+def shingles(text, n=3):
+    """
+    Set of character n-grams of the normalized text.
+    """
+    text = normalize(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def content_words(text):
+    """
+    The words of a memory that carry the fact, in order.
+    """
+    return [word for word in normalize(text).split() if word not in FILLER_WORDS]
+
+
+def same_facts(a, b):
+    """
+    True if two lists of content words line up word for word, allowing
+    spelling variants. Shingle overlap alone merges different facts:
+    "the key is under the mat" / "the key is not under the mat",
+    "birthday is in march" / "birthday is in may", "room 12" / "room 13".
+    """
+    if len(a) != len(b):
+        return False
+    for word_a, word_b in zip(a, b):
+        if word_a == word_b:
+            continue
+        if re.search(r"\d", word_a + word_b):
+            return False
+        if SequenceMatcher(None, word_a, word_b).ratio() < WORD_MATCH:
+            return False
+    return True
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _hash32(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), "big")
+
+
+def minhash(text):
+    """
+    NUM_PERM minimum hash values over the text's shingles.
+    """
+    hashes = [_hash32(shingle) for shingle in shingles(text)] or [0]
+    return [
+        min((a * value + b) % _PRIME for value in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def signature(text):
+    """
+    Compact LSH signature stored with each memory: one 32-bit hash per band,
+    as a hex string.
+    """
+    values = minhash(text)
+    keys = []
+    for band in range(BANDS):
+        rows = ",".join(str(v) for v in values[band * ROWS : (band + 1) * ROWS])
+        keys.append(f"{_hash32(rows):08x}")
+    return "".join(keys)
+
+
+def band_keys(sig):
+    return [(band, sig[band * 8 : (band + 1) * 8]) for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive index over memory texts keyed by any hashable ID.
+
+    A lookup probes only the 16 band buckets of the query's signature and then
+    confirms candidates by shingle overlap, so finding a near-duplicate does
+    not scan the whole store.
+    """
+
+    def __init__(self, threshold=DUPLICATE_SCORE):
+        self.threshold = threshold
+        self._buckets = defaultdict(set)
+        self._entries = {}  # id -> (signature, shingles, content words)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, key, text, sig=None):
+        """
+        Index `text` under `key`; returns its signature.
+        """
+        if key in self._entries:
+            self.remove(key)
+        if not sig or len(sig) != BANDS * 8:
+            sig = signature(text)
+        self._entries[key] = (sig, shingles(text), content_words(text))
+        for bucket in band_keys(sig):
+            self._buckets[bucket].add(key)
+        return sig
+
+    def remove(self, key):
+        sig = self._entries.pop(key)[0]
+        for bucket in band_keys(sig):
+            self._buckets[bucket].discard(key)
+            if not self._buckets[bucket]:
+                del self._buckets[bucket]
+
+    def find(self, text, sig=None):
+        """
+        Return (key, score) of the closest stored near-duplicate, or None.
+        """
+        sig = sig or signature(text)
+        candidates = set()
+        for bucket in band_keys(sig):
+            candidates |= self._buckets.get(bucket, set())
+
+        query, query_words = shingles(text), content_words(text)
+        best = None
+        for key in candidates:
+            _, stored, stored_words = self._entries[key]
+            if not same_facts(query_words, stored_words):
+                continue
+            score = jaccard(query, stored)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
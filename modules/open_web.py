@@ -2,12 +2,17 @@ import webbrowser
 import requests
 import os
 import re
+import cancellation
+from modules.site_index import SiteIndex
+
+# Built-in sites plus the user's bookmarks and browsing history
+site_index = SiteIndex()
 
 
 def handle(action):
     """
     Handles 'open' actions:
-    - Opens a website (e.g., 'open youtube')
+    - Opens a website (e.g., 'open youtube'), resolved via the local site index
     - Searches for a query (e.g., 'open python tutorials')
     - Downloads a setup file if asked (e.g., 'open chrome download' or 'download chrome')
     """
@@ -33,7 +38,14 @@ def handle(action):
     if site.startswith("http") or site.startswith("www"):
         url = site if site.startswith("http") else f"https://{site}"
         webbrowser.open(url)
+        site_index.record_url(url)
         return f"Opened {url}"
+    # Known site, bookmark or something opened before
+    match = site_index.resolve(site) if site else None
+    if match:
+        webbrowser.open(match.url)
+        site_index.record_visit(match.name)
+        return f"Opened {match.url}"
     # Otherwise, treat as a search query
     if site:
         search_url = f"https://www.google.com/search?q={site.replace(' ', '+')}"
@@ -61,18 +73,23 @@ def get_official_download_url(app_name):
 def download_file(url, app_name):
     """
     Downloads a file from the given URL to the current directory.
+    A download cut off by the route's deadline is deleted again.
     """
+    local_filename = url.split("/")[-1]
     try:
-        local_filename = url.split("/")[-1]
         response = requests.get(url, stream=True, timeout=30)
         response.raise_for_status()
-        with open(local_filename, "wb") as f:
+        # Closing the response interrupts a stalled read when cancelled
+        with cancellation.on_cancel(response.close), open(local_filename, "wb") as f:
             for chunk in response.iter_content(chunk_size=8192):
+                cancellation.check()
                 if chunk:
                     f.write(chunk)
         return os.path.abspath(local_filename)
     except Exception as e:
         print(f"Download error: {e}")
+        if cancellation.is_cancelled() and os.path.exists(local_filename):
+            os.remove(local_filename)
         # Open the download page in browser as fallback
         webbrowser.open(url)
         return None
@@ -0,0 +1,255 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# ✅ Cache file in user's home directory (next to the other assistant state)
+CACHE_FILE = str(Path.home() / ".sane_response_cache.json")
+
+DEFAULT_THRESHOLD = 0.85  # cosine similarity needed for a fuzzy hit
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_ENTRIES = 500
+
+EMBEDDING_DIMS = 1 << 16
+# How alike two content words must be to count as the same word ("captial")
+WORD_MATCH = 0.8
+
+# Words that carry little meaning; they still count, just with a lower weight
+STOPWORDS = {
+    "a", "an", "the", "of", "is", "are", "was", "were", "what", "whats", "who",
+    "how", "in", "on", "to", "for", "do", "does", "can", "please", "tell",
+    "about", "explain", "sane", "s",  # "s" is what is left of "what's"
+}
+
+# Questions containing these depend on the conversation or on the user
+CONTEXT_WORDS = {
+    "it", "its", "that", "this", "these", "those", "they", "them", "their",
+    "he", "him", "his", "she", "her", "i", "me", "my", "mine", "we", "us",
+    "our", "again", "more", "previous", "above", "earlier", "same", "else",
+}
+
+# Questions containing these have answers that change over time
+TIME_WORDS = {
+    "today", "tonight", "tomorrow", "yesterday", "now", "current", "currently",
+    "latest", "recent", "news", "weather", "time", "date",
+}
+
+
+def normalize(text):
+    """
+    Lowercase, strip punctuation and collapse whitespace.
+    """
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def is_history_independent(question):
+    """
+    Heuristic: True if the answer to `question` should not depend on the
+    conversation so far, the user, or the current time.
+    """
+    words = normalize(question).split()
+    if not words or words[0] in {"and", "but", "so", "also"}:
+        return False
+    return not any(word in CONTEXT_WORDS or word in TIME_WORDS for word in words)
+
+
+def content_words(text):
+    """
+    The words of a normalized question that aren't stopwords, in order.
+    """
+    return [word for word in text.split() if word not in STOPWORDS]
+
+
+def same_question(a, b):
+    """
+    True if two normalized questions have the same content words in the same
+    order, allowing small typos but no change in any number. Similar wording
+    isn't enough: "convert 10 km to miles" and "convert 10 miles to km" use
+    the same words, and "capital of france in 1500" adds only one.
+    """
+    words_a, words_b = content_words(a), content_words(b)
+    if len(words_a) != len(words_b):
+        return False
+    for word_a, word_b in zip(words_a, words_b):
+        if word_a == word_b:
+            continue
+        if re.search(r"\d", word_a + word_b):
+            return False
+        if SequenceMatcher(None, word_a, word_b).ratio() < WORD_MATCH:
+            return False
+    return True
+
+
+def embed(text):
+    """
+    Cheap local embedding: hashed word, word-bigram and character-trigram
+    features, L2-normalized, returned as a sparse {index: weight} dict.
+    """
+    vector = {}
+    words = normalize(text).split()
+    for position, word in enumerate(words):
+        weight = 0.25 if word in STOPWORDS else 1.0
+        features = [("w:" + word, 2 * weight)]
+        if position:
+            # Word order matters: "10 km to miles" is not "10 miles to km"
+            features.append(("b:" + words[position - 1] + " " + word, weight))
+        padded = f" {word} "
+        features += [("c:" + padded[i : i + 3], weight) for i in range(len(padded) - 2)]
+        for feature, value in features:
+            index = zlib.crc32(feature.encode()) % EMBEDDING_DIMS
+            vector[index] = vector.get(index, 0.0) + value
+
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if not norm:
+        return {}
+    return {index: value / norm for index, value in vector.items()}
+
+
+def similarity(a, b):
+    """
+    Cosine similarity of two embeddings from `embed`.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of chat answers for history-independent questions.
+
+    Lookups match the normalized question text first, then fall back to the
+    most similar cached question above `threshold` that asks the same thing
+    (see `same_question`). Entries expire after `ttl`
+    seconds and the least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path=CACHE_FILE,
+        threshold=DEFAULT_THRESHOLD,
+        ttl=DEFAULT_TTL,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        clock=time.time,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = None  # OrderedDict: normalized question -> entry, LRU order
+        self._vectors = {}
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache from SANE_CHAT_CACHE* environment variables, or return
+        None when caching is not enabled.
+        """
+        if os.environ.get("SANE_CHAT_CACHE", "").lower() not in {"1", "true", "yes", "on"}:
+            return None
+        return cls(
+            path=os.environ.get("SANE_CHAT_CACHE_FILE", CACHE_FILE),
+            threshold=float(os.environ.get("SANE_CHAT_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+            ttl=float(os.environ.get("SANE_CHAT_CACHE_TTL", DEFAULT_TTL)),
+            max_entries=int(os.environ.get("SANE_CHAT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        )
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def get(self, question):
+        """
+        Return the cached answer for `question`, or None on a miss.
+        """
+        key = normalize(question)
+        if not key:
+            return None
+        with self._lock:
+            self._load()
+            self._expire()
+
+            if key not in self._entries:
+                key = self._nearest(key)
+                if key is None:
+                    return None
+
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            entry["hits"] = entry.get("hits", 0) + 1
+            return entry["answer"]
+
+    def put(self, question, answer):
+        key = normalize(question)
+        if not key or not answer:
+            return
+        with self._lock:
+            self._load()
+            self._entries[key] = {
+                "answer": answer,
+                "created": self._clock(),
+                "hits": 0,
+            }
+            self._entries.move_to_end(key)
+            self._vectors[key] = embed(key)
+            self._expire()
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                self._vectors.pop(oldest, None)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = OrderedDict()
+            self._vectors = {}
+            self._save()
+
+    def _nearest(self, key):
+        query = embed(key)
+        best_key, best_score = None, self.threshold
+        for candidate, vector in self._vectors.items():
+            score = similarity(query, vector)
+            if score >= best_score and same_question(key, candidate):
+                best_key, best_score = candidate, score
+        return best_key
+
+    def _expire(self):
+        cutoff = self._clock() - self.ttl
+        for key in [k for k, e in self._entries.items() if e["created"] < cutoff]:
+            del self._entries[key]
+            self._vectors.pop(key, None)
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+                for key, entry in stored.items():
+                    self._entries[key] = entry
+                    self._vectors[key] = embed(key)
+            except Exception as e:
+                print(f"[DEBUG] Couldn't load response cache: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[DEBUG] Couldn't save response cache: {e}")
@@ -1,3 +1,64 @@
-# Placeholder: add real email sending with SMTP or API
+import re
+import threading
+
+from modules.email_outbox import Outbox, SmtpConnection, config_from_env
+
+# "send email to bob@example.com about lunch saying see you at noon"; plans
+# produce the same without "to" ("send email bob@example.com saying hi")
+EMAIL_PATTERN = re.compile(r"send email(?:\s+to)?[\s:]+(?P<to>[^\s@]+@[^\s@]+\.[^\s@,;:]+)[\s,;:]*(?P<rest>.*)", re.S | re.I)
+SUBJECT_PATTERN = re.compile(
+    r"^(?:about|subject|re)\s*:?\s+(?P<subject>.+?)(?:\s+(?:saying|message|body)\s*:?\s+|\s*:\s+)(?P<body>.+)$",
+    re.S | re.I,
+)
+BODY_PREFIX = re.compile(r"^(?:saying|message|body|that)\s*:?\s+", re.I)
+DEFAULT_SUBJECT = "Message from SANE"
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """
+    The process-wide outbox, started on first use. None if SMTP isn't configured.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            config = config_from_env()
+            if config is None:
+                return None
+            _outbox = Outbox(SmtpConnection(config)).start()
+        return _outbox
+
+
+def parse_email(action):
+    """
+    Split a command into (to, subject, body), or return None if there is no address.
+    """
+    match = EMAIL_PATTERN.search(action.strip())
+    if not match:
+        return None
+    rest = match.group("rest").strip()
+    subject_match = SUBJECT_PATTERN.match(rest)
+    if subject_match:
+        return match.group("to"), subject_match.group("subject").strip(), subject_match.group("body").strip()
+    return match.group("to"), DEFAULT_SUBJECT, BODY_PREFIX.sub("", rest)
+
+
 def handle(action):
-    return "Pretend I sent an email! (Add real code later)"
+    """
+    Queue an email for sending and return right away; the outbox delivers it
+    in the background.
+    """
+    parsed = parse_email(action)
+    if parsed is None:
+        return "Who should I email? Say something like 'send email to bob@example.com saying hello'."
+    to, subject, body = parsed
+    if not body:
+        return f"What should the email to {to} say?"
+
+    outbox = get_outbox()
+    if outbox is None:
+        return "Email isn't set up yet. Add SMTP_HOST (and SMTP_USER / SMTP_PASSWORD) to your .env file."
+    outbox.enqueue(to, subject, body)
+    return f"Queued your email to {to}. I'll send it in the background."
@@ -0,0 +1,251 @@
+import json
+import math
+import os
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from modules.fuzzy_index import NgramIndex
+
+# ✅ User bookmarks and visit history in user's home directory
+SITES_FILE = str(Path.home() / ".sane_sites.json")
+
+# Common sites so "open youtube" goes straight there instead of to a search page
+BUILTIN_SITES = {
+    "youtube": "https://www.youtube.com",
+    "google": "https://www.google.com",
+    "gmail": "https://mail.google.com",
+    "google maps": "https://maps.google.com",
+    "google drive": "https://drive.google.com",
+    "google calendar": "https://calendar.google.com",
+    "google docs": "https://docs.google.com",
+    "github": "https://github.com",
+    "stack overflow": "https://stackoverflow.com",
+    "stackoverflow": "https://stackoverflow.com",
+    "wikipedia": "https://www.wikipedia.org",
+    "reddit": "https://www.reddit.com",
+    "twitter": "https://x.com",
+    "facebook": "https://www.facebook.com",
+    "instagram": "https://www.instagram.com",
+    "linkedin": "https://www.linkedin.com",
+    "netflix": "https://www.netflix.com",
+    "amazon": "https://www.amazon.com",
+    "chatgpt": "https://chatgpt.com",
+    "outlook": "https://outlook.live.com",
+    "whatsapp web": "https://web.whatsapp.com",
+    "spotify": "https://open.spotify.com",
+    "twitch": "https://www.twitch.tv",
+    "hacker news": "https://news.ycombinator.com",
+    "python docs": "https://docs.python.org/3/",
+}
+
+# Shortest input we will complete as a prefix ("you" -> youtube, not "y")
+MIN_PREFIX = 3
+# Share of a site's name a prefix must cover to complete it ("youtu" -> youtube
+# but not "python" -> python docs), unless the user has visited the site
+PREFIX_SCORE = 0.6
+# Fuzzy score needed to open a site without searching
+FUZZY_SCORE = 0.7
+# Upper bound on prefix candidates ranked per lookup
+MAX_PREFIX_CANDIDATES = 200
+
+SiteMatch = namedtuple("SiteMatch", ["name", "url", "score"])
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def fuzzy_key(name):
+    """
+    The part of a name worth fuzzy matching: 'www.' and the top-level domain
+    are dropped, since nearly every remembered host shares their trigrams
+    ('www', '.co', 'com') and they would make every host a candidate.
+    """
+    if name.startswith("www."):
+        name = name[4:]
+    if "." in name:
+        name = name.rsplit(".", 1)[0]
+    return name
+
+
+def name_for_url(url):
+    """
+    Name used to remember a URL the user opened directly: its host without 'www.'.
+    """
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class SiteIndex:
+    """
+    In-memory index of site names -> URLs (built-ins, bookmarks, history).
+
+    Exact names are a dict lookup, prefixes use bisect over the sorted names and
+    typos fall back to a trigram index. Candidates are ranked by match quality
+    weighted by how often the user opened them.
+    """
+
+    def __init__(self, path=SITES_FILE, builtins=BUILTIN_SITES):
+        self.path = path
+        self._builtins = builtins
+        self._lock = threading.RLock()
+        self._entries = None  # name -> {"url", "visits", "source"}
+        self._names = []
+        self._ngrams = NgramIndex()  # over fuzzy_key(name)
+        self._by_key = {}  # fuzzy_key(name) -> names
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    # --- Queries ---
+
+    def lookup(self, text, limit=5):
+        """
+        Return up to `limit` SiteMatch candidates for `text`, best first.
+        """
+        key = normalize(text)
+        if not key:
+            return []
+        with self._lock:
+            self._load()
+            candidates = {}
+            if key in self._entries:
+                candidates[key] = 1.0
+            prefixed = []
+            if len(key) >= MIN_PREFIX:
+                start = bisect_left(self._names, key)
+                for name in self._names[start : start + MAX_PREFIX_CANDIDATES]:
+                    if not name.startswith(key):
+                        break
+                    prefixed.append(name)
+                for name, score in self._completions(key, prefixed).items():
+                    candidates.setdefault(name, score)
+            # A real prefix of several sites is not a typo; leave it to a search
+            if not candidates and not prefixed:
+                for fuzzy, score in self._ngrams.search(fuzzy_key(key), limit=limit, min_score=FUZZY_SCORE):
+                    for name in self._by_key[fuzzy]:
+                        candidates[name] = score
+
+            ranked = [
+                SiteMatch(name, self._entries[name]["url"], self._rank(name, quality))
+                for name, quality in candidates.items()
+            ]
+        # An exact name always wins; the rest are ordered by weighted score
+        ranked.sort(key=lambda match: (match.name != key, -match.score, match.name))
+        return ranked[:limit]
+
+    def resolve(self, text):
+        """
+        Best SiteMatch for `text`, or None if nothing matches well enough.
+        """
+        matches = self.lookup(text, limit=1)
+        return matches[0] if matches else None
+
+    def _completions(self, key, names):
+        """
+        The names starting with `key` that it may be completed to, with their
+        prefix scores: sites the user has visited, and a site `key` covers
+        most of, unless another site fits too ("twit": twitch or twitter?).
+        """
+        completions = {}
+        for name in names:
+            score = len(key) / len(name)
+            if self._entries[name]["visits"] or (
+                score >= PREFIX_SCORE and all(other.startswith(name) for other in names)
+            ):
+                completions[name] = score
+        return completions
+
+    def _rank(self, name, quality):
+        return quality * (1.0 + math.log1p(self._entries[name]["visits"]))
+
+    # --- Updates ---
+
+    def add(self, name, url, source="bookmark"):
+        name = normalize(name)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            if entry is None:
+                self._insert(name, {"url": url, "visits": 0, "source": source})
+            else:
+                entry["url"] = url
+                entry["source"] = source
+            self._save()
+
+    def record_visit(self, name, url=None):
+        """
+        Count a visit so frequently opened sites rank higher; unknown names
+        are added to the history.
+        """
+        name = normalize(name)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(name)
+            if entry is None:
+                if not url:
+                    return
+                entry = self._insert(name, {"url": url, "visits": 0, "source": "history"})
+            entry["visits"] += 1
+            self._save()
+
+    def record_url(self, url):
+        name = name_for_url(url)
+        if name:
+            self.record_visit(name, url)
+
+    def _insert(self, name, entry):
+        self._entries[name] = entry
+        self._names.insert(bisect_left(self._names, name), name)
+        self._index_fuzzy(name)
+        return entry
+
+    def _index_fuzzy(self, name):
+        fuzzy = fuzzy_key(name)
+        self._by_key.setdefault(fuzzy, []).append(name)
+        self._ngrams.add(fuzzy)
+
+    # --- Persistence ---
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        self._names = []
+        for name, url in self._builtins.items():
+            self._entries[normalize(name)] = {"url": url, "visits": 0, "source": "builtin"}
+
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    stored = json.load(f)
+                for name, entry in stored.items():
+                    self._entries[normalize(name)] = entry
+            except Exception as e:
+                print(f"[DEBUG] Couldn't load site index: {e}")
+
+        self._names = sorted(self._entries)
+        for name in self._names:
+            self._index_fuzzy(name)
+
+    def _save(self):
+        if not self.path:
+            return
+        # Built-ins only need saving once the user has visited them
+        stored = {
+            name: entry
+            for name, entry in self._entries.items()
+            if entry["source"] != "builtin" or entry["visits"]
+        }
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[DEBUG] Couldn't save site index: {e}")
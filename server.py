@@ -0,0 +1,501 @@
+# server.py
+"""
+HTTP + WebSocket front-end that lets many clients share one assistant process.
+
+Endpoints:
+- GET  /health   -> {"status": "ok", ...}
+- GET  /metrics  -> metrics snapshot
+- POST /ask      -> body {"prompt": ..., "session_id"?: ..., "confirm"?: bool}
+- GET  /ws       -> WebSocket, JSON messages:
+    client: {"type": "ask", "id": ..., "prompt": ..., "session_id"?: ...}
+    client: {"type": "confirm_reply", "confirm_id": ..., "answer": bool}
+    server: {"type": "chunk", "id": ..., "text": ...}
+    server: {"type": "confirm", "id": ..., "confirm_id": ..., "question": ...}
+    server: {"type": "result", "id": ..., "action": ..., "result": ..., "session_id": ...}
+    server: {"type": "error", "id": ..., "error": ...}
+
+Web pages the user visits can reach localhost too, so requests carrying a
+browser Origin header are refused unless it is listed in SANE_ALLOWED_ORIGINS,
+/ask only accepts Content-Type: application/json (a page can't send that
+without a CORS preflight), and with SANE_SERVER_TOKEN set every endpoint but
+/health needs "Authorization: Bearer <token>".
+"""
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import functools
+import hashlib
+import hmac
+import json
+import os
+import struct
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import interaction
+import metrics
+import warmup
+from ai_brain import prompt_to_plan
+from task_router import execute_plan
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 32  # requests allowed to wait for a free worker
+CONFIRM_TIMEOUT = 120.0  # seconds a handler waits for a client's yes/no
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG, WS_CONTINUATION = 0x1, 0x8, 0x9, 0xA, 0x0
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    503: "Service Unavailable",
+}
+
+
+class ServerBusy(Exception):
+    """
+    Raised when the request queue is full.
+    """
+
+
+class AssistantServer:
+    """
+    Runs prompt_to_plan + execute_plan for many clients on a worker pool.
+    """
+
+    def __init__(
+        self,
+        host=DEFAULT_HOST,
+        port=DEFAULT_PORT,
+        workers=DEFAULT_WORKERS,
+        max_pending=DEFAULT_MAX_PENDING,
+        confirm_timeout=CONFIRM_TIMEOUT,
+        allowed_origins=None,
+        token=None,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_pending = max_pending
+        self.confirm_timeout = confirm_timeout
+        if allowed_origins is None:
+            allowed_origins = os.environ.get("SANE_ALLOWED_ORIGINS", "").split(",")
+        self.allowed_origins = {origin.strip().rstrip("/") for origin in allowed_origins if origin.strip()}
+        self.token = token if token is not None else os.environ.get("SANE_SERVER_TOKEN") or None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="assistant-worker"
+        )
+        self._active = 0  # requests running or waiting for a worker
+        self._server = None
+        self._started = time.time()
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"[LOG] Assistant server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Request execution ---
+
+    @property
+    def queue_depth(self):
+        return max(0, self._active - self.workers)
+
+    async def submit(self, prompt, session_id, confirmer, emitter=None):
+        """
+        Run one prompt on the worker pool, enforcing the queue limit.
+        """
+        if self._active >= self.workers + self.max_pending:
+            metrics.incr("server.rejected")
+            raise ServerBusy("Server is busy, please retry shortly.")
+
+        self._active += 1
+        metrics.set_gauge("server.queue_depth", self.queue_depth)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            job = functools.partial(
+                self._process, prompt, session_id, confirmer, emitter
+            )
+            return await loop.run_in_executor(self._executor, job)
+        finally:
+            self._active -= 1
+            metrics.set_gauge("server.queue_depth", self.queue_depth)
+            metrics.incr("server.requests")
+            metrics.observe("server.request", time.perf_counter() - start)
+
+    @staticmethod
+    def _process(prompt, session_id, confirmer, emitter):
+        with interaction.use_confirmer(confirmer), interaction.use_emitter(emitter):
+            plan = prompt_to_plan(prompt)
+            result = execute_plan(plan, session_id=session_id)
+        return plan.describe(), str(result)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime": round(time.time() - self._started, 1),
+            "workers": self.workers,
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "max_pending": self.max_pending,
+        }
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await _read_request(reader)
+            if request is None:
+                return
+            method, path, headers, body = request
+            if path != "/health":
+                self._check_access(headers)
+
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._handle_websocket(reader, writer, headers)
+            elif path == "/health" and method == "GET":
+                await _send_json(writer, 200, self.health())
+            elif path == "/metrics" and method == "GET":
+                await _send_json(writer, 200, metrics.snapshot())
+            elif path == "/ask":
+                if method != "POST":
+                    await _send_json(writer, 405, {"error": "Use POST."})
+                else:
+                    await self._handle_ask(writer, headers, body)
+            else:
+                await _send_json(writer, 404, {"error": f"Unknown path {path}"})
+        except _HttpError as e:
+            await _send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _check_access(self, headers):
+        """
+        Refuse requests from web pages that weren't allowed, and requests
+        without the shared token when one is configured.
+        """
+        origin = headers.get("origin")
+        if origin and origin.rstrip("/") not in self.allowed_origins:
+            metrics.incr("server.forbidden")
+            raise _HttpError(403, f"Origin {origin} is not allowed.")
+        if self.token:
+            supplied = headers.get("authorization", "")
+            if not hmac.compare_digest(supplied.encode(), f"Bearer {self.token}".encode()):
+                metrics.incr("server.unauthorized")
+                raise _HttpError(401, "Missing or wrong token.")
+
+    async def _handle_ask(self, writer, headers, body):
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise _HttpError(415, "Content-Type must be application/json.")
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise _HttpError(400, "Body must be JSON.")
+        prompt = str(payload.get("prompt", "")).strip()
+        if not prompt:
+            raise _HttpError(400, "Missing 'prompt'.")
+
+        # Plain HTTP cannot ask back, so confirmations take the client's preset answer
+        answer = bool(payload.get("confirm", False))
+        session_id = (
+            payload.get("session_id") or headers.get("x-session-id") or _new_session_id()
+        )
+        try:
+            action, result = await self.submit(
+                prompt, session_id, lambda question: answer
+            )
+        except ServerBusy as e:
+            await _send_json(writer, 503, {"error": str(e)}, {"Retry-After": "1"})
+            return
+        await _send_json(
+            writer, 200, {"session_id": session_id, "action": action, "result": result}
+        )
+
+    # --- WebSocket ---
+
+    async def _handle_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise _HttpError(400, "Missing Sec-WebSocket-Key.")
+        accept = base64.b64encode(
+            hashlib.sha1((key + WS_GUID).encode()).digest()
+        ).decode()
+        writer.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+
+        loop = asyncio.get_running_loop()
+        outbox = asyncio.Queue()
+        pending_confirms = {}
+        tasks = set()
+        connection_session = _new_session_id()
+
+        def send_threadsafe(message):
+            loop.call_soon_threadsafe(outbox.put_nowait, message)
+
+        async def write_loop():
+            while True:
+                message = await outbox.get()
+                if message is None:
+                    return
+                writer.write(_ws_frame(WS_TEXT, json.dumps(message).encode()))
+                await writer.drain()
+
+        async def run_ask(message):
+            request_id = message.get("id")
+            prompt = str(message.get("prompt", "")).strip()
+            if not prompt:
+                outbox.put_nowait({"type": "error", "id": request_id, "error": "Missing 'prompt'."})
+                return
+            session_id = message.get("session_id") or connection_session
+
+            def confirmer(question):
+                confirm_id = uuid.uuid4().hex
+                future = concurrent.futures.Future()
+                pending_confirms[confirm_id] = future
+                send_threadsafe(
+                    {
+                        "type": "confirm",
+                        "id": request_id,
+                        "confirm_id": confirm_id,
+                        "question": question,
+                    }
+                )
+                try:
+                    return future.result(timeout=self.confirm_timeout)
+                except concurrent.futures.TimeoutError:
+                    return False
+                finally:
+                    pending_confirms.pop(confirm_id, None)
+
+            def emitter(text):
+                send_threadsafe({"type": "chunk", "id": request_id, "text": text})
+
+            try:
+                action, result = await self.submit(prompt, session_id, confirmer, emitter)
+                outbox.put_nowait(
+                    {
+                        "type": "result",
+                        "id": request_id,
+                        "action": action,
+                        "result": result,
+                        "session_id": session_id,
+                    }
+                )
+            except Exception as e:
+                outbox.put_nowait({"type": "error", "id": request_id, "error": str(e)})
+
+        writer_task = asyncio.create_task(write_loop())
+        try:
+            while True:
+                opcode, payload = await _ws_read_message(reader, writer)
+                if opcode == WS_CLOSE:
+                    break
+                if opcode != WS_TEXT:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except json.JSONDecodeError:
+                    outbox.put_nowait({"type": "error", "error": "Messages must be JSON."})
+                    continue
+
+                if message.get("type") == "ask":
+                    task = asyncio.create_task(run_ask(message))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif message.get("type") == "confirm_reply":
+                    future = pending_confirms.get(message.get("confirm_id"))
+                    if future is not None and not future.done():
+                        future.set_result(bool(message.get("answer")))
+                else:
+                    outbox.put_nowait({"type": "error", "error": "Unknown message type."})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Anything still waiting on this client is declined
+            for future in list(pending_confirms.values()):
+                if not future.done():
+                    future.set_result(False)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            outbox.put_nowait(None)
+            try:
+                await writer_task
+                writer.write(_ws_frame(WS_CLOSE, b""))
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+class _HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _new_session_id():
+    return uuid.uuid4().hex
+
+
+async def _read_request(reader):
+    """
+    Parse one HTTP/1.1 request. Returns (method, path, headers, body) or None on EOF.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise _HttpError(413, "Headers too large.")
+    if len(head) > MAX_HEADER_BYTES:
+        raise _HttpError(413, "Headers too large.")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise _HttpError(400, "Malformed request line.")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    length = headers.get("content-length", "0") or "0"
+    if not length.isdecimal():  # also rejects "-1" and "+5"
+        raise _HttpError(400, f"Invalid Content-Length: {length!r}.")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise _HttpError(413, "Body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, headers, body
+
+
+async def _send_json(writer, status, payload, extra_headers=None):
+    body = json.dumps(payload).encode()
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        "Connection": "close",
+        **(extra_headers or {}),
+    }
+    head = f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n" + "".join(
+        f"{name}: {value}\r\n" for name, value in headers.items()
+    )
+    writer.write(head.encode() + b"\r\n" + body)
+    await writer.drain()
+
+
+def _ws_frame(opcode, payload):
+    """
+    Build one unmasked (server -> client) WebSocket frame.
+    """
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", length)
+    else:
+        header += bytes([127]) + struct.pack("!Q", length)
+    return header + payload
+
+
+async def _ws_read_frame(reader):
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ConnectionError("WebSocket frame too large.")
+    mask = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return fin, opcode, payload
+
+
+async def _ws_read_message(reader, writer):
+    """
+    Read one complete data message, answering pings and joining fragments.
+    """
+    opcode, parts = None, []
+    while True:
+        fin, frame_opcode, payload = await _ws_read_frame(reader)
+        if frame_opcode == WS_PING:
+            writer.write(_ws_frame(WS_PONG, payload))
+            await writer.drain()
+            continue
+        if frame_opcode == WS_PONG:
+            continue
+        if frame_opcode == WS_CLOSE:
+            return WS_CLOSE, payload
+        if frame_opcode != WS_CONTINUATION:
+            opcode, parts = frame_opcode, []
+        parts.append(payload)
+        if fin:
+            return opcode, b"".join(parts).decode("utf-8", errors="replace")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Sane-AI assistant server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING)
+    args = parser.parse_args()
+
+    server = AssistantServer(args.host, args.port, args.workers, args.max_pending)
+    warmup.start()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("[LOG] Server stopped.")
+
+
+if __name__ == "__main__":
+    main()
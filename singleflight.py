@@ -0,0 +1,239 @@
+# singleflight.py
+"""
+Coalesce identical concurrent calls into one.
+
+When the GUI, the voice loop and a batch job ask the LLM the same thing at
+the same moment, only the first caller (the leader) makes the request; the
+others wait for it and get the same result or error. A streamed response is
+fanned out: every caller gets its own iterator over the same chunks, and
+callers that join late first replay the chunks they missed.
+"""
+import json
+import threading
+
+import cancellation
+
+# How often a waiting caller checks whether it has been cancelled
+POLL_INTERVAL = 0.05
+
+
+def request_key(kwargs, ignore=("timeout",)):
+    """
+    Canonical key for a chat completions request: model, messages and every
+    parameter, except ones that don't change the answer.
+    """
+    return json.dumps(
+        {k: v for k, v in kwargs.items() if k not in ignore},
+        sort_keys=True,
+        default=repr,
+    )
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """
+    Table of calls in flight, keyed by request.
+
+    `do(key, fn)` runs `fn()` unless a call with the same key is already
+    running, in which case it waits for that one instead. With `stream=True`
+    the result is treated as an iterator of chunks and each caller receives a
+    separate `Subscription` to it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def do(self, key, fn, stream=False):
+        """
+        Return (result, shared), where `shared` is True if another caller's
+        request was reused.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+
+            if leader:
+                return self._lead(key, flight, fn, stream), False
+
+            _wait(flight.done)
+            # The leader gave up because *its* caller was cancelled; that
+            # says nothing about this caller, so try again (possibly as leader)
+            if isinstance(flight.error, cancellation.Cancelled):
+                continue
+            if flight.error is not None:
+                raise flight.error
+            if stream:
+                subscription = flight.result.subscribe()
+                if subscription is None:  # stream already abandoned
+                    continue
+                return subscription, True
+            return flight.result, True
+
+    def _lead(self, key, flight, fn, stream):
+        try:
+            result = fn()
+        except BaseException as e:
+            flight.error = e
+            self._forget(key, flight)
+            flight.done.set()
+            raise
+
+        if not stream:
+            flight.result = result
+            self._forget(key, flight)
+            flight.done.set()
+            return result
+
+        # A stream stays joinable until its last chunk has been read
+        broadcast = Broadcast(result, on_finish=lambda: self._forget(key, flight))
+        flight.result = broadcast
+        subscription = broadcast.subscribe()
+        flight.done.set()
+        return subscription
+
+    def _forget(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+
+def _wait(event):
+    """
+    Block until `event` is set, giving up if the current handler is cancelled.
+    """
+    while not event.wait(POLL_INTERVAL):
+        cancellation.check()
+
+
+class Broadcast:
+    """
+    Fans one chunk iterator out to several subscribers.
+
+    Chunks are kept until the stream ends so that late subscribers can catch
+    up. Whichever subscriber is furthest ahead pulls the next chunk from the
+    source; the others are woken when it arrives. The source is closed once
+    every subscriber has closed early.
+    """
+
+    def __init__(self, source, on_finish=None):
+        self._source = iter(source)
+        self._close_source = getattr(source, "close", None)
+        self._on_finish = on_finish
+        self._cond = threading.Condition()
+        self._chunks = []
+        self._finished = False
+        self._error = None
+        self._pulling = False
+        self._subscribers = 0
+
+    def subscribe(self):
+        """
+        A new iterator from the first chunk, or None if the stream was abandoned.
+        """
+        with self._cond:
+            if self._finished and self._error is _ABANDONED:
+                return None
+            self._subscribers += 1
+        return Subscription(self)
+
+    def _get(self, index):
+        """
+        Chunk number `index`; raises StopIteration at the end of the stream.
+        """
+        with self._cond:
+            while True:
+                if index < len(self._chunks):
+                    return self._chunks[index]
+                if self._finished:
+                    if self._error is not None and self._error is not _ABANDONED:
+                        raise self._error
+                    raise StopIteration
+                if not self._pulling:
+                    self._pulling = True
+                    break
+                self._cond.wait(POLL_INTERVAL)
+                cancellation.check()
+
+        # Read from the source without holding the lock, so others can
+        # still replay buffered chunks or unsubscribe meanwhile
+        try:
+            chunk = next(self._source)
+        except StopIteration:
+            self._finish(None)
+            raise
+        except BaseException as e:
+            self._finish(e)
+            raise
+        with self._cond:
+            self._chunks.append(chunk)
+            self._pulling = False
+            self._cond.notify_all()
+        return chunk
+
+    def _finish(self, error):
+        with self._cond:
+            if self._finished:
+                return
+            self._finished = True
+            self._error = error
+            self._pulling = False
+            self._cond.notify_all()
+        if self._on_finish:
+            self._on_finish()
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+            abandon = self._subscribers == 0 and not self._finished
+        if abandon:
+            self._finish(_ABANDONED)
+            if self._close_source:
+                self._close_source()
+
+
+# Marks a stream that was closed before its end because nobody was reading it
+_ABANDONED = object()
+
+
+class Subscription:
+    """
+    One caller's view of a Broadcast; iterate it like the original stream.
+    """
+
+    def __init__(self, broadcast):
+        self._broadcast = broadcast
+        self._index = 0
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            chunk = self._broadcast._get(self._index)
+        except BaseException:  # StopIteration included
+            self.close()
+            raise
+        self._index += 1
+        return chunk
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._broadcast._unsubscribe()
@@ -0,0 +1,319 @@
+# soak.py
+"""
+Soak test: drive thousands of simulated requests through route_task and
+watch memory.
+
+The LLM, package manager, browser and storage files are replaced by local
+stand-ins, so a run needs no network and changes nothing outside a
+temporary directory. Every `sample_every` requests the harness records RSS
+(from /proc/self/statm), tracemalloc's traced memory and the size of the
+structures that tend to grow. At the end it fits a line through the traced
+memory after warm-up and fails if it grows faster than `max_slope_kb`
+kilobytes per 1000 requests.
+
+    python soak.py --requests 5000 --max-slope-kb 64
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from types import SimpleNamespace
+
+import interaction
+import metrics
+from modules import install_apps, knowledge_base, llm_chat, open_web, send_email
+from modules.chat_sessions import SessionStore
+from modules.email_outbox import Outbox, SmtpConfig
+from modules.site_index import SiteIndex
+from task_router import route_task
+
+# The workload remembers 100 distinct notes, one every len(WORKLOAD) requests,
+# so the memory store and its duplicate index only stop growing after ~700
+# requests; the warm-up has to cover that (3000 * 0.3 = 900).
+DEFAULT_REQUESTS = 3000
+DEFAULT_SAMPLE_EVERY = 100
+DEFAULT_WARMUP = 0.3  # fraction of samples ignored while caches fill up
+DEFAULT_MAX_SLOPE_KB = 64.0  # allowed traced growth per 1000 requests
+TOP_ALLOCATORS = 10
+SESSIONS = 8  # chat sessions the simulated clients rotate through
+
+# Actions sent in rotation; {i} is the request number
+WORKLOAD = [
+    "chat what is {i} times {i}?",
+    "install vlc",
+    "open youtube",
+    "open www.site{site}.com",
+    "remember soak note number {note}",
+    "recall soak note",
+    "send email to soak@example.com hello {i}",
+]
+
+Sample = namedtuple("Sample", ["requests", "elapsed", "rss_kb", "traced_kb", "sizes"])
+SoakReport = namedtuple(
+    "SoakReport", ["samples", "slope_kb", "rss_slope_kb", "top_allocators", "passed"]
+)
+
+
+class StandInLLM:
+    """
+    Answers every chat completion locally with a short canned reply.
+    """
+
+    def __init__(self, chunks=12):
+        self.chunks = chunks
+
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return self._stream()
+        message = SimpleNamespace(content="None")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def _stream(self):
+        for i in range(self.chunks):
+            delta = SimpleNamespace(content=f"word{i} ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class StandInSmtp:
+    """
+    Accepts every message without a network connection.
+    """
+
+    config = SmtpConfig("localhost", 25, None, None, "soak@example.com", False, 5)
+    is_open = True
+
+    def send(self, message):
+        pass
+
+    def close(self):
+        pass
+
+
+def _stand_in_command(command):
+    # Package managers print a lot; this exercises install_apps' output cap
+    return {"success": True, "stdout": "Setting up...\n" * 2000, "stderr": "", "exit_code": 0}
+
+
+def _stand_in_package_manager():
+    return {
+        "name": "apt",
+        "install_cmd": ["sudo", "apt-get", "install", "-y"],
+        "check_cmd": ["dpkg", "-s"],
+        "check_success_pattern": "Status: install ok installed",
+        "install_success_pattern": "Setting up",
+    }
+
+
+@contextlib.contextmanager
+def _swapped(target, **attributes):
+    saved = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+
+@contextlib.contextmanager
+def stand_ins(workdir):
+    """
+    Point every module route_task reaches at local stand-ins inside `workdir`.
+    """
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(
+            _swapped(
+                llm_chat,
+                llm=StandInLLM(),
+                response_cache=None,
+                chat_history=[{"role": "system", "content": llm_chat.SYSTEM_PROMPT}],
+                session_store=SessionStore(
+                    os.path.join(workdir, "sessions"),
+                    max_messages=llm_chat.MAX_HISTORY_MESSAGES,
+                ),
+            )
+        )
+        stack.enter_context(
+            _swapped(
+                install_apps,
+                llm=StandInLLM(),
+                MEMORY_FILE=os.path.join(workdir, "apps.json"),
+                _execute_command=_stand_in_command,
+                _get_package_manager_commands=_stand_in_package_manager,
+            )
+        )
+        stack.enter_context(
+            _swapped(
+                open_web,
+                webbrowser=SimpleNamespace(open=lambda url: True),
+                site_index=SiteIndex(os.path.join(workdir, "sites.json")),
+            )
+        )
+        stack.enter_context(
+            _swapped(knowledge_base, MEMORY_FILE=os.path.join(workdir, "memory.json"))
+        )
+        outbox = Outbox(StandInSmtp(), os.path.join(workdir, "outbox")).start()
+        stack.callback(outbox.stop)
+        stack.enter_context(_swapped(send_email, get_outbox=lambda: outbox))
+        stack.enter_context(interaction.use_confirmer(lambda question: True))
+        yield
+
+
+def rss_kb():
+    """
+    Resident set size of this process in KB, or None where /proc is missing.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024
+
+
+def _file_kb(path):
+    return os.path.getsize(path) / 1024 if os.path.exists(path) else 0.0
+
+
+def _directory_kb(path):
+    return sum(
+        _file_kb(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files
+    )
+
+
+def structure_sizes(workdir):
+    """
+    Sizes of the structures that grow with use (entries, or KB on disk).
+    """
+    return {
+        "chat_history": len(llm_chat.chat_history),
+        "sessions_loaded": llm_chat.session_store.loaded_count(),
+        "sites": len(open_web.site_index),
+        "email_queue": len(send_email.get_outbox()),
+        "metric_series": sum(len(part) for part in metrics.snapshot().values()),
+        "memory_json_kb": round(_file_kb(knowledge_base.MEMORY_FILE), 1),
+        "sessions_kb": round(_directory_kb(os.path.join(workdir, "sessions")), 1),
+    }
+
+
+def fit_slope(xs, ys):
+    """
+    Least-squares slope of ys over xs (0.0 if it cannot be fitted).
+    """
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def _action(i):
+    template = WORKLOAD[i % len(WORKLOAD)]
+    return template.format(i=i, site=i % 50, note=i % 100)
+
+
+def run_soak(
+    requests=DEFAULT_REQUESTS,
+    sample_every=DEFAULT_SAMPLE_EVERY,
+    warmup=DEFAULT_WARMUP,
+    max_slope_kb=DEFAULT_MAX_SLOPE_KB,
+    top=TOP_ALLOCATORS,
+    log=print,
+):
+    """
+    Run the soak test and return a SoakReport. Slopes are KB per 1000 requests.
+    """
+    samples = []
+    baseline = None
+    warmup_samples = max(1, int(requests / sample_every * warmup))
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as workdir, stand_ins(workdir):
+        with open(os.devnull, "w") as devnull:
+            start = time.perf_counter()
+            for i in range(1, requests + 1):
+                # Handlers print a log line per step; keep that out of the report
+                # Every other request uses the global chat history instead of a session
+                session_id = f"soak-{i % SESSIONS}" if i % 2 else None
+                with contextlib.redirect_stdout(devnull):
+                    route_task(_action(i), session_id=session_id)
+                if i % sample_every:
+                    continue
+                gc.collect()
+                sample = Sample(
+                    requests=i,
+                    elapsed=round(time.perf_counter() - start, 2),
+                    rss_kb=rss_kb(),
+                    traced_kb=round(tracemalloc.get_traced_memory()[0] / 1024, 1),
+                    sizes=structure_sizes(workdir),
+                )
+                samples.append(sample)
+                if len(samples) == warmup_samples:
+                    baseline = tracemalloc.take_snapshot()
+                log(f"[LOG] {json.dumps(sample._asdict())}")
+            final = tracemalloc.take_snapshot()
+
+    if started_tracing:
+        tracemalloc.stop()
+
+    steady = samples[warmup_samples - 1 :]
+    xs = [sample.requests / 1000 for sample in steady]
+    slope_kb = fit_slope(xs, [sample.traced_kb for sample in steady])
+    rss = [sample.rss_kb for sample in steady]
+    rss_slope_kb = fit_slope(xs, rss) if None not in rss else None
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    top_allocators = []
+    if baseline is not None:
+        stats = final.filter_traces(filters).compare_to(baseline.filter_traces(filters), "lineno")
+        top_allocators = [str(stat) for stat in stats[:top]]
+
+    return SoakReport(samples, slope_kb, rss_slope_kb, top_allocators, slope_kb <= max_slope_kb)
+
+
+def print_report(report, max_slope_kb, log=print):
+    last = report.samples[-1] if report.samples else None
+    if last:
+        log(f"[LOG] {last.requests} requests in {last.elapsed}s")
+        log(f"[LOG] Structure sizes: {last.sizes}")
+    log(f"[LOG] Traced memory growth: {report.slope_kb:.1f} KB per 1000 requests (limit {max_slope_kb})")
+    if report.rss_slope_kb is not None:
+        log(f"[LOG] RSS growth: {report.rss_slope_kb:.1f} KB per 1000 requests")
+    if report.top_allocators:
+        log("[LOG] Top allocators since warm-up:")
+        for line in report.top_allocators:
+            log(f"    {line}")
+    if report.passed:
+        log("[LOG] Soak test passed.")
+    else:
+        log("[ERROR] Memory grows faster than allowed; see the allocators above.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test route_task for memory growth.")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--sample-every", type=int, default=DEFAULT_SAMPLE_EVERY)
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP)
+    parser.add_argument("--max-slope-kb", type=float, default=DEFAULT_MAX_SLOPE_KB)
+    parser.add_argument("--top", type=int, default=TOP_ALLOCATORS)
+    args = parser.parse_args()
+
+    report = run_soak(args.requests, args.sample_every, args.warmup, args.max_slope_kb, args.top)
+    print_report(report, args.max_slope_kb)
+    raise SystemExit(0 if report.passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,23 @@
+import threading
+
 import pyttsx3
 import sys
 
-engine = pyttsx3.init()
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    The text-to-speech engine, initialized on first use. Some drivers (SAPI5,
+    NSSpeechSynthesizer) are tied to the creating thread, so this should first
+    be called from the thread that will speak.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = pyttsx3.init()
+        return _engine
 
 
 def speak(text):
@@ -9,9 +25,22 @@ def speak(text):
     Speak text aloud.
     """
     # print(f"Assistant: {text}")
+    engine = get_engine()
     engine.say(text)
     engine.runAndWait()
 
 
+def stop():
+    """
+    Interrupt whatever is being spoken (used for barge-in).
+    """
+    if _engine is None:
+        return
+    try:
+        _engine.stop()
+    except Exception as e:
+        print(f"[DEBUG] Couldn't stop speech: {e}")
+
+
 if __name__ == "__main__":
     speak("Hello! I am your assistant. How can I help you today?")
@@ -1,19 +1,209 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cancellation
+import metrics
 from modules import install_apps, send_email, knowledge_base, open_web, llm_chat
 
+# Upper bound on actions of one plan running at the same time
+PLAN_WORKERS = 4
+
+# Seconds each route may run before it is cancelled. Override per route with
+# SANE_DEADLINE_<ROUTE> (e.g. SANE_DEADLINE_INSTALL=1800); 0 means no deadline.
+DEFAULT_DEADLINES = {
+    "install": 900.0,  # includes waiting for the user's confirmation
+    "open": 120.0,  # downloads
+    "email": 15.0,  # only queues the message
+    "memory": 60.0,  # recall answers stream at the pace they are read out
+    "chat": 90.0,
+}
+# How long a cancelled handler gets to clean up and return a partial answer
+CANCEL_GRACE = 2.0
+
+
+def deadline_for(route):
+    value = os.environ.get(f"SANE_DEADLINE_{route.upper()}")
+    if value:
+        try:
+            return float(value) or None
+        except ValueError:
+            print(f"[DEBUG] Ignoring invalid SANE_DEADLINE_{route.upper()}={value!r}")
+    return DEFAULT_DEADLINES.get(route)
 
-def route_task(action):
+
+def _select(action, session_id):
     """
-    Figure out which module should handle the action.
+    Pick the route name and handler for an action. Routes are chosen on the
+    lowercased text; the email route gets the original so the subject and
+    body keep their case.
     """
-    action = action.lower()
-    # print(f'this is printed in route task {action}')
+    original, action = action, action.lower()
     if action.startswith("install"):
-        return install_apps.handle(action)
+        return "install", lambda: install_apps.handle(action)
     elif action.startswith("open"):
-        return open_web.handle(action)
+        return "open", lambda: open_web.handle(action)
     elif action.startswith("send email"):
-        return send_email.handle(action)
-    elif action.startswith("remember") or action.startswith("recall"):
-        return knowledge_base.handle(action)
+        return "email", lambda: send_email.handle(original)
+    elif action.startswith(("remember", "recall", "compact memories")):
+        return "memory", lambda: knowledge_base.handle(action)
     else:
-        return llm_chat.handle(action)
+        return "chat", lambda: llm_chat.handle(action, session_id=session_id)
+
+
+def route_task(action, session_id=None):
+    """
+    Figure out which module should handle the action and run it within the
+    route's deadline. `session_id` selects the chat conversation used by llm_chat.
+    """
+    route, handler = _select(action, session_id)
+    return run_with_deadline(route, handler, deadline_for(route))
+
+
+def run_with_deadline(route, handler, timeout):
+    """
+    Run `handler()` on a worker thread under a CancellationToken. When
+    `timeout` passes the token is cancelled; a handler that stops within
+    CANCEL_GRACE may still return a partial answer, otherwise a timeout
+    message is returned and the thread is left to wind down on its own.
+    If the caller runs under a token of its own (the voice pipeline cancels
+    one when the user talks over it), cancelling that cancels the handler
+    too and raises Cancelled here.
+    """
+    cancellation.check()
+    metrics.incr(f"route.{route}.calls")
+    token = cancellation.CancellationToken(timeout)
+    outcome = {}
+    finished = threading.Event()
+    # Set when the handler finishes or the token is cancelled, whichever is first
+    woken = threading.Event()
+    token.on_cancel(woken.set)
+    parent = cancellation.current()
+    unlink = (
+        parent.on_cancel(lambda: token.cancel(parent.reason))
+        if parent is not None
+        else (lambda: None)
+    )
+
+    def run():
+        try:
+            with cancellation.use(token):
+                outcome["result"] = handler()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            finished.set()
+            woken.set()
+
+    start = time.perf_counter()
+    # A copy of the caller's context keeps confirm/emit handlers in effect
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), name=f"route-{route}", daemon=True).start()
+
+    try:
+        woken.wait(timeout)
+        if not finished.is_set():
+            if not token.cancelled:
+                token.cancel("deadline exceeded")
+                metrics.incr(f"route.{route}.timeouts")
+                print(f"[LOG] '{route}' took longer than {timeout:g}s; cancelling it.")
+            finished.wait(CANCEL_GRACE)
+    finally:
+        unlink()
+    metrics.observe(f"route.{route}", time.perf_counter() - start)
+
+    if parent is not None and parent.cancelled:
+        raise cancellation.Cancelled(parent.reason)
+    if not finished.is_set() or isinstance(outcome.get("error"), cancellation.Cancelled):
+        return f"Sorry, that took too long (more than {timeout:g} seconds), so I stopped it."
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+# Verbs that read or write the same state; actions sharing one run in order
+SHARED_RESOURCES = {
+    "remember": "memory",
+    "recall": "memory",
+    "compact memories": "memory",
+}
+
+
+def _dependencies(actions):
+    """
+    Indices each action has to wait for: its explicit `depends_on`, plus the
+    previous action using the same resource, since e.g. two installs share
+    one package manager and a recall must not read memory.json while a
+    remember is still writing it.
+    """
+    last_by_resource = {}
+    dependencies = []
+    for index, action in enumerate(actions):
+        needed = {i for i in action.depends_on if 0 <= i < index}
+        resource = SHARED_RESOURCES.get(action.verb, action.verb)
+        if resource in last_by_resource:
+            needed.add(last_by_resource[resource])
+        last_by_resource[resource] = index
+        dependencies.append(needed)
+    return dependencies
+
+
+def execute_plan(plan, session_id=None, max_workers=PLAN_WORKERS):
+    """
+    Run every action of an ai_brain.Plan, independent actions concurrently,
+    and return the combined result. A single action returns route_task's
+    result unchanged.
+    """
+    actions = plan.actions
+    metrics.incr("plan.actions", len(actions))
+    if len(actions) == 1:
+        return route_task(actions[0].to_command(), session_id=session_id)
+
+    start = time.perf_counter()
+    dependencies = _dependencies(actions)
+    results = [None] * len(actions)
+    failed = set()
+    done = set()
+    running = {}
+
+    def run(index):
+        return route_task(actions[index].to_command(), session_id=session_id)
+
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(actions)), thread_name_prefix="plan"
+    ) as executor:
+        while len(done) < len(actions):
+            for index in range(len(actions)):
+                if index in done or index in running.values():
+                    continue
+                if not dependencies[index] <= done:
+                    continue
+                blocked = sorted(dependencies[index] & failed)
+                if blocked:
+                    names = ", ".join(actions[i].to_command() for i in blocked)
+                    results[index] = f"Skipped because '{names}' failed."
+                    failed.add(index)
+                    done.add(index)
+                    continue
+                # Each task gets a copy of the caller's context so confirm/emit
+                # handlers installed by the front-end still apply
+                context = contextvars.copy_context()
+                running[executor.submit(context.run, run, index)] = index
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Action '{actions[index].to_command()}' failed: {e}")
+                    results[index] = f"An error occurred: {e}"
+                    failed.add(index)
+                done.add(index)
+
+    metrics.observe("plan.execute", time.perf_counter() - start)
+    return "\n".join(f"{i + 1}. {result}" for i, result in enumerate(results))
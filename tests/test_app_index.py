@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import timeit
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.app_index import AppIndex, compact
+from modules.fuzzy_index import NgramIndex
+
+
+class TestNgramIndex(unittest.TestCase):
+
+    def test_search_ranks_closest_first(self):
+        index = NgramIndex(["chrome", "chromium", "firefox"])
+        results = index.search("chrom")
+        self.assertEqual([key for key, _ in results[:2]], ["chrome", "chromium"])
+        self.assertEqual(index.search("chrome")[0], ("chrome", 1.0))
+
+    def test_remove(self):
+        index = NgramIndex(["chrome", "firefox"])
+        index.remove("chrome")
+        self.assertNotIn("chrome", index)
+        self.assertEqual(index.search("chrome"), [])
+
+
+class TestAppIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AppIndex(
+            ["chrome", "visual studio code", "7zip", "python3", "zoom", "sublime text", "slack", "skype"],
+            {"vscode": "visual studio code", "code": "visual studio code", "7-zip": "7zip", "python": "python3"},
+        )
+
+    def test_compact(self):
+        self.assertEqual(compact("VS-Code"), "vscode")
+
+    def test_exact_and_alias(self):
+        self.assertEqual(self.index.resolve("chrome"), ("chrome", 1.0, []))
+        self.assertEqual(self.index.resolve("VS Code").name, "visual studio code")
+        self.assertEqual(self.index.resolve("code").name, "visual studio code")
+        self.assertEqual(self.index.resolve("7-Zip").name, "7zip")
+
+    def test_misspellings_are_suggested(self):
+        for typo, expected in [("crome", "chrome"), ("pyhton", "python3"), ("zom", "zoom"), ("sublime", "sublime text")]:
+            resolution = self.index.resolve(typo)
+            self.assertIsNone(resolution.name, typo)
+            self.assertEqual(resolution.suggestions[0], expected, typo)
+            self.assertLess(resolution.confidence, 1.0)
+
+    def test_other_products_are_never_accepted(self):
+        for text in ["tor browser", "chromium", "zoomit", "gist"]:
+            self.assertIsNone(self.index.resolve(text).name, text)
+
+    def test_ambiguous_input_returns_suggestions(self):
+        resolution = self.index.resolve("sk")
+        self.assertIsNone(resolution.name)
+        self.assertIn("skype", resolution.suggestions)
+
+    def test_unknown_app(self):
+        self.assertEqual(self.index.resolve("notepad"), (None, 0.0, []))
+
+    def test_unknown_alias_target(self):
+        with self.assertRaises(ValueError):
+            AppIndex(["chrome"], {"ff": "firefox"})
+
+    def test_lookup_is_fast(self):
+        seconds = timeit.timeit(lambda: self.index.resolve("vscode"), number=1000) / 1000
+        self.assertLess(seconds, 0.0005)
+
+
+if __name__ == '__main__':
+    unittest.main()
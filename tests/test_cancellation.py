@@ -0,0 +1,180 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cancellation
+import metrics
+import task_router
+from modules import install_apps, llm_chat
+
+
+class TestCancellationToken(unittest.TestCase):
+
+    def test_deadline(self):
+        now = [0.0]
+        token = cancellation.CancellationToken(5, clock=lambda: now[0])
+        token.check()
+        self.assertEqual(token.remaining(), 5)
+        now[0] = 5.0
+        with self.assertRaises(cancellation.Cancelled):
+            token.check()
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, "deadline exceeded")
+
+    def test_on_cancel_runs_callbacks_once(self):
+        token = cancellation.CancellationToken()
+        calls = []
+        with cancellation.use(token):
+            with cancellation.on_cancel(lambda: calls.append("inside")):
+                token.cancel()
+                token.cancel()
+            with cancellation.on_cancel(lambda: calls.append("late")):
+                pass
+            self.assertTrue(cancellation.is_cancelled())
+        self.assertEqual(calls, ["inside", "late"])
+        self.assertFalse(cancellation.is_cancelled())
+
+    def test_unregistered_after_block(self):
+        token = cancellation.CancellationToken()
+        calls = []
+        with cancellation.use(token):
+            with cancellation.on_cancel(lambda: calls.append("x")):
+                pass
+        token.cancel()
+        self.assertEqual(calls, [])
+
+    def test_check_without_token(self):
+        cancellation.check()
+        self.assertIsNone(cancellation.current())
+
+
+class TestRouteDeadlines(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    @patch('task_router.CANCEL_GRACE', 0.5)
+    def test_timeout_returns_message_and_counts(self):
+        def slow():
+            while True:
+                cancellation.check()
+                time.sleep(0.01)
+
+        start = time.perf_counter()
+        response = task_router.run_with_deadline("chat", slow, 0.1)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertIn("took too long", response)
+        self.assertEqual(metrics.count("route.chat.timeouts"), 1)
+        self.assertEqual(metrics.count("route.chat.calls"), 1)
+
+    @patch('task_router.CANCEL_GRACE', 0.1)
+    def test_stuck_handler_is_abandoned(self):
+        release = threading.Event()
+        start = time.perf_counter()
+        response = task_router.run_with_deadline("open", lambda: release.wait(5), 0.1)
+        release.set()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("took too long", response)
+
+    def test_handler_result_and_errors_pass_through(self):
+        self.assertEqual(task_router.run_with_deadline("memory", lambda: "ok", 1), "ok")
+        with self.assertRaises(ValueError):
+            task_router.run_with_deadline("memory", lambda: int("x"), 1)
+        self.assertEqual(metrics.count("route.memory.timeouts"), 0)
+
+    def test_cancelling_the_caller_cancels_the_handler(self):
+        caller = cancellation.CancellationToken()
+        stopped = threading.Event()
+
+        def slow():
+            cancellation.current().wait(5)
+            stopped.set()
+
+        threading.Timer(0.1, caller.cancel, args=("interrupted",)).start()
+        start = time.perf_counter()
+        with cancellation.use(caller), self.assertRaises(cancellation.Cancelled):
+            task_router.run_with_deadline("chat", slow, 30)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertTrue(stopped.wait(1))
+        self.assertEqual(metrics.count("route.chat.timeouts"), 0)
+
+    @patch.dict(os.environ, {"SANE_DEADLINE_INSTALL": "5", "SANE_DEADLINE_CHAT": "0"})
+    def test_deadline_from_env(self):
+        self.assertEqual(task_router.deadline_for("install"), 5)
+        self.assertIsNone(task_router.deadline_for("chat"))
+        self.assertEqual(task_router.deadline_for("email"), task_router.DEFAULT_DEADLINES["email"])
+
+    @patch.dict(os.environ, {"SANE_DEADLINE_CHAT": "0.2"})
+    @patch('task_router.llm_chat.handle')
+    def test_route_task_applies_route_deadline(self, mock_handle):
+        mock_handle.side_effect = lambda action, session_id=None: cancellation.current().remaining()
+        remaining = task_router.route_task("chat hello")
+        self.assertLessEqual(remaining, 0.2)
+        self.assertEqual(metrics.count("route.chat.calls"), 1)
+
+
+class TestHandlerCancellation(unittest.TestCase):
+
+    def setUp(self):
+        llm_chat.chat_history = [
+            {"role": "system", "content": "You are a helpful AI assistant."},
+        ]
+
+    @patch('modules.llm_chat.client.chat.completions.create')
+    def test_chat_returns_partial_answer(self, mock_create):
+        def stream():
+            for word in ["Half ", "an ", "answer"]:
+                chunk = MagicMock()
+                chunk.choices[0].delta.content = word
+                yield chunk
+                if word == "an ":
+                    cancellation.current().cancel()
+
+        mock_create.return_value = stream()
+        token = cancellation.CancellationToken()
+        with cancellation.use(token):
+            response = llm_chat.handle("chat tell me a story")
+        self.assertEqual(response, "Half an\n(Answer cut off because it took too long.)")
+        self.assertEqual(len(llm_chat.chat_history), 1)
+
+    @unittest.skipIf(os.name == "nt", "uses sleep")
+    @patch('modules.install_apps.KILL_GRACE', 0.2)
+    def test_command_is_killed_on_deadline(self):
+        token = cancellation.CancellationToken()
+        threading.Timer(0.2, token.cancel).start()
+        start = time.perf_counter()
+        with cancellation.use(token):
+            result = install_apps._execute_command(["sh", "-c", "sleep 30 & sleep 30"])
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertFalse(result["success"])
+        self.assertIn("Cancelled", result["stderr"])
+
+    @unittest.skipIf(os.name == "nt", "process groups are POSIX only")
+    @patch('modules.install_apps.subprocess.Popen')
+    def test_sudo_keeps_the_terminal(self, mock_popen):
+        mock_popen.return_value.communicate.return_value = ("", "")
+        mock_popen.return_value.returncode = 0
+        install_apps._execute_command(["sudo", "apt-get", "install", "-y", "vlc"])
+        self.assertFalse(mock_popen.call_args.kwargs["start_new_session"])
+
+        install_apps._execute_command(["brew", "install", "vlc"])
+        self.assertTrue(mock_popen.call_args.kwargs["start_new_session"])
+
+    @unittest.skipIf(os.name == "nt", "uses signals")
+    @patch('modules.install_apps.os.killpg')
+    def test_sudo_is_stopped_through_sudo(self, mock_killpg):
+        process = MagicMock()
+        process.poll.return_value = None
+        install_apps._stop_process_tree(process, own_group=False)
+        process.send_signal.assert_called_once_with(install_apps.signal.SIGTERM)
+        mock_killpg.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
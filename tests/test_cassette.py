@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cassette
+import metrics
+from cassette import Cassette, CassetteMiss
+from llm_resilience import ResilientLLM
+
+
+def _completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "run.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_record_then_replay_completion(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _completion("install vlc")
+        request = {"model": "m", "messages": [{"role": "user", "content": "get vlc"}], "temperature": 0.1}
+
+        with cassette.use(self.path, cassette.RECORD):
+            ResilientLLM(client).create(**request)
+
+        offline = MagicMock()
+        with cassette.use(self.path, cassette.REPLAY):
+            response = ResilientLLM(offline).create(**request)
+        self.assertEqual(response.choices[0].message.content, "install vlc")
+        offline.chat.completions.create.assert_not_called()
+
+    def test_record_then_replay_stream_with_timing(self):
+        tape = Cassette(self.path, cassette.RECORD)
+        request = {"model": "m", "messages": [], "stream": True}
+        chunks = list(tape.llm_call(request, lambda: iter([_chunk("Hel"), _chunk("lo")])))
+        self.assertEqual([c.choices[0].delta.content for c in chunks], ["Hel", "lo"])
+
+        sleep = MagicMock()
+        replay = Cassette(self.path, cassette.REPLAY, simulate_timing=True, sleep=sleep)
+        replayed = list(replay.llm_call(dict(request, timeout=5), lambda: self.fail("called real API")))
+        self.assertEqual([c.choices[0].delta.content for c in replayed], ["Hel", "lo"])
+        self.assertGreaterEqual(sleep.call_count, 1)
+
+    def test_stream_closed_early_is_recorded(self):
+        tape = Cassette(self.path, cassette.RECORD)
+        request = {"model": "m", "messages": [], "stream": True}
+        stream = tape.llm_call(request, lambda: iter([_chunk("Hel"), _chunk("lo"), _chunk("!")]))
+        self.assertEqual(next(stream).choices[0].delta.content, "Hel")
+        stream.close()
+
+        replay = Cassette(self.path, cassette.REPLAY)
+        replayed = list(replay.llm_call(request, lambda: self.fail("called real API")))
+        self.assertEqual([c.choices[0].delta.content for c in replayed], ["Hel"])
+        self.assertTrue(replay._recordings[cassette.request_key("llm", request)][0]["incomplete"])
+
+    def test_no_hedged_requests_while_recording(self):
+        metrics.reset()
+        for _ in range(20):
+            metrics.observe("tape.latency", 0.0001)
+        client = MagicMock()
+        client.chat.completions.create.side_effect = lambda **kwargs: time.sleep(0.05) or _completion("ok")
+        request = {"model": "m", "messages": []}
+        llm = ResilientLLM(client, name="tape", hedge=True)
+        with cassette.use(self.path, cassette.RECORD) as tape:
+            llm.create(**request)
+        self.assertEqual(metrics.count("tape.hedged"), 0)
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(len(tape._recordings[cassette.request_key("llm", request)]), 1)
+
+    def test_replay_without_timing_does_not_sleep(self):
+        Cassette(self.path, cassette.RECORD).command(["brew", "list"], lambda: {"success": True, "stdout": "", "stderr": "", "exit_code": 0})
+        sleep = MagicMock()
+        replay = Cassette(self.path, cassette.REPLAY, sleep=sleep)
+        self.assertTrue(replay.command(["brew", "list"], None)["success"])
+        sleep.assert_not_called()
+
+    def test_identical_requests_replay_in_order(self):
+        tape = Cassette(self.path, cassette.RECORD)
+        for output in ["first", "second"]:
+            tape.command(["dpkg", "-s", "git"], lambda: {"success": True, "stdout": output, "stderr": "", "exit_code": 0})
+        replay = Cassette(self.path, cassette.REPLAY)
+        outputs = [replay.command(["dpkg", "-s", "git"], None)["stdout"] for _ in range(3)]
+        self.assertEqual(outputs, ["first", "second", "second"])
+
+    def test_unknown_request_raises(self):
+        Cassette(self.path, cassette.RECORD)
+        open(self.path, "w").close()
+        replay = Cassette(self.path, cassette.REPLAY)
+        with self.assertRaises(CassetteMiss):
+            replay.command(["winget", "list"], None)
+
+    @patch('modules.install_apps._execute_command')
+    def test_run_command_goes_through_cassette(self, mock_execute):
+        from modules import install_apps
+        mock_execute.return_value = {"success": True, "stdout": "Setting up git", "stderr": "", "exit_code": 0}
+        with cassette.use(self.path, cassette.RECORD):
+            install_apps._run_command(["sudo", "apt-get", "install", "-y", "git"])
+        mock_execute.reset_mock()
+        with cassette.use(self.path, cassette.REPLAY):
+            result = install_apps._run_command(["sudo", "apt-get", "install", "-y", "git"])
+        self.assertEqual(result["stdout"], "Setting up git")
+        mock_execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import tempfile
+import threading
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.chat_sessions import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.store = SessionStore(self.tmp_dir.name, idle_timeout=60, clock=self.clock)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_turns_are_appended_and_resumed(self):
+        self.store.get("alice").append_turn("Hi", "Hello!")
+        self.store.get("alice").append_turn("How are you?", "Fine.")
+
+        resumed = SessionStore(self.tmp_dir.name).get("alice")
+        history = resumed.history("system prompt")
+        self.assertEqual(history[0], {"role": "system", "content": "system prompt"})
+        self.assertEqual([m["content"] for m in history[1:]], ["Hi", "Hello!", "How are you?", "Fine."])
+
+    def test_appends_one_line_per_message(self):
+        self.store.get("alice").append_turn("Hi", "Hello!")
+        self.store.get("alice").append("user", "Bye")
+        with open(os.path.join(self.tmp_dir.name, "alice.jsonl")) as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_sessions_are_isolated(self):
+        self.store.get("alice").append_turn("Hi", "Hello Alice")
+        self.store.get("bob").append_turn("Hi", "Hello Bob")
+        self.assertEqual(self.store.get("bob").history()[-1]["content"], "Hello Bob")
+        self.assertEqual(self.store.list_sessions(), ["alice", "bob"])
+
+    def test_loading_one_session_does_not_read_others(self):
+        self.store.get("alice").append_turn("Hi", "Hello")
+        self.store.get("bob").append_turn("Hi", "Hello")
+
+        fresh = SessionStore(self.tmp_dir.name)
+        real_open = open
+        opened = []
+
+        def tracking_open(path, *args, **kwargs):
+            opened.append(os.path.basename(str(path)))
+            return real_open(path, *args, **kwargs)
+
+        with patch("builtins.open", side_effect=tracking_open):
+            fresh.get("alice").history()
+        self.assertEqual(opened, ["alice.jsonl"])
+
+    def test_idle_sessions_are_evicted_from_memory(self):
+        self.store.get("alice").append_turn("Hi", "Hello")
+        self.clock.now = 30
+        self.store.get("bob")
+        self.assertEqual(self.store.loaded_count(), 2)
+
+        self.clock.now = 61
+        self.assertEqual(self.store.evict_idle(), 1)
+        self.assertEqual(self.store.loaded_count(), 1)
+        # Evicted data is still on disk
+        self.assertEqual(len(self.store.get("alice").history()), 2)
+
+    def test_max_loaded_sessions(self):
+        store = SessionStore(self.tmp_dir.name, max_loaded=2, clock=self.clock)
+        for name in ["a", "b", "c"]:
+            store.get(name)
+        self.assertEqual(store.loaded_count(), 2)
+
+    def test_picks_up_turns_from_another_store(self):
+        other = SessionStore(self.tmp_dir.name)
+        mine = self.store.get("shared")
+        mine.history()
+        other.get("shared").append_turn("From GUI", "ok")
+        self.assertEqual(mine.history()[-2]["content"], "From GUI")
+
+    def test_concurrent_appends(self):
+        session = self.store.get("busy")
+
+        def worker(n):
+            for i in range(50):
+                session.append_turn(f"q{n}-{i}", f"a{n}-{i}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Read back without the in-memory limit to check every line was written
+        reloaded = SessionStore(self.tmp_dir.name, max_messages=None).get("busy").history()
+        self.assertEqual(len(reloaded), 8 * 50 * 2)
+        for question, answer in zip(reloaded[::2], reloaded[1::2]):
+            self.assertEqual(question["content"][1:], answer["content"][1:])
+
+    def test_keeps_only_recent_messages_in_memory(self):
+        store = SessionStore(self.tmp_dir.name, max_messages=4)
+        session = store.get("long")
+        for i in range(10):
+            session.append_turn(f"q{i}", f"a{i}")
+
+        self.assertEqual([m["content"] for m in session.history()], ["q8", "a8", "q9", "a9"])
+        reloaded = SessionStore(self.tmp_dir.name, max_messages=4).get("long")
+        self.assertEqual(len(reloaded.history("system")), 5)
+        with open(session.path) as f:
+            self.assertEqual(len(f.readlines()), 20)
+
+    def test_invalid_session_id(self):
+        with self.assertRaises(ValueError):
+            self.store.get("../etc/passwd")
+
+
+class TestLLMChatSessions(unittest.TestCase):
+
+    def setUp(self):
+        from modules import llm_chat
+        self.llm_chat = llm_chat
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = SessionStore(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch('modules.llm_chat.client.chat.completions.create')
+    def test_session_history_is_sent_and_saved(self, mock_create):
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = "Hello there!"
+        mock_create.return_value = [chunk]
+
+        with patch.object(self.llm_chat, "session_store", self.store):
+            self.llm_chat.handle("chat Hello", session_id="s1")
+            self.llm_chat.handle("chat Again", session_id="s1")
+
+        messages = mock_create.call_args.kwargs["messages"]
+        self.assertEqual([m["role"] for m in messages], ["system", "user", "assistant", "user"])
+        self.assertEqual(len(SessionStore(self.tmp_dir.name).get("s1").history()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -154,5 +154,41 @@ class TestInstallApps(unittest.TestCase):
             ['sudo', 'dnf', 'install', '-y', 'git']
         )
 
+    @patch('platform.system', return_value='Windows')
+    @patch('shutil.which', return_value=None)
+    @patch('modules.install_apps.is_installed', return_value=False)
+    @patch('modules.install_apps._run_command')
+    @patch('builtins.input', return_value='yes')
+    def test_alias_uses_package_id(self, mock_input, mock_run_command, mock_is_installed, mock_which, mock_platform):
+        mock_run_command.return_value = {"success": True, "stdout": "", "stderr": "", "exit_code": 0}
+        response = install_apps.handle("install vscode")
+        self.assertEqual(response, "Successfully installed 'visual studio code'.")
+        mock_run_command.assert_called_once_with(
+            ['winget', 'install', '--accept-package-agreements', '--accept-source-agreements', 'Microsoft.VisualStudioCode']
+        )
+
+    @patch('modules.install_apps._run_command')
+    @patch('builtins.input', return_value='yes')
+    def test_misspelled_app_is_only_suggested(self, mock_input, mock_run_command):
+        response = install_apps.handle("install firefx")
+        self.assertEqual(response, "'firefx' is not whitelisted for installation. Did you mean 'firefox'?")
+        mock_run_command.assert_not_called()
+        mock_input.assert_not_called()
+
+    @patch('modules.install_apps._run_command')
+    def test_ambiguous_app_suggests_names(self, mock_run_command):
+        response = install_apps.handle("install sk")
+        self.assertTrue(response.startswith("'sk' is not whitelisted for installation. Did you mean"))
+        self.assertIn("'skype'", response)
+        mock_run_command.assert_not_called()
+
+    @patch('modules.install_apps._execute_command')
+    def test_long_command_output_is_capped(self, mock_execute):
+        mock_execute.return_value = {"success": False, "stdout": "x" * 100000, "stderr": "boom", "exit_code": 1}
+        result = install_apps._run_command(['apt-get', 'install', 'vlc'])
+        self.assertEqual(len(result["stdout"]), install_apps.MAX_OUTPUT_CHARS + len("...\n"))
+        self.assertTrue(result["stdout"].startswith("...\n"))
+        self.assertEqual(result["stderr"], "boom")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
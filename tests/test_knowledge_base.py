@@ -4,16 +4,21 @@ from unittest.mock import patch, mock_open
 import json
 import sys
 import os
+import tempfile
+import threading
+from datetime import datetime
 
 # Add the parent directory to the Python path to allow module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import interaction
 from modules import knowledge_base
 
 class TestKnowledgeBase(unittest.TestCase):
 
+    @patch('modules.knowledge_base.os.replace')
     @patch('builtins.open', new_callable=mock_open, read_data='[]')
-    def test_remember_new_item(self, mock_file):
+    def test_remember_new_item(self, mock_file, mock_replace):
         response = knowledge_base.handle("remember my favorite color is blue")
         self.assertEqual(response, "I will remember that: 'my favorite color is blue'")
         mock_file().write.assert_called()
@@ -49,5 +54,193 @@ class TestKnowledgeBase(unittest.TestCase):
         response = knowledge_base.handle("unknown action")
         self.assertEqual(response, "I'm not sure how to handle that.")
 
+
+def _memories(*entries):
+    return json.dumps([{"timestamp": ts, "data": data} for ts, data in entries])
+
+
+class TestKnowledgeBaseTimeIndex(unittest.TestCase):
+
+    MEMORIES = [
+        ("2024-07-01 09:00:00", "dentist appointment"),
+        ("2024-07-10 12:00:00", "meeting is at 5"),
+        ("2024-07-15 08:30:00", "buy milk"),
+        ("2024-07-22 18:00:00", "call mom"),
+    ]
+
+    def test_index_range_query(self):
+        index = knowledge_base.MemoryIndex([{"timestamp": ts, "data": d} for ts, d in reversed(self.MEMORIES)])
+        found = [m["data"] for m in index.iter_range(datetime(2024, 7, 10), datetime(2024, 7, 16))]
+        self.assertEqual(found, ["meeting is at 5", "buy milk"])
+        self.assertEqual(index.count(start=datetime(2024, 7, 15)), 2)
+
+    def test_iter_memories_is_lazy_and_paginated(self):
+        memories = [{"timestamp": ts, "data": d} for ts, d in self.MEMORIES]
+        results = knowledge_base.iter_memories(memories, offset=1, limit=2)
+        self.assertEqual(next(results)["data"], "meeting is at 5")
+        self.assertEqual([m["data"] for m in results], ["buy milk"])
+
+    def test_iter_memories_newest_first_with_query(self):
+        memories = [{"timestamp": ts, "data": d} for ts, d in self.MEMORIES]
+        results = knowledge_base.iter_memories(memories, query="M", newest_first=True)
+        self.assertEqual([m["data"] for m in results], ["call mom", "buy milk", "meeting is at 5", "dentist appointment"])
+
+    def test_parse_relative_ranges(self):
+        now = datetime(2024, 7, 17, 15, 0, 0)  # a Wednesday
+        _, start, end, _ = knowledge_base.parse_time_range("last week", now)
+        self.assertEqual((start, end), (datetime(2024, 7, 8), datetime(2024, 7, 15)))
+        _, start, end, _ = knowledge_base.parse_time_range("yesterday", now)
+        self.assertEqual((start, end), (datetime(2024, 7, 16), datetime(2024, 7, 17)))
+        rest, start, end, _ = knowledge_base.parse_time_range("milk in the last 3 days", now)
+        self.assertEqual((rest, start, end), ("milk", datetime(2024, 7, 14, 15, 0, 0), None))
+
+    def test_recall_between_dates(self):
+        with patch('builtins.open', mock_open(read_data=_memories(*self.MEMORIES))):
+            response = knowledge_base.handle("recall between 2024-07-10 and 2024-07-15")
+        self.assertEqual(response, "Here's what I remembered between 2024-07-10 and 2024-07-15:\n- meeting is at 5\n- buy milk")
+
+    def test_recall_query_within_range(self):
+        with patch('builtins.open', mock_open(read_data=_memories(*self.MEMORIES))):
+            response = knowledge_base.handle("recall milk since 2024-07-12")
+        self.assertEqual(response, "Here's what I found:\n- buy milk")
+
+    def test_recall_empty_range(self):
+        with patch('builtins.open', mock_open(read_data=_memories(*self.MEMORIES))):
+            response = knowledge_base.handle("recall on 2024-06-01")
+        self.assertEqual(response, "I don't have any memories on 2024-06-01.")
+
+    def test_recall_impossible_date(self):
+        with patch('builtins.open', mock_open(read_data=_memories(*self.MEMORIES))):
+            for command in ["recall since 2024-13-01", "recall on 2024-02-30", "recall in the last 99999999999 days"]:
+                self.assertTrue(knowledge_base.handle(command).startswith("I couldn't understand that date."), command)
+
+    def test_recall_is_paginated(self):
+        entries = [(f"2024-07-01 10:{i:02d}:00", f"note {i}") for i in range(45)]
+        with patch('builtins.open', mock_open(read_data=_memories(*entries))):
+            first = knowledge_base.handle("recall")
+            third = knowledge_base.handle("recall page 3")
+        self.assertIn("- note 19", first)
+        self.assertNotIn("- note 20", first)
+        self.assertIn("(Showing 1-20 of 45. Say 'recall page 2' for more.)", first)
+        self.assertEqual(third.count("\n- "), 5)
+        self.assertNotIn("Showing", third)
+
+
+class TestKnowledgeBaseRecallIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patcher = patch('modules.knowledge_base.MEMORY_FILE', os.path.join(self.tmp.name, "memory.json"))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_index_is_reused_until_the_file_changes(self):
+        knowledge_base.handle("remember buy milk")
+        index = knowledge_base.memory_index()
+        knowledge_base.handle("recall milk")
+        self.assertIs(knowledge_base.memory_index(), index)
+        knowledge_base.handle("remember call mom")
+        self.assertIsNot(knowledge_base.memory_index(), index)
+        self.assertIn("- call mom", knowledge_base.handle("recall"))
+
+    def test_recall_lines_are_streamed(self):
+        knowledge_base.save_memories([
+            {"timestamp": f"2024-07-01 10:{i:02d}:00", "data": f"note {i}"} for i in range(25)
+        ])
+        chunks = []
+        with interaction.use_emitter(chunks.append):
+            response = knowledge_base.handle("recall note")
+        self.assertEqual("".join(chunks), response)
+        self.assertEqual(chunks[:2], ["Here's what I found:", "\n- note 0"])
+        self.assertTrue(response.endswith("(Showing 1-20 of 25. Say 'recall note page 2' for more.)"))
+
+
+class TestKnowledgeBaseDedup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.patcher = patch('modules.knowledge_base.MEMORY_FILE', os.path.join(self.tmp.name, "memory.json"))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def test_remember_updates_near_duplicate(self):
+        knowledge_base.handle("remember my favorite color is blue")
+        response = knowledge_base.handle("remember My favourite color is blue!")
+        self.assertEqual(
+            response,
+            "I updated what I remembered: 'my favorite color is blue' is now 'My favourite color is blue!'",
+        )
+        memories = knowledge_base.load_memories()
+        self.assertEqual(len(memories), 1)
+        self.assertEqual(memories[0]["data"], "My favourite color is blue!")
+        self.assertEqual(len(memories[0]["signature"]), 128)
+
+    def test_remember_exact_repeat(self):
+        knowledge_base.handle("remember the wifi password is hunter2")
+        response = knowledge_base.handle("remember The wifi password is hunter2.")
+        self.assertEqual(response, "I already remember that: 'the wifi password is hunter2'")
+        self.assertEqual(len(knowledge_base.load_memories()), 1)
+
+    def test_different_facts_are_kept(self):
+        knowledge_base.handle("remember meeting with bob on monday at 3pm")
+        knowledge_base.handle("remember meeting with bob on tuesday at 3pm")
+        knowledge_base.handle("remember buy milk")
+        self.assertEqual(len(knowledge_base.load_memories()), 3)
+
+    def test_concurrent_remembers_are_all_kept(self):
+        threads = [
+            threading.Thread(target=knowledge_base.handle, args=(f"remember parcel number {i} arrived",))
+            for i in range(40)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(knowledge_base.load_memories()), 40)
+        self.assertFalse(os.path.exists(knowledge_base.MEMORY_FILE + ".tmp"))
+
+    def test_different_facts_are_kept_apart(self):
+        knowledge_base.handle("remember the key is under the mat")
+        knowledge_base.handle("remember the key is not under the mat")
+        knowledge_base.handle("remember birthday is in march")
+        knowledge_base.handle("remember birthday is in may")
+        self.assertEqual(len(knowledge_base.load_memories()), 4)
+        self.assertEqual(
+            knowledge_base.handle("compact memories"),
+            "No duplicate memories found; I have 4 memories.",
+        )
+
+    def test_compact_existing_store(self):
+        # Written before deduplication existed: no signatures, many repeats
+        knowledge_base.save_memories([
+            {"timestamp": "2024-07-01 10:00:00", "data": "my favorite color is blue"},
+            {"timestamp": "2024-07-02 10:00:00", "data": "buy milk"},
+            {"timestamp": "2024-07-03 10:00:00", "data": "My favourite color is blue"},
+            {"timestamp": "2024-07-04 10:00:00", "data": "my favorite color is blue!"},
+        ])
+        response = knowledge_base.handle("compact memories")
+        backup = knowledge_base.MEMORY_FILE + ".bak"
+        self.assertEqual(
+            response,
+            f"Merged 2 duplicate memories; 2 remain. The previous memories are saved in {backup}.",
+        )
+        with open(backup) as f:
+            self.assertEqual(len(json.load(f)), 4)
+
+        memories = knowledge_base.load_memories()
+        self.assertEqual([m["data"] for m in memories], ["buy milk", "my favorite color is blue!"])
+        self.assertEqual(memories[1]["timestamp"], "2024-07-04 10:00:00")
+        self.assertEqual(
+            knowledge_base.handle("compact memories"),
+            "No duplicate memories found; I have 2 memories.",
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -39,6 +39,21 @@ class TestLLMChat(unittest.TestCase):
         self.assertEqual(llm_chat.chat_history[2]['role'], 'assistant')
         self.assertEqual(llm_chat.chat_history[2]['content'], 'Hello there!')
 
+    @patch('modules.llm_chat.MAX_HISTORY_MESSAGES', 4)
+    @patch('modules.llm_chat.client.chat.completions.create')
+    def test_history_is_bounded(self, mock_create):
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].delta.content = "ok"
+        mock_create.return_value = [mock_response]
+
+        for i in range(5):
+            llm_chat.handle(f"chat question {i}")
+
+        self.assertEqual(len(llm_chat.chat_history), 5)  # System + 2 turns
+        self.assertEqual(llm_chat.chat_history[0]['role'], 'system')
+        self.assertEqual(llm_chat.chat_history[1]['content'], 'question 3')
+
     def test_handle_empty_input(self):
         response = llm_chat.handle("chat ")
         self.assertEqual(response, "Please provide something to chat about.")
@@ -0,0 +1,187 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import time
+
+import groq
+import httpx
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+import llm_resilience
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientLLM
+
+
+def _rate_limit_error(headers):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return groq.RateLimitError("rate limited", response=response, body=None)
+
+
+def _connection_error():
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    return groq.APIConnectionError(request=request)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_half_opens_after_timeout(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+        clock.now = 10
+        self.assertTrue(breaker.allow())  # single trial call
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class TestRetryAfter(unittest.TestCase):
+
+    def test_retry_after_header(self):
+        self.assertEqual(llm_resilience.retry_after(_rate_limit_error({"retry-after": "2"})), 2.0)
+
+    def test_retry_after_ms_header(self):
+        self.assertAlmostEqual(llm_resilience.retry_after(_rate_limit_error({"retry-after-ms": "250"})), 0.25)
+
+    def test_groq_reset_headers(self):
+        error = _rate_limit_error({"x-ratelimit-reset-requests": "1m2.5s", "x-ratelimit-reset-tokens": "7.66s"})
+        self.assertAlmostEqual(llm_resilience.retry_after(error), 62.5)
+
+    def test_no_headers(self):
+        self.assertIsNone(llm_resilience.retry_after(ValueError("boom")))
+
+
+class TestResilientLLM(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.client = MagicMock()
+        self.sleep = MagicMock()
+
+    def test_retries_transient_error_then_succeeds(self):
+        self.client.chat.completions.create.side_effect = [_connection_error(), "ok"]
+        llm = ResilientLLM(self.client, name="t", sleep=self.sleep)
+        self.assertEqual(llm.create(model="m", messages=[]), "ok")
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+        self.sleep.assert_called_once()
+        self.assertEqual(metrics.count("t.retries"), 1)
+
+    def test_cancelled_call_does_not_hold_the_trial_slot(self):
+        import cancellation
+
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10  # half-open: one trial call allowed
+        llm = ResilientLLM(self.client, name="t", breaker=breaker, sleep=self.sleep)
+
+        token = cancellation.CancellationToken()
+        token.cancel()
+        with cancellation.use(token):
+            with self.assertRaises(cancellation.Cancelled):
+                llm.create(model="m", messages=[])
+        self.client.chat.completions.create.return_value = "ok"
+        self.assertEqual(llm.create(model="m", messages=[]), "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_passes_per_call_timeout(self):
+        self.client.chat.completions.create.return_value = "ok"
+        llm = ResilientLLM(self.client, timeout=3.5, sleep=self.sleep)
+        llm.create(model="m", messages=[])
+        self.assertEqual(self.client.chat.completions.create.call_args.kwargs["timeout"], 3.5)
+
+    def test_honors_retry_after(self):
+        self.client.chat.completions.create.side_effect = [_rate_limit_error({"retry-after": "1.5"}), "ok"]
+        llm = ResilientLLM(self.client, sleep=self.sleep)
+        llm.create(model="m", messages=[])
+        self.sleep.assert_called_once_with(1.5)
+
+    def test_gives_up_when_retry_after_too_long(self):
+        self.client.chat.completions.create.side_effect = _rate_limit_error({"retry-after": "120"})
+        llm = ResilientLLM(self.client, sleep=self.sleep, max_retry_after=30)
+        with self.assertRaises(groq.RateLimitError):
+            llm.create(model="m", messages=[])
+        self.sleep.assert_not_called()
+
+    def test_non_transient_error_is_not_retried(self):
+        self.client.chat.completions.create.side_effect = ValueError("bad request")
+        llm = ResilientLLM(self.client, sleep=self.sleep)
+        with self.assertRaises(ValueError):
+            llm.create(model="m", messages=[])
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+
+    def test_open_circuit_fails_fast(self):
+        self.client.chat.completions.create.side_effect = _connection_error()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        llm = ResilientLLM(self.client, breaker=breaker, sleep=self.sleep)
+        with self.assertRaises(groq.APIConnectionError):
+            llm.create(model="m", messages=[])
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            llm.create(model="m", messages=[])
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    def test_hedged_request_returns_faster_backup(self):
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "slow"
+            return "fast"
+
+        self.client.chat.completions.create.side_effect = create
+        for _ in range(20):
+            metrics.observe("h.latency", 0.01)
+        llm = ResilientLLM(self.client, name="h", hedge=True, hedge_min_samples=20, sleep=self.sleep)
+        self.assertEqual(llm.create(model="m", messages=[]), "fast")
+        self.assertEqual(metrics.count("h.hedged"), 1)
+        self.assertEqual(metrics.count("h.hedge_wins"), 1)
+
+    def test_no_hedge_without_enough_samples(self):
+        self.client.chat.completions.create.return_value = "ok"
+        llm = ResilientLLM(self.client, name="n", hedge=True, sleep=self.sleep)
+        self.assertEqual(llm.create(model="m", messages=[]), "ok")
+        self.assertEqual(metrics.count("n.hedged"), 0)
+
+
+class TestPromptToActionFallback(unittest.TestCase):
+
+    @patch.dict(os.environ, {"GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "test-key")})
+    def test_falls_back_to_local_classifier(self):
+        import ai_brain
+        with patch.object(ai_brain.llm, "create", side_effect=CircuitOpenError("down")):
+            self.assertEqual(ai_brain.prompt_to_action("Install VLC"), "install vlc")
+            self.assertEqual(ai_brain.prompt_to_action("What is 2+2?"), "chat What is 2+2?")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.memory_dedup import DuplicateIndex, jaccard, normalize, shingles, signature
+
+
+class TestMemoryDedup(unittest.TestCase):
+
+    def test_normalize_and_shingles(self):
+        self.assertEqual(normalize("Bob's  phone!"), "bobs phone")
+        self.assertEqual(shingles("Hi!"), {"hi"})
+        self.assertEqual(shingles("abcd"), {"abc", "bcd"})
+        self.assertAlmostEqual(jaccard({"a", "b"}, {"b", "c"}), 1 / 3)
+
+    def test_signature_is_stable(self):
+        sig = signature("my favorite color is blue")
+        self.assertEqual(sig, signature("My favorite color is blue."))
+        self.assertEqual(len(sig), 128)
+
+    def test_finds_near_duplicates_only(self):
+        index = DuplicateIndex()
+        index.add("color", "my favorite color is blue")
+        index.add("wifi", "the wifi password is hunter2")
+        index.add("milk", "buy milk")
+
+        self.assertEqual(index.find("My favourite color is blue")[0], "color")
+        self.assertEqual(index.find("wifi password is hunter2")[0], "wifi")
+        self.assertIsNone(index.find("my favorite color is green"))
+        self.assertIsNone(index.find("buy eggs"))
+        self.assertIsNone(index.find("my favorite color is not blue"))
+
+    def test_different_numbers_are_different_facts(self):
+        index = DuplicateIndex()
+        index.add("room", "the meeting is in room 12")
+        self.assertIsNone(index.find("the meeting is in room 13"))
+        self.assertEqual(index.find("The meeting is in room 12.")[0], "room")
+
+    def test_remove_and_replace(self):
+        index = DuplicateIndex()
+        index.add(1, "buy milk")
+        index.add(1, "call mom on sunday")
+        self.assertEqual(len(index), 1)
+        self.assertIsNone(index.find("buy milk"))
+        index.remove(1)
+        self.assertIsNone(index.find("call mom on sunday"))
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
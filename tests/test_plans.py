@@ -0,0 +1,147 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai_brain
+import interaction
+import task_router
+from ai_brain import Action, Plan
+from llm_resilience import CircuitOpenError
+
+
+def _completion(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class TestPromptToPlan(unittest.TestCase):
+
+    def test_parses_multiple_actions(self):
+        content = (
+            '{"actions": [{"verb": "install", "argument": "vlc"},'
+            ' {"verb": "open", "argument": "youtube", "depends_on": [0]}]}'
+        )
+        with patch.object(ai_brain.llm, "create", return_value=_completion(content)):
+            plan = ai_brain.prompt_to_plan("install vlc and open youtube")
+
+        self.assertEqual([a.to_command() for a in plan.actions], ["install vlc", "open youtube"])
+        self.assertEqual(plan.actions[1].depends_on, [0])
+        self.assertEqual(plan.describe(), "install vlc; open youtube")
+
+    def test_unknown_verbs_and_bad_dependencies_are_cleaned_up(self):
+        content = (
+            '{"actions": [{"verb": "dance", "argument": ""},'
+            ' {"verb": "recall", "depends_on": [1, 5, -1, "x", 0]}]}'
+        )
+        plan = ai_brain._parse_plan(content, "dance for me")
+
+        self.assertEqual(plan.actions[0], Action("chat", "dance for me"))
+        self.assertEqual(plan.actions[1], Action("recall", "", [0]))
+
+    def test_scalar_dependency_is_accepted(self):
+        content = (
+            '{"actions": [{"verb": "install", "argument": "vlc"},'
+            ' {"verb": "open", "argument": "youtube", "depends_on": 0},'
+            ' {"verb": "recall", "depends_on": "first"}]}'
+        )
+        with patch.object(ai_brain.llm, "create", return_value=_completion(content)):
+            plan = ai_brain.prompt_to_plan("install vlc and open youtube")
+        self.assertEqual(plan.actions[1].depends_on, [0])
+        self.assertEqual(plan.actions[2].depends_on, [])
+
+    def test_plain_text_answer_becomes_single_action(self):
+        with patch.object(ai_brain.llm, "create", return_value=_completion("install vlc")):
+            plan = ai_brain.prompt_to_plan("get me vlc")
+        self.assertEqual(plan.actions, [Action("install", "vlc")])
+
+    def test_falls_back_to_local_classifier(self):
+        with patch.object(ai_brain.llm, "create", side_effect=CircuitOpenError("down")):
+            plan = ai_brain.prompt_to_plan("What is 2+2?")
+        self.assertEqual(plan.actions, [Action("chat", "What is 2+2?")])
+
+
+class TestExecutePlan(unittest.TestCase):
+
+    def test_single_action_returns_result_unchanged(self):
+        with patch('task_router.route_task', return_value="done") as route:
+            result = task_router.execute_plan(Plan([Action("open", "youtube")]), session_id="s1")
+        self.assertEqual(result, "done")
+        route.assert_called_once_with("open youtube", session_id="s1")
+
+    def test_independent_actions_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def route(action, session_id=None):
+            barrier.wait()  # deadlocks unless both actions run at once
+            return f"did {action}"
+
+        plan = Plan([Action("install", "vlc"), Action("open", "youtube")])
+        with patch('task_router.route_task', side_effect=route):
+            result = task_router.execute_plan(plan)
+        self.assertEqual(result, "1. did install vlc\n2. did open youtube")
+
+    def test_dependencies_and_same_verb_actions_run_in_order(self):
+        order = []
+        lock = threading.Lock()
+
+        def route(action, session_id=None):
+            time.sleep(0.02)
+            with lock:
+                order.append(action)
+            return action
+
+        plan = Plan([
+            Action("install", "vlc"),
+            Action("install", "git"),
+            Action("remember", "vlc is installed", [0]),
+        ])
+        with patch('task_router.route_task', side_effect=route):
+            task_router.execute_plan(plan)
+
+        self.assertLess(order.index("install vlc"), order.index("install git"))
+        self.assertLess(order.index("install vlc"), order.index("remember vlc is installed"))
+
+    def test_memory_actions_run_in_order(self):
+        plan = Plan([
+            Action("remember", "the key is under the mat"),
+            Action("recall", "key"),
+            Action("compact memories"),
+            Action("open", "youtube"),
+        ])
+        self.assertEqual(task_router._dependencies(plan.actions), [set(), {0}, {1}, set()])
+
+    def test_failed_dependency_skips_dependents(self):
+        def route(action, session_id=None):
+            if action.startswith("install"):
+                raise RuntimeError("no package manager")
+            return action
+
+        plan = Plan([Action("install", "vlc"), Action("open", "videolan.org", [0]), Action("recall")])
+        with patch('task_router.route_task', side_effect=route):
+            result = task_router.execute_plan(plan)
+
+        lines = result.splitlines()
+        self.assertEqual(lines[0], "1. An error occurred: no package manager")
+        self.assertEqual(lines[1], "2. Skipped because 'install vlc' failed.")
+        self.assertEqual(lines[2], "3. recall")
+
+    def test_handlers_see_the_callers_confirmer(self):
+        def route(action, session_id=None):
+            return interaction.confirm(f"{action}?")
+
+        plan = Plan([Action("install", "vlc"), Action("open", "youtube")])
+        with patch('task_router.route_task', side_effect=route):
+            with interaction.use_confirmer(lambda question: True):
+                result = task_router.execute_plan(plan)
+        self.assertEqual(result, "1. True\n2. True")
+
+
+if __name__ == '__main__':
+    unittest.main()
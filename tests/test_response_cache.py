@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+from modules import response_cache
+from modules.response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache.json")
+        self.clock = FakeClock()
+        self.cache = ResponseCache(path=self.path, clock=self.clock)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exact_match_after_normalization(self):
+        self.cache.put("What is the capital of France?", "Paris.")
+        self.assertEqual(self.cache.get("what is the capital of   france"), "Paris.")
+
+    def test_similar_question_hits(self):
+        self.cache.put("What is the capital of France?", "Paris.")
+        self.assertEqual(self.cache.get("Whats the capital of France"), "Paris.")
+
+    def test_different_question_misses(self):
+        self.cache.put("What is the capital of France?", "Paris.")
+        self.assertIsNone(self.cache.get("What is the capital of Germany?"))
+
+    def test_threshold_is_tunable(self):
+        self.cache.put("capital of France", "Paris.")
+        self.assertIsNone(self.cache.get("What is the captial of France?"))
+        cache = ResponseCache(path=self.path, threshold=0.5, clock=self.clock)
+        self.assertEqual(cache.get("What is the captial of France?"), "Paris.")
+
+    def test_word_order_and_numbers_must_match(self):
+        cache = ResponseCache(path=self.path, threshold=0.5, clock=self.clock)
+        cache.put("convert 10 km to miles", "6.2 miles.")
+        cache.put("capital of France", "Paris.")
+        self.assertIsNone(cache.get("convert 10 miles to km"))
+        self.assertIsNone(cache.get("convert 12 km to miles"))
+        self.assertIsNone(cache.get("capital of France in 1500"))
+        self.assertIsNone(cache.get("What is the capital of Germany?"))
+
+    def test_entries_expire(self):
+        cache = ResponseCache(path=self.path, ttl=60, clock=self.clock)
+        cache.put("capital of france", "Paris.")
+        self.clock.now += 61
+        self.assertIsNone(cache.get("capital of france"))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(path=self.path, max_entries=2, clock=self.clock)
+        cache.put("capital of france", "Paris.")
+        cache.put("capital of spain", "Madrid.")
+        cache.get("capital of france")
+        cache.put("capital of italy", "Rome.")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("capital of spain"))
+        self.assertEqual(cache.get("capital of france"), "Paris.")
+
+    def test_persists_to_disk(self):
+        self.cache.put("capital of france", "Paris.")
+        reloaded = ResponseCache(path=self.path, clock=self.clock)
+        self.assertEqual(reloaded.get("capital of france"), "Paris.")
+
+    def test_history_independence(self):
+        self.assertTrue(response_cache.is_history_independent("What is the capital of France?"))
+        self.assertFalse(response_cache.is_history_independent("Why is it so big?"))
+        self.assertFalse(response_cache.is_history_independent("and Germany?"))
+        self.assertFalse(response_cache.is_history_independent("What is the weather today?"))
+
+
+class TestLLMChatCache(unittest.TestCase):
+
+    def setUp(self):
+        from modules import llm_chat
+        self.llm_chat = llm_chat
+        llm_chat.chat_history = [
+            {"role": "system", "content": "You are a helpful AI assistant."},
+        ]
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(path=os.path.join(self.tmp_dir.name, "cache.json"))
+        metrics.reset()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch('modules.llm_chat.client.chat.completions.create')
+    def test_second_question_is_served_from_cache(self, mock_create):
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = "Paris."
+        mock_create.return_value = [chunk]
+
+        with patch.object(self.llm_chat, "response_cache", self.cache):
+            self.assertEqual(self.llm_chat.handle("chat What is the capital of France?"), "Paris.")
+            self.assertEqual(self.llm_chat.handle("chat what's the capital of france"), "Paris.")
+
+        self.assertEqual(mock_create.call_count, 1)
+        self.assertEqual(metrics.count("chat.cache_hits"), 1)
+        self.assertIn("chat.latency.cached", metrics.snapshot()["latency"])
+        self.assertEqual(len(self.llm_chat.chat_history), 5)
+
+    @patch('modules.llm_chat.client.chat.completions.create')
+    def test_context_dependent_question_is_not_cached(self, mock_create):
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = "Because."
+        mock_create.return_value = [chunk]
+
+        with patch.object(self.llm_chat, "response_cache", self.cache):
+            self.llm_chat.handle("chat why is it like that")
+            self.llm_chat.handle("chat why is it like that")
+
+        self.assertEqual(mock_create.call_count, 2)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,233 @@
+import unittest
+import sys
+import os
+import socketserver
+import tempfile
+import threading
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+from modules import send_email
+from modules.email_outbox import Outbox, SmtpConfig, SmtpConnection
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """
+    Just enough SMTP to receive mail. `rcpt_replies` scripts the replies to
+    RCPT TO (default 250) and `drop_after` hangs up after that many messages
+    on a connection.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSmtpHandler)
+        self.messages = []
+        self.connections = 0
+        self.rcpt_replies = []
+        self.drop_after = None
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class FakeSmtpHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        received = 0
+        self.reply("220 fake ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 fake")
+            elif verb == "RCPT":
+                with server.lock:
+                    code = server.rcpt_replies.pop(0) if server.rcpt_replies else 250
+                self.reply(f"{code} recipient")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                data = []
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b".\r\n", b""):
+                        break
+                    data.append(line.decode())
+                with server.lock:
+                    server.messages.append("".join(data))
+                self.reply("250 queued")
+                received += 1
+                if server.drop_after and received >= server.drop_after:
+                    return
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RSET, NOOP
+                self.reply("250 ok")
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeSmtpServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = SmtpConfig("127.0.0.1", self.server.port, None, None, "sane@example.com", False, 5)
+        self.outboxes = []
+        metrics.reset()
+
+    def tearDown(self):
+        for outbox in self.outboxes:
+            outbox.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def make_outbox(self, **kwargs):
+        kwargs.setdefault("base_delay", 0.01)
+        kwargs.setdefault("max_delay", 0.05)
+        outbox = Outbox(SmtpConnection(self.config), self.tmp.name, **kwargs)
+        self.outboxes.append(outbox)
+        return outbox
+
+    def test_sends_queued_messages_over_one_connection(self):
+        outbox = self.make_outbox().start()
+        for i in range(5):
+            outbox.enqueue("bob@example.com", f"Note {i}", f"Hello {i}")
+        self.assertTrue(outbox.flush())
+
+        self.assertEqual(len(self.server.messages), 5)
+        self.assertIn("Subject: Note 0", self.server.messages[0])
+        self.assertIn("Hello 4", self.server.messages[4])
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.assertEqual(metrics.count("email.sent"), 5)
+        self.assertEqual(metrics.snapshot()["gauges"]["email.queue_depth"], 0)
+        self.assertEqual(metrics.registry.samples("email.send"), 5)
+
+    def test_queue_survives_restart(self):
+        first = self.make_outbox()  # never started, like a crash before sending
+        first.enqueue("bob@example.com", "Saved", "Still here")
+        self.assertEqual(len(os.listdir(self.tmp.name)), 1)
+
+        second = self.make_outbox().start()
+        self.assertEqual(len(second), 1)
+        self.assertTrue(second.flush())
+        self.assertEqual(len(self.server.messages), 1)
+
+    def test_reconnects_when_server_hangs_up(self):
+        self.server.drop_after = 1
+        outbox = self.make_outbox().start()
+        for i in range(3):
+            outbox.enqueue("bob@example.com", "Hi", f"Message {i}")
+        self.assertTrue(outbox.flush())
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(self.server.connections, 3)
+
+    def test_retries_temporary_failures(self):
+        self.server.rcpt_replies = [451, 451]
+        outbox = self.make_outbox().start()
+        outbox.enqueue("bob@example.com", "Hi", "Eventually")
+        self.assertTrue(outbox.flush())
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(metrics.count("email.retries"), 2)
+
+    def test_permanent_failures_are_set_aside(self):
+        self.server.rcpt_replies = [550]
+        outbox = self.make_outbox().start()
+        outbox.enqueue("nobody@example.com", "Hi", "Bounce")
+        outbox.enqueue("bob@example.com", "Hi", "Delivered")
+        self.assertTrue(outbox.flush())
+
+        self.assertEqual(len(self.server.messages), 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "failed"))), 1)
+        self.assertEqual(metrics.count("email.failed"), 1)
+
+    def test_gives_up_after_max_attempts(self):
+        self.server.rcpt_replies = [451] * 3
+        outbox = self.make_outbox(max_attempts=3).start()
+        outbox.enqueue("bob@example.com", "Hi", "Never")
+        self.assertTrue(outbox.flush())
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(metrics.count("email.failed"), 1)
+
+
+class TestSendEmailHandle(unittest.TestCase):
+
+    def test_parse_email(self):
+        self.assertEqual(
+            send_email.parse_email("send email to bob@example.com about lunch saying see you at noon"),
+            ("bob@example.com", "lunch", "see you at noon"),
+        )
+        self.assertEqual(
+            send_email.parse_email("send email to bob@example.com: running late"),
+            ("bob@example.com", send_email.DEFAULT_SUBJECT, "running late"),
+        )
+        self.assertEqual(
+            send_email.parse_email("send email to bob@example.com saying hi"),
+            ("bob@example.com", send_email.DEFAULT_SUBJECT, "hi"),
+        )
+        self.assertEqual(
+            send_email.parse_email("send email bob@example.com saying hi"),
+            ("bob@example.com", send_email.DEFAULT_SUBJECT, "hi"),
+        )
+        self.assertEqual(
+            send_email.parse_email("send email: bob@example.com about lunch saying noon"),
+            ("bob@example.com", "lunch", "noon"),
+        )
+        self.assertIsNone(send_email.parse_email("send email to bob"))
+
+    @patch('modules.send_email.get_outbox')
+    def test_handle_enqueues(self, mock_get_outbox):
+        response = send_email.handle("send email to bob@example.com saying hi")
+        mock_get_outbox.return_value.enqueue.assert_called_once_with(
+            "bob@example.com", send_email.DEFAULT_SUBJECT, "hi"
+        )
+        self.assertEqual(response, "Queued your email to bob@example.com. I'll send it in the background.")
+
+    @patch('modules.send_email.get_outbox', return_value=None)
+    def test_handle_without_smtp_settings(self, mock_get_outbox):
+        response = send_email.handle("send email to bob@example.com saying hi")
+        self.assertIn("SMTP_HOST", response)
+
+    @patch('modules.send_email.get_outbox')
+    def test_route_task_keeps_case(self, mock_get_outbox):
+        import task_router
+
+        task_router.route_task("Send email to Bob@Example.com about Dinner saying Meet at 5PM")
+        mock_get_outbox.return_value.enqueue.assert_called_once_with(
+            "Bob@Example.com", "Dinner", "Meet at 5PM"
+        )
+
+    @patch('modules.send_email.get_outbox')
+    def test_plan_action_is_sent(self, mock_get_outbox):
+        import task_router
+        from ai_brain import Action
+
+        task_router.route_task(Action("send email", "bob@example.com saying hi").to_command())
+        mock_get_outbox.return_value.enqueue.assert_called_once_with(
+            "bob@example.com", send_email.DEFAULT_SUBJECT, "hi"
+        )
+
+    def test_handle_needs_address_and_body(self):
+        self.assertIn("Who should I email", send_email.handle("send email"))
+        self.assertEqual(send_email.handle("send email to bob@example.com"), "What should the email to bob@example.com say?")
+
+
+if __name__ == '__main__':
+    unittest.main()
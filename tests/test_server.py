@@ -0,0 +1,238 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import base64
+import http.client
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+with patch.dict(os.environ, {"GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "test-key")}):
+    import server
+
+import interaction
+from ai_brain import Action, Plan
+
+
+class ServerThread:
+    """
+    Runs an AssistantServer on its own event loop in a background thread.
+    """
+
+    def __init__(self, **kwargs):
+        self.loop = asyncio.new_event_loop()
+        self.server = server.AssistantServer(port=0, **kwargs)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+    def request(self, method, path, payload=None, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+        body = json.dumps(payload) if payload is not None else None
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json", **(headers or {})})
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        conn.close()
+        return response.status, data
+
+
+class WebSocketClient:
+    def __init__(self, port):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall(
+            (
+                "GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+            ).encode()
+        )
+        self.buffer = b""
+        while b"\r\n\r\n" not in self.buffer:
+            self.buffer += self.sock.recv(4096)
+        head, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        assert head.startswith(b"HTTP/1.1 101")
+
+    def send(self, message):
+        payload = json.dumps(message).encode()
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        header = bytes([0x81])
+        if len(payload) < 126:
+            header += bytes([0x80 | len(payload)])
+        else:
+            header += bytes([0x80 | 126]) + struct.pack("!H", len(payload))
+        self.sock.sendall(header + mask + masked)
+
+    def _read(self, n):
+        while len(self.buffer) < n:
+            self.buffer += self.sock.recv(4096)
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def receive(self):
+        first, second = self._read(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", self._read(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", self._read(8))
+        return json.loads(self._read(length))
+
+    def close(self):
+        self.sock.close()
+
+
+class TestAssistantServer(unittest.TestCase):
+
+    def test_health_and_metrics(self):
+        with ServerThread(workers=2) as running:
+            status, data = running.request("GET", "/health")
+            self.assertEqual(status, 200)
+            self.assertEqual(data["status"], "ok")
+            self.assertEqual(data["workers"], 2)
+
+            status, data = running.request("GET", "/metrics")
+            self.assertEqual(status, 200)
+            self.assertIn("counters", data)
+
+    @patch('task_router.route_task', side_effect=lambda action, session_id=None: f"did {action} for {session_id}")
+    @patch('server.prompt_to_plan', side_effect=lambda prompt: Plan([Action("chat", prompt)], prompt))
+    def test_ask_over_http(self, mock_prompt, mock_route):
+        with ServerThread() as running:
+            status, data = running.request("POST", "/ask", {"prompt": "hello", "session_id": "s1"})
+        self.assertEqual(status, 200)
+        self.assertEqual(data["action"], "chat hello")
+        self.assertEqual(data["result"], "did chat hello for s1")
+
+    @patch('server.prompt_to_plan', return_value=Plan([Action("install", "vlc")]))
+    def test_rejects_browser_pages(self, mock_prompt):
+        with ServerThread(allowed_origins=["http://localhost:3000"]) as running:
+            status, _ = running.request("POST", "/ask", {"prompt": "install vlc", "confirm": True},
+                                        {"Origin": "https://evil.example"})
+            self.assertEqual(status, 403)
+            status, _ = running.request("POST", "/ask", {"prompt": "install vlc", "confirm": True},
+                                        {"Content-Type": "text/plain"})
+            self.assertEqual(status, 415)
+
+            sock = socket.create_connection(("127.0.0.1", running.server.port), timeout=5)
+            sock.sendall(
+                (
+                    "GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                    "Origin: https://evil.example\r\nSec-WebSocket-Key: abc\r\nSec-WebSocket-Version: 13\r\n\r\n"
+                ).encode()
+            )
+            self.assertTrue(sock.recv(4096).startswith(b"HTTP/1.1 403"))
+            sock.close()
+
+            with patch('task_router.route_task', return_value="ok"):
+                status, _ = running.request("POST", "/ask", {"prompt": "install vlc"},
+                                            {"Origin": "http://localhost:3000"})
+            self.assertEqual(status, 200)
+        mock_prompt.assert_called_once()
+
+    def test_token_is_required_when_set(self):
+        with ServerThread(token="secret") as running:
+            status, _ = running.request("POST", "/ask", {"prompt": "hi"})
+            self.assertEqual(status, 401)
+            status, _ = running.request("GET", "/metrics", headers={"Authorization": "Bearer wrong"})
+            self.assertEqual(status, 401)
+            status, _ = running.request("GET", "/metrics", headers={"Authorization": "Bearer secret"})
+            self.assertEqual(status, 200)
+            status, _ = running.request("GET", "/health")
+            self.assertEqual(status, 200)
+
+    def test_ask_requires_prompt(self):
+        with ServerThread() as running:
+            status, data = running.request("POST", "/ask", {})
+        self.assertEqual(status, 400)
+
+    def test_rejects_invalid_content_length(self):
+        with ServerThread() as running:
+            for length in ["abc", "-1"]:
+                sock = socket.create_connection(("127.0.0.1", running.server.port), timeout=5)
+                sock.sendall(
+                    (
+                        "POST /ask HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {length}\r\n\r\n{{}}"
+                    ).encode()
+                )
+                self.assertTrue(sock.recv(4096).startswith(b"HTTP/1.1 400"), length)
+                sock.close()
+
+    @patch('task_router.route_task', side_effect=lambda action, session_id=None: str(interaction.confirm("Install?")))
+    @patch('server.prompt_to_plan', return_value=Plan([Action("install", "vlc")]))
+    def test_http_uses_preset_confirmation(self, mock_prompt, mock_route):
+        with ServerThread() as running:
+            _, declined = running.request("POST", "/ask", {"prompt": "install vlc"})
+            _, accepted = running.request("POST", "/ask", {"prompt": "install vlc", "confirm": True})
+        self.assertEqual(declined["result"], "False")
+        self.assertEqual(accepted["result"], "True")
+
+    @patch('server.prompt_to_plan', return_value=Plan([Action("chat", "slow")]))
+    def test_rejects_when_queue_is_full(self, mock_prompt):
+        release = threading.Event()
+
+        def slow_route(action, session_id=None):
+            release.wait(5)
+            return "done"
+
+        with patch('task_router.route_task', side_effect=slow_route):
+            with ServerThread(workers=1, max_pending=0) as running:
+                results = []
+                first = threading.Thread(
+                    target=lambda: results.append(running.request("POST", "/ask", {"prompt": "slow"}))
+                )
+                first.start()
+                while running.server._active == 0:
+                    time.sleep(0.01)
+                status, data = running.request("POST", "/ask", {"prompt": "slow"})
+                release.set()
+                first.join(5)
+
+        self.assertEqual(status, 503)
+        self.assertEqual(results[0][0], 200)
+
+    @patch('server.prompt_to_plan', return_value=Plan([Action("install", "vlc")]))
+    def test_websocket_streams_and_confirms(self, mock_prompt):
+        def route(action, session_id=None):
+            interaction.emit("Install")
+            interaction.emit("ing...")
+            return "installed" if interaction.confirm("Install vlc?") else "cancelled"
+
+        with patch('task_router.route_task', side_effect=route):
+            with ServerThread() as running:
+                client = WebSocketClient(running.server.port)
+                client.send({"type": "ask", "id": "1", "prompt": "install vlc"})
+
+                self.assertEqual(client.receive(), {"type": "chunk", "id": "1", "text": "Install"})
+                self.assertEqual(client.receive()["text"], "ing...")
+                confirm = client.receive()
+                self.assertEqual(confirm["type"], "confirm")
+                self.assertEqual(confirm["question"], "Install vlc?")
+
+                client.send({"type": "confirm_reply", "confirm_id": confirm["confirm_id"], "answer": True})
+                result = client.receive()
+                client.close()
+
+        self.assertEqual(result["type"], "result")
+        self.assertEqual(result["result"], "installed")
+        self.assertTrue(result["session_id"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cancellation
+import metrics
+import singleflight
+from llm_resilience import ResilientLLM
+
+
+def _run_together(count, fn):
+    """
+    Start `count` threads calling fn() and return their results in order.
+    """
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class TestGroup(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_result(self):
+        group = singleflight.Group()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return "answer"
+
+        threading.Timer(0.2, release.set).start()
+        results = _run_together(5, lambda: group.do("key", slow))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r[0] for r in results], ["answer"] * 5)
+        self.assertEqual(sum(shared for _, shared in results), 4)
+        self.assertEqual(group.in_flight(), 0)
+
+    def test_errors_are_shared_and_not_cached(self):
+        group = singleflight.Group()
+        with self.assertRaises(ValueError):
+            group.do("key", lambda: int("x"))
+        self.assertEqual(group.do("key", lambda: 1), (1, False))
+
+    def test_sequential_calls_are_not_coalesced(self):
+        group = singleflight.Group()
+        self.assertEqual(group.do("key", lambda: 1), (1, False))
+        self.assertEqual(group.do("key", lambda: 2), (2, False))
+
+    def test_waiter_retries_when_leader_is_cancelled(self):
+        group = singleflight.Group()
+        started = threading.Event()
+        token = cancellation.CancellationToken()
+
+        def leader_fn():
+            started.set()
+            token.wait(5)
+            raise cancellation.Cancelled("leader's deadline")
+
+        def lead():
+            with cancellation.use(token):
+                return group.do("key", leader_fn)
+
+        leader = threading.Thread(target=lambda: self.assertRaises(cancellation.Cancelled, lead))
+        leader.start()
+        started.wait(5)
+        threading.Timer(0.1, token.cancel).start()
+        self.assertEqual(group.do("key", lambda: "mine"), ("mine", False))
+        leader.join(5)
+
+
+class TestStreamFanOut(unittest.TestCase):
+
+    def test_every_subscriber_gets_every_chunk(self):
+        group = singleflight.Group()
+        pulled = []
+        gate = threading.Event()
+
+        def stream():
+            for word in ["a", "b", "c"]:
+                gate.wait(5)
+                pulled.append(word)
+                yield word
+
+        threading.Timer(0.2, gate.set).start()
+        results = _run_together(4, lambda: list(group.do("key", stream, stream=True)[0]))
+        self.assertEqual(results, [["a", "b", "c"]] * 4)
+        self.assertEqual(pulled, ["a", "b", "c"])
+        self.assertEqual(group.in_flight(), 0)
+
+    def test_late_subscriber_replays_missed_chunks(self):
+        broadcast = singleflight.Broadcast(iter(["a", "b", "c"]))
+        first = broadcast.subscribe()
+        self.assertEqual(next(first), "a")
+        late = broadcast.subscribe()
+        self.assertEqual(list(late), ["a", "b", "c"])
+        self.assertEqual(list(first), ["b", "c"])
+
+    def test_source_closed_only_when_everyone_leaves(self):
+        source = MagicMock()
+        source.__iter__.return_value = iter(["a", "b"])
+        broadcast = singleflight.Broadcast(source)
+        first, second = broadcast.subscribe(), broadcast.subscribe()
+        first.close()
+        source.close.assert_not_called()
+        self.assertEqual(list(second), ["a", "b"])
+        source.close.assert_not_called()
+
+        source = MagicMock()
+        source.__iter__.return_value = iter(["a", "b"])
+        broadcast = singleflight.Broadcast(source)
+        only = broadcast.subscribe()
+        next(only)
+        only.close()
+        source.close.assert_called_once()
+        self.assertIsNone(broadcast.subscribe())
+
+    def test_stream_errors_reach_every_subscriber(self):
+        def stream():
+            yield "a"
+            raise ConnectionError("dropped")
+
+        broadcast = singleflight.Broadcast(stream())
+        first, second = broadcast.subscribe(), broadcast.subscribe()
+        self.assertEqual(next(first), "a")
+        with self.assertRaises(ConnectionError):
+            next(first)
+        self.assertEqual(next(second), "a")
+        with self.assertRaises(ConnectionError):
+            next(second)
+
+
+class TestResilientLLMCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.client = MagicMock()
+
+    def test_identical_requests_make_one_call(self):
+        def create(**kwargs):
+            time.sleep(0.2)
+            return "ok"
+
+        self.client.chat.completions.create.side_effect = create
+        llm = ResilientLLM(self.client, name="t")
+        messages = [{"role": "user", "content": "hi"}]
+        results = _run_together(3, lambda: llm.create(model="m", messages=messages))
+        self.assertEqual(results, ["ok"] * 3)
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        self.assertEqual(metrics.count("t.coalesced"), 2)
+
+    def test_different_parameters_are_separate_calls(self):
+        def create(**kwargs):
+            time.sleep(0.1)
+            return kwargs["temperature"]
+
+        self.client.chat.completions.create.side_effect = create
+        llm = ResilientLLM(self.client, name="t")
+        temperatures = iter([0.1, 0.2])
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                temperature = next(temperatures)
+            return llm.create(model="m", messages=[], temperature=temperature)
+
+        self.assertEqual(sorted(_run_together(2, call)), [0.1, 0.2])
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+    def test_streams_are_fanned_out(self):
+        def create(**kwargs):
+            time.sleep(0.2)
+            return iter(["Hel", "lo"])
+
+        self.client.chat.completions.create.side_effect = create
+        llm = ResilientLLM(self.client, name="t")
+        results = _run_together(3, lambda: "".join(llm.create(model="m", messages=[], stream=True)))
+        self.assertEqual(results, ["Hello"] * 3)
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+
+    def test_can_be_disabled(self):
+        def create(**kwargs):
+            time.sleep(0.1)
+            return "ok"
+
+        self.client.chat.completions.create.side_effect = create
+        llm = ResilientLLM(self.client, name="t", coalesce=False)
+        _run_together(2, lambda: llm.create(model="m", messages=[]))
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
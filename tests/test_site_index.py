@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import timeit
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import open_web
+from modules.site_index import SiteIndex
+
+
+class TestSiteIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "sites.json")
+        self.index = SiteIndex(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exact_builtin(self):
+        self.assertEqual(self.index.resolve("YouTube").url, "https://www.youtube.com")
+
+    def test_prefix(self):
+        self.assertEqual(self.index.resolve("youtu").name, "youtube")
+        self.assertEqual(self.index.resolve("goog").name, "google")
+        self.assertIsNone(self.index.resolve("yo"))
+
+    def test_short_or_ambiguous_prefix_is_not_completed(self):
+        for text in ["python", "git", "chat", "twit"]:
+            self.assertIsNone(self.index.resolve(text), text)
+
+    def test_visited_site_completes_from_any_prefix(self):
+        self.index.record_visit("github")
+        self.assertEqual(self.index.resolve("git").name, "github")
+
+    def test_fuzzy(self):
+        self.assertEqual(self.index.resolve("wikipdia").name, "wikipedia")
+        self.assertIsNone(self.index.resolve("python tutorials"))
+
+    def test_exact_beats_popular_prefix(self):
+        for _ in range(20):
+            self.index.record_visit("google maps")
+        self.assertEqual(self.index.resolve("google").name, "google")
+
+    def test_visits_reorder_prefix_matches(self):
+        self.assertEqual(self.index.resolve("goog").name, "google")
+        for _ in range(3):
+            self.index.record_visit("google maps")
+        self.assertEqual(self.index.resolve("goog").name, "google maps")
+
+    def test_bookmarks_and_history_persist(self):
+        self.index.add("team wiki", "https://wiki.example.com")
+        self.index.record_url("https://www.example.org/page")
+        reloaded = SiteIndex(self.path)
+        self.assertEqual(reloaded.resolve("team wiki").url, "https://wiki.example.com")
+        self.assertEqual(reloaded.resolve("example.org").url, "https://www.example.org/page")
+
+    def test_lookup_is_fast_with_many_entries(self):
+        index = SiteIndex(path=None)
+        for i in range(20000):
+            index.add(f"site{i:05d}", f"https://site{i}.example.com")
+        per_call = timeit.timeit(lambda: index.resolve("site12345"), number=200) / 200
+        self.assertLess(per_call, 0.001)
+        per_call = timeit.timeit(lambda: index.resolve("site1234"), number=200) / 200
+        self.assertLess(per_call, 0.001)
+
+    def test_fuzzy_miss_is_fast_with_many_hosts(self):
+        index = SiteIndex(path=None)
+        for i in range(50000):
+            index.record_url(f"https://www.host{i:05d}x.com/")
+        self.assertEqual(index.resolve("host12345y.com").name, "host12345x.com")
+        per_call = timeit.timeit(lambda: index.resolve("qzxvwplk.com"), number=50) / 50
+        self.assertLess(per_call, 0.005)
+
+
+class TestOpenWeb(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_patcher = patch.object(open_web, "site_index", SiteIndex(os.path.join(self.tmp_dir.name, "sites.json")))
+        self.index_patcher.start()
+
+    def tearDown(self):
+        self.index_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    @patch('webbrowser.open')
+    def test_open_known_site_directly(self, mock_open):
+        self.assertEqual(open_web.handle("open youtube"), "Opened https://www.youtube.com")
+        mock_open.assert_called_once_with("https://www.youtube.com")
+
+    @patch('webbrowser.open')
+    def test_unknown_site_is_searched(self, mock_open):
+        self.assertEqual(open_web.handle("open python tutorials"), "Searched Google for 'python tutorials'")
+        self.assertEqual(open_web.handle("open python"), "Searched Google for 'python'")
+
+    @patch('webbrowser.open')
+    def test_opened_url_is_learned(self, mock_open):
+        open_web.handle("open https://news.example.com")
+        self.assertEqual(open_web.handle("open news.example"), "Opened https://news.example.com")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import soak
+from modules import knowledge_base, llm_chat
+
+
+class TestSoak(unittest.TestCase):
+
+    def test_short_run_stays_bounded(self):
+        memory_file = knowledge_base.MEMORY_FILE
+        lines = []
+        report = soak.run_soak(requests=280, sample_every=40, max_slope_kb=10000, log=lines.append)
+
+        self.assertTrue(report.passed)
+        self.assertEqual([s.requests for s in report.samples], list(range(40, 281, 40)))
+        self.assertEqual(len(lines), 7)
+        last = report.samples[-1].sizes
+        self.assertLessEqual(last["chat_history"], llm_chat.MAX_HISTORY_MESSAGES + 1)
+        self.assertGreater(last["memory_json_kb"], 0)
+        # Stand-ins are removed again afterwards
+        self.assertEqual(knowledge_base.MEMORY_FILE, memory_file)
+
+    def test_fails_when_slope_exceeds_limit(self):
+        report = soak.run_soak(requests=70, sample_every=10, max_slope_kb=-1e9, log=lambda line: None)
+        self.assertFalse(report.passed)
+
+    def test_fit_slope(self):
+        self.assertAlmostEqual(soak.fit_slope([1, 2, 3, 4], [10, 12, 14, 16]), 2.0)
+        self.assertEqual(soak.fit_slope([1], [5]), 0.0)
+        self.assertEqual(soak.fit_slope([2, 2], [1, 3]), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
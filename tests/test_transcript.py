@@ -0,0 +1,111 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from transcript import Transcript, UpdateBuffer, format_message
+
+
+class TestTranscript(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "transcript.jsonl")
+        self.transcript = Transcript(self.path, scrollback=3, clock=lambda: 0.0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _add(self, count):
+        for i in range(count):
+            self.transcript.append("user", f"message {i}")
+            self.transcript.trim()
+
+    def test_keeps_only_scrollback_in_memory(self):
+        self._add(10)
+        self.assertEqual(len(self.transcript), 3)
+        self.assertEqual(self.transcript.total, 10)
+        self.assertEqual(
+            [m["text"] for m in self.transcript.messages],
+            ["message 7", "message 8", "message 9"],
+        )
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 7)
+
+    def test_trim_returns_dropped_messages(self):
+        for i in range(5):
+            self.transcript.append("user", f"message {i}")
+        dropped = self.transcript.trim()
+        self.assertEqual([m["text"] for m in dropped], ["message 0", "message 1"])
+
+    def test_pages_older_messages_back_in(self):
+        self._add(10)
+        older = self.transcript.load_older(4)
+        self.assertEqual([m["text"] for m in older], ["message 3", "message 4", "message 5", "message 6"])
+        self.assertEqual(self.transcript.messages[0]["text"], "message 3")
+
+        older = self.transcript.load_older(4)
+        self.assertEqual([m["text"] for m in older], ["message 0", "message 1", "message 2"])
+        self.assertFalse(self.transcript.has_older)
+        self.assertEqual(self.transcript.load_older(4), [])
+
+    def test_reloaded_messages_are_not_archived_twice(self):
+        self._add(6)
+        self.transcript.load_older(3)
+        self.transcript.append("user", "message 6")
+        self.transcript.trim()
+        self.assertEqual(len(self.transcript), 3)
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+        self.transcript.load_older(10)
+        self.assertEqual([m["text"] for m in self.transcript.messages], [f"message {i}" for i in range(7)])
+
+    def test_streamed_answer(self):
+        self.transcript.append("assistant")
+        self.transcript.extend_last("Hello")
+        self.transcript.extend_last(" there.")
+        self.assertEqual(format_message(self.transcript.messages[-1]), "Jarvis: Hello there.\n\n")
+        self.transcript.replace_last("1. Done")
+        self.assertEqual(self.transcript.messages[-1]["text"], "1. Done")
+
+    def test_starts_with_a_fresh_archive(self):
+        self._add(5)
+        transcript = Transcript(self.path, scrollback=3)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(transcript.has_older)
+
+
+class TestUpdateBuffer(unittest.TestCase):
+
+    def test_coalesces_consecutive_chunks(self):
+        buffer = UpdateBuffer()
+        for token in ["Hel", "lo", " world"]:
+            buffer.chunk(token)
+        buffer.put("done", "Hello world")
+        buffer.chunk("late")
+        self.assertEqual(
+            buffer.drain(),
+            [("chunk", "Hello world"), ("done", "Hello world"), ("chunk", "late")],
+        )
+        self.assertEqual(buffer.drain(), [])
+
+    def test_chunks_from_many_threads(self):
+        buffer = UpdateBuffer()
+        threads = [
+            threading.Thread(target=lambda: [buffer.chunk("x") for _ in range(1000)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(buffer.drain(), [("chunk", "x" * 4000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
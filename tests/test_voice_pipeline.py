@@ -0,0 +1,216 @@
+import unittest
+import sys
+import os
+import queue
+import threading
+import time
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cancellation
+import interaction
+import metrics
+from voice_pipeline import SentenceSplitter, VoicePipeline
+
+
+class FakeMicrophone:
+    def __init__(self):
+        self.utterances = queue.Queue()
+
+    def say(self, text):
+        self.utterances.put(text)
+
+    def listen(self):
+        try:
+            return self.utterances.get(timeout=0.05)
+        except queue.Empty:
+            return ""
+
+
+class FakeSpeaker:
+    def __init__(self, seconds_per_sentence=0.0):
+        self.spoken = []
+        self.stops = 0
+        self.seconds = seconds_per_sentence
+        self.interrupted = threading.Event()
+
+    def speak(self, text):
+        self.spoken.append(text)
+        self.interrupted.clear()
+        self.interrupted.wait(self.seconds)
+
+    def stop(self):
+        self.stops += 1
+        self.interrupted.set()
+
+
+def wait_for(condition, timeout=3):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestSentenceSplitter(unittest.TestCase):
+
+    def test_splits_streamed_text(self):
+        splitter = SentenceSplitter()
+        self.assertEqual(splitter.feed("Hello the"), [])
+        self.assertEqual(splitter.feed("re! How are"), ["Hello there!"])
+        self.assertEqual(splitter.feed(" you? I am"), ["How are you?"])
+        self.assertEqual(splitter.flush(), ["I am"])
+
+
+class TestVoicePipeline(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.mic = FakeMicrophone()
+
+    def test_first_sentence_is_spoken_before_answer_completes(self):
+        speaker = FakeSpeaker()
+        release = threading.Event()
+
+        def think(text):
+            interaction.emit("Paris is the capital. ")
+            release.wait(3)
+            interaction.emit("It is in France.")
+            return "Paris is the capital. It is in France."
+
+        pipeline = VoicePipeline(self.mic.listen, think, speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("capital of france")
+
+        self.assertTrue(wait_for(lambda: speaker.spoken == ["Paris is the capital."]))
+        release.set()
+        self.assertTrue(wait_for(lambda: len(speaker.spoken) == 2))
+        pipeline.stop()
+
+        self.assertEqual(speaker.spoken, ["Paris is the capital.", "It is in France."])
+        latency = metrics.snapshot()["latency"]
+        for stage in ["voice.listen", "voice.think", "voice.first_sentence", "voice.first_audio", "voice.speak"]:
+            self.assertIn(stage, latency)
+
+    def test_non_streamed_result_is_spoken(self):
+        speaker = FakeSpeaker()
+        pipeline = VoicePipeline(self.mic.listen, lambda text: "Done. Installed vlc.", speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("install vlc")
+        self.assertTrue(wait_for(lambda: len(speaker.spoken) == 2))
+        pipeline.stop()
+        self.assertEqual(speaker.spoken, ["Done.", "Installed vlc."])
+
+    def test_results_of_actions_that_did_not_stream_are_spoken(self):
+        speaker = FakeSpeaker()
+
+        def think(text):
+            interaction.emit("Why did the chicken cross the road? ")
+            interaction.emit("To get to the other side.")
+            return (
+                "1. Opened https://www.youtube.com\n"
+                "2. Why did the chicken cross the road? To get to the other side."
+            )
+
+        pipeline = VoicePipeline(self.mic.listen, think, speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("open youtube and tell a joke")
+        self.assertTrue(wait_for(lambda: len(speaker.spoken) == 3))
+        time.sleep(0.1)
+        pipeline.stop()
+        self.assertEqual(
+            speaker.spoken,
+            [
+                "Why did the chicken cross the road?",
+                "To get to the other side.",
+                "Opened https://www.youtube.com",
+            ],
+        )
+
+    def test_new_speech_barges_in(self):
+        speaker = FakeSpeaker(seconds_per_sentence=2)
+
+        def think(text):
+            if text == "tell me a story":
+                return "Once upon a time. There was a dragon. The end."
+            return "Stopped."
+
+        pipeline = VoicePipeline(self.mic.listen, think, speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("tell me a story")
+        self.assertTrue(wait_for(lambda: speaker.spoken == ["Once upon a time."]))
+
+        self.mic.say("stop")
+        self.assertTrue(wait_for(lambda: "Stopped." in speaker.spoken))
+        pipeline.stop()
+
+        self.assertGreaterEqual(speaker.stops, 1)
+        self.assertNotIn("There was a dragon.", speaker.spoken)
+        self.assertEqual(metrics.count("voice.barge_in"), 1)
+
+    def test_barge_in_cancels_thinking(self):
+        speaker = FakeSpeaker()
+        cancelled = threading.Event()
+
+        def think(text):
+            if text == "write a long essay":
+                if cancellation.current().wait(3):
+                    cancelled.set()
+                return "An essay."
+            return "Stopped."
+
+        pipeline = VoicePipeline(self.mic.listen, think, speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("write a long essay")
+        time.sleep(0.2)
+        self.mic.say("stop")
+        self.assertTrue(cancelled.wait(1))
+        self.assertTrue(wait_for(lambda: "Stopped." in speaker.spoken))
+        pipeline.stop()
+        self.assertNotIn("An essay.", speaker.spoken)
+
+    def test_confirmation_is_asked_out_loud(self):
+        speaker = FakeSpeaker()
+
+        def think(text):
+            return "Installed vlc." if interaction.confirm("Install vlc?") else "Cancelled."
+
+        pipeline = VoicePipeline(self.mic.listen, think, speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("install vlc")
+        self.assertTrue(wait_for(lambda: speaker.spoken == ["Install vlc?"]))
+        self.mic.say("Yes.")
+        self.assertTrue(wait_for(lambda: "Installed vlc." in speaker.spoken))
+        pipeline.stop()
+        self.assertEqual(speaker.spoken, ["Install vlc?", "Installed vlc."])
+
+    def test_exit_word_stops_pipeline(self):
+        speaker = FakeSpeaker()
+        pipeline = VoicePipeline(self.mic.listen, lambda text: "ok", speaker.speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("bye")
+        self.assertTrue(pipeline.wait(3))
+        self.assertEqual(speaker.spoken, ["Goodbye!"])
+
+    def test_goodbye_is_said_by_the_speaker_thread(self):
+        speaker = FakeSpeaker(seconds_per_sentence=0.2)
+        threads = []
+
+        def speak(text):
+            threads.append(threading.current_thread().name)
+            speaker.speak(text)
+
+        pipeline = VoicePipeline(self.mic.listen, lambda text: "A long answer.", speak, speaker.stop)
+        pipeline.start()
+        self.mic.say("hello")
+        self.assertTrue(wait_for(lambda: speaker.spoken == ["A long answer."]))
+        self.mic.say("exit")
+        self.assertTrue(pipeline.wait(3))
+        self.assertEqual(speaker.spoken, ["A long answer.", "Goodbye!"])
+        self.assertEqual(set(threads), {"voice-speak"})
+
+
+if __name__ == '__main__':
+    unittest.main()
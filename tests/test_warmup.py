@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import patch
+
+# Add the parent directory to the Python path to allow module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import metrics
+import warmup
+from modules import install_apps
+
+
+class TestWarmup(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_steps_run_concurrently_and_are_reported(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def step():
+            barrier.wait()  # only passes if both steps run at the same time
+            return "ready"
+
+        def broken():
+            raise RuntimeError("no network")
+
+        report = warmup.run([("a", step), ("b", step), ("c", broken)])
+        self.assertEqual([s.name for s in report.steps], ["a", "b", "c"])
+        self.assertEqual(report.steps[0].detail, "ready")
+        self.assertIsNone(report.steps[0].error)
+        self.assertEqual(report.steps[2].error, "no network")
+        summary = report.summary()
+        self.assertIn("a ", summary)
+        self.assertIn("c failed", summary)
+        self.assertEqual(metrics.registry.samples("warmup.a"), 1)
+
+    def test_default_steps(self):
+        self.assertEqual([name for name, _ in warmup.default_steps()], ["installer", "llm"])
+
+    @patch.dict(os.environ, {"SANE_WARMUP": "0"})
+    def test_can_be_disabled(self):
+        self.assertIsNone(warmup.start())
+
+
+class TestInstallerWarmup(unittest.TestCase):
+
+    def tearDown(self):
+        install_apps._package_manager_cache.clear()
+        install_apps._path_cache.clear()
+
+    @patch('platform.system', return_value='Linux')
+    @patch('shutil.which', side_effect=lambda x: '/usr/bin/apt-get' if x == 'apt-get' else None)
+    def test_warm_up_fills_caches(self, mock_which, mock_system):
+        detail = install_apps.warm_up()
+        self.assertTrue(detail.startswith("apt, 0/"))
+        mock_which.reset_mock()
+        mock_system.return_value = 'Windows'
+
+        # Answered from the caches: no new lookups, same package manager
+        self.assertEqual(install_apps._get_package_manager_commands()["name"], "apt")
+        self.assertIsNone(install_apps._which("git"))
+        mock_which.assert_not_called()
+
+        install_apps._forget_paths("git")
+        install_apps._which("git")
+        mock_which.assert_called_once_with("git")
+
+    def test_stale_cached_path_is_looked_up_again(self):
+        install_apps._path_cache["git"] = "/nonexistent/git"
+        with patch('shutil.which', return_value="/usr/bin/git") as mock_which:
+            self.assertEqual(install_apps._which("git"), "/usr/bin/git")
+            mock_which.assert_called_once()
+
+    @patch('shutil.which', return_value=None)
+    def test_without_warm_up_lookups_are_live(self, mock_which):
+        install_apps._which("git")
+        mock_which.assert_called_once_with("git")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+# transcript.py
+"""
+Conversation transcript for the GUI with a bounded scrollback.
+
+Only the newest `scrollback` messages are kept in memory (and in the text
+widget). Older messages are written to a JSON-lines archive and paged back
+in when the user scrolls to the top. Streamed tokens are collected by
+UpdateBuffer and applied to the widget once per frame instead of one
+insert per token.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+# ✅ Messages that scrolled out of the window, one JSON object per line
+ARCHIVE_FILE = str(Path.home() / ".sane_transcript.jsonl")
+SCROLLBACK = 500
+PAGE_SIZE = 50
+
+LABELS = {"user": "You", "assistant": "Jarvis"}
+
+
+def format_message(message):
+    """
+    Text shown in the widget for one message; always ends with a blank line.
+    """
+    label = LABELS.get(message["role"], message["role"])
+    return f"{label}: {message['text']}\n\n"
+
+
+class Transcript:
+    """
+    Messages are numbered 0..total-1. The archive always holds a prefix of
+    them, so message i lives on line i of the archive file.
+    """
+
+    def __init__(self, archive_path=ARCHIVE_FILE, scrollback=SCROLLBACK, clock=time.time):
+        self.archive_path = archive_path
+        self.scrollback = scrollback
+        self._clock = clock
+        self._messages = deque()  # loaded messages, oldest first
+        self._first = 0  # number of the oldest loaded message
+        self._offsets = []  # byte offset of each archived message
+        self._archive_size = 0
+        # Each run starts a fresh archive; chat_sessions keeps the real history
+        if archive_path and os.path.exists(archive_path):
+            os.remove(archive_path)
+
+    def __len__(self):
+        return len(self._messages)
+
+    @property
+    def total(self):
+        return self._first + len(self._messages)
+
+    @property
+    def has_older(self):
+        return self._first > 0
+
+    @property
+    def messages(self):
+        return list(self._messages)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.environ.get("SANE_TRANSCRIPT_FILE", ARCHIVE_FILE),
+            scrollback=int(os.environ.get("SANE_GUI_SCROLLBACK", SCROLLBACK)),
+        )
+
+    # --- Updates ---
+
+    def append(self, role, text=""):
+        message = {"role": role, "text": text, "time": self._clock()}
+        self._messages.append(message)
+        return message
+
+    def extend_last(self, text):
+        """
+        Add streamed text to the newest message.
+        """
+        self._messages[-1]["text"] += text
+
+    def replace_last(self, text):
+        self._messages[-1]["text"] = text
+
+    def trim(self):
+        """
+        Drop the oldest loaded messages beyond the scrollback, archiving any that
+        are not on disk yet. Returns the dropped messages, oldest first.
+        """
+        dropped = []
+        while len(self._messages) > self.scrollback:
+            message = self._messages.popleft()
+            if self._first == len(self._offsets):
+                self._archive(message)
+            self._first += 1
+            dropped.append(message)
+        return dropped
+
+    # --- Paging ---
+
+    def load_older(self, count=PAGE_SIZE):
+        """
+        Load up to `count` messages preceding the oldest loaded one from the
+        archive. Returns them oldest first (they are now loaded, too).
+        """
+        start = max(0, self._first - count)
+        if start == self._first:
+            return []
+        with open(self.archive_path, "r", encoding="utf-8") as f:
+            f.seek(self._offsets[start])
+            older = [json.loads(f.readline()) for _ in range(self._first - start)]
+        self._messages.extendleft(reversed(older))
+        self._first = start
+        return older
+
+    def _archive(self, message):
+        line = (json.dumps(message) + "\n").encode("utf-8")
+        with open(self.archive_path, "ab") as f:
+            f.write(line)
+        self._offsets.append(self._archive_size)
+        self._archive_size += len(line)
+
+
+class UpdateBuffer:
+    """
+    Thread-safe queue of transcript updates from worker threads. The GUI
+    drains it once per frame; consecutive streamed chunks come out as one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+
+    def chunk(self, text):
+        with self._lock:
+            if self._events and self._events[-1][0] == "chunk":
+                self._events[-1] = ("chunk", self._events[-1][1] + text)
+            else:
+                self._events.append(("chunk", text))
+
+    def put(self, kind, payload=None):
+        with self._lock:
+            self._events.append((kind, payload))
+
+    def drain(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
@@ -0,0 +1,341 @@
+# voice_pipeline.py
+"""
+Listen, think and speak as concurrent stages connected by bounded queues.
+
+- The listener keeps listening while the assistant thinks or talks. New speech
+  barges in: current speech is stopped and queued work for older utterances
+  is dropped.
+- The thinker streams partial output (see interaction.emit) and cuts it into
+  sentences, so the first sentence is spoken while the rest is still coming.
+- The speaker says one sentence at a time.
+- Thinking runs under a CancellationToken that a barge-in cancels, so an
+  answer nobody is waiting for stops instead of running to the end.
+  Confirmations are asked out loud and answered by the next utterance.
+"""
+import queue
+import re
+import threading
+import time
+
+import cancellation
+import interaction
+import metrics
+
+EXIT_WORDS = ["exit", "quit", "bye"]
+YES_WORDS = ["yes", "y", "yeah", "yep", "sure", "ok", "okay"]
+QUEUE_SIZE = 8
+# Seconds to wait for a spoken answer to a confirmation; silence means no
+CONFIRM_TIMEOUT = 30.0
+# Queued after the goodbye: the speaker stops the pipeline when it gets here
+_STOP = object()
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+# "1. " in front of each action's result when a plan had several actions
+_RESULT_NUMBER = re.compile(r"(?m)^\d+\.[ \t]*")
+
+
+class SentenceSplitter:
+    """
+    Collects streamed text and hands out complete sentences.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        parts = _SENTENCE_END.split(self._buffer)
+        self._buffer = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self):
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def unspoken(result, streamed):
+    """
+    The parts of a plan's result that were not already streamed: with
+    "open youtube and tell a joke" only the joke streams, but "Opened ..."
+    must still be said. Returns the remaining text.
+    """
+    result = str(result)
+    streamed = streamed.strip()
+    if not streamed:
+        return result
+    parts = _RESULT_NUMBER.split(result.replace(streamed, "", 1))
+    return "\n".join(part.strip() for part in parts if part.strip())
+
+
+def _default_think(text):
+    from ai_brain import prompt_to_plan
+    from task_router import execute_plan
+
+    return execute_plan(prompt_to_plan(text))
+
+
+class VoicePipeline:
+    """
+    Runs the listen / think / speak stages on their own threads.
+    All stage functions are injectable so the pipeline can run without audio.
+    """
+
+    def __init__(
+        self,
+        listen=None,
+        think=_default_think,
+        speak=None,
+        stop_speaking=None,
+        queue_size=QUEUE_SIZE,
+    ):
+        if listen is None:
+            from voice_input import listen
+        if speak is None or stop_speaking is None:
+            import speak as tts
+
+            speak = speak or tts.speak
+            stop_speaking = stop_speaking or tts.stop
+        self._listen = listen
+        self._think = think
+        self._speak = speak
+        self._stop_speaking = stop_speaking
+
+        self._utterances = queue.Queue(maxsize=queue_size)
+        self._sentences = queue.Queue(maxsize=queue_size)
+        self._generation = 0  # bumped on every new utterance (barge-in)
+        self._lock = threading.Lock()
+        self._speaking = False
+        self._thinking = None  # CancellationToken of the utterance being answered
+        self._pending_answer = None  # queue the next utterance goes to, if asked
+        self._asking = threading.Lock()  # one spoken question at a time
+        self._stopped = threading.Event()
+        self._threads = []
+
+    # --- Lifecycle ---
+
+    def start(self):
+        for name, target in [
+            ("voice-listen", self._listen_loop),
+            ("voice-think", self._think_loop),
+            ("voice-speak", self._speak_loop),
+        ]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        self._stop_speaking()
+
+    def wait(self, timeout=None):
+        return self._stopped.wait(timeout)
+
+    def run(self, greeting="Hello! I am your assistant. How can I help you today?"):
+        """
+        Start all stages and block until the user says goodbye.
+        """
+        self.start()
+        if greeting:
+            self._enqueue_sentence(self._generation, greeting)
+        try:
+            self.wait()
+        except KeyboardInterrupt:
+            self.stop()
+
+    # --- Stages ---
+
+    def _listen_loop(self):
+        while not self._stopped.is_set():
+            start = time.perf_counter()
+            text = self._listen()
+            if not text or not text.strip():
+                continue
+            metrics.observe("voice.listen", time.perf_counter() - start)
+
+            if text.strip().lower() in EXIT_WORDS:
+                # Said by the speaker thread like everything else (the TTS
+                # engine can't talk from two threads); it stops after that
+                generation = self._barge_in()
+                self._enqueue_sentence(generation, "Goodbye!")
+                self._enqueue_sentence(generation, _STOP)
+                return
+
+            # The answer to a spoken question is not a new request
+            with self._lock:
+                answer, self._pending_answer = self._pending_answer, None
+            if answer is not None:
+                answer.put(text)
+                continue
+
+            generation = self._barge_in()
+            self._put_latest(self._utterances, (generation, text, time.perf_counter()))
+
+    def _think_loop(self):
+        while not self._stopped.is_set():
+            try:
+                generation, text, heard_at = self._utterances.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if generation != self._generation:
+                continue
+
+            splitter = SentenceSplitter()
+            state = {"streamed": "", "first": True}
+
+            def deliver(sentences):
+                for sentence in sentences:
+                    first = state["first"]
+                    if first:
+                        state["first"] = False
+                        metrics.observe("voice.first_sentence", time.perf_counter() - heard_at)
+                    self._enqueue_sentence(generation, sentence, heard_at if first else None)
+
+            def on_chunk(chunk):
+                if generation != self._generation:
+                    return  # superseded by newer speech
+                state["streamed"] += chunk
+                deliver(splitter.feed(chunk))
+
+            def confirm(question):
+                return self._ask(generation, question)
+
+            token = cancellation.CancellationToken()
+            with self._lock:
+                self._thinking = token
+                if generation != self._generation:
+                    token.cancel("interrupted")
+
+            start = time.perf_counter()
+            try:
+                with cancellation.use(token), interaction.use_emitter(on_chunk), interaction.use_confirmer(confirm):
+                    result = self._think(text)
+            except cancellation.Cancelled:
+                metrics.incr("voice.cancelled")
+                continue
+            except Exception as e:
+                print(f"[ERROR] {e}")
+                result = "Sorry, something went wrong."
+            finally:
+                with self._lock:
+                    if self._thinking is token:
+                        self._thinking = None
+            metrics.observe("voice.think", time.perf_counter() - start)
+
+            if generation != self._generation:
+                metrics.incr("voice.cancelled")
+                continue
+            # Results of actions that didn't stream (e.g. "Opened ...") follow
+            # what was streamed
+            deliver(splitter.flush())
+            deliver(splitter.feed(unspoken(result, state["streamed"])) + splitter.flush())
+
+    def _speak_loop(self):
+        while not self._stopped.is_set():
+            try:
+                generation, sentence, heard_at = self._sentences.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                # Checked under the lock so a barge-in cannot slip in between
+                if generation != self._generation:
+                    continue
+                self._speaking = sentence is not _STOP
+            if sentence is _STOP:
+                self.stop()
+                return
+            if heard_at is not None:
+                metrics.observe("voice.first_audio", time.perf_counter() - heard_at)
+
+            start = time.perf_counter()
+            try:
+                self._speak(sentence)
+            finally:
+                with self._lock:
+                    self._speaking = False
+            metrics.observe("voice.speak", time.perf_counter() - start)
+
+    # --- Helpers ---
+
+    def _barge_in(self):
+        """
+        Invalidate all queued and in-flight work and stop talking.
+        Returns the new generation number.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            speaking = self._speaking
+            thinking, self._thinking = self._thinking, None
+            self._pending_answer = None
+        if thinking is not None:
+            thinking.cancel("interrupted")
+        _drain(self._utterances)
+        _drain(self._sentences)
+        if speaking:
+            metrics.incr("voice.barge_in")
+            self._stop_speaking()
+        return generation
+
+    def _ask(self, generation, question):
+        """
+        Confirmer used while thinking: say `question` and take the next
+        utterance as the answer. No answer within CONFIRM_TIMEOUT means no.
+        """
+        with self._asking:
+            answer = queue.Queue(maxsize=1)
+            with self._lock:
+                self._pending_answer = answer
+            try:
+                self._enqueue_sentence(generation, question)
+                deadline = time.monotonic() + CONFIRM_TIMEOUT
+                while True:
+                    try:
+                        reply = answer.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        cancellation.check()  # talked over, or out of time
+                        if time.monotonic() >= deadline:
+                            print(f"[LOG] No answer to '{question}'; taking it as no.")
+                            return False
+            finally:
+                with self._lock:
+                    if self._pending_answer is answer:
+                        self._pending_answer = None
+        return reply.strip().lower().strip(".!") in YES_WORDS
+
+    def _enqueue_sentence(self, generation, sentence, heard_at=None):
+        # Only the first sentence of an answer carries the time it was heard
+        item = (generation, sentence, heard_at)
+        while not self._stopped.is_set() and generation == self._generation:
+            try:
+                self._sentences.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    @staticmethod
+    def _put_latest(q, item):
+        """
+        Put without blocking; if the queue is full drop the oldest entry.
+        """
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+def _drain(q):
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+
+if __name__ == "__main__":
+    VoicePipeline().run()
@@ -0,0 +1,120 @@
+# warmup.py
+"""
+Background warm-up at startup.
+
+The first request after launch used to pay for everything being cold: package
+manager detection, PATH lookups and the HTTPS connection to the LLM provider.
+`start()` does that work on a small thread pool in the background, so the
+first prompt isn't delayed by it and usually doesn't have to do it either.
+Set SANE_WARMUP=0 to turn it off.
+
+The text-to-speech engine is not warmed here: the SAPI5 and NSSpeechSynthesizer
+drivers only work on the thread that created them, so speak.py creates it on
+the thread that speaks (the greeting does that at startup).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import metrics
+
+WARMUP_WORKERS = 4
+
+
+@dataclass
+class StepResult:
+    name: str
+    seconds: float
+    detail: str = ""
+    error: str = None
+
+    def describe(self):
+        if self.error:
+            return f"{self.name} failed after {self.seconds:.2f}s ({self.error})"
+        detail = f" ({self.detail})" if self.detail else ""
+        return f"{self.name} {self.seconds:.2f}s{detail}"
+
+
+@dataclass
+class WarmupReport:
+    steps: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    def summary(self):
+        steps = "; ".join(step.describe() for step in self.steps)
+        return f"Warm-up finished in {self.seconds:.2f}s: {steps}"
+
+
+def _warm_installer():
+    from modules import install_apps
+
+    return install_apps.warm_up()
+
+
+def _warm_llm():
+    """
+    Open the HTTPS connection of every Groq client with a cheap request, so
+    the first real call skips DNS and the TLS handshake.
+    """
+    import ai_brain
+    from modules import install_apps, llm_chat
+
+    clients = []
+    for client in (ai_brain.client, llm_chat.client, install_apps.client):
+        if client is not None and all(client is not seen for seen in clients):
+            clients.append(client)
+    with ThreadPoolExecutor(max_workers=len(clients) or 1, thread_name_prefix="warmup-llm") as pool:
+        for future in [pool.submit(client.models.list) for client in clients]:
+            future.result()
+    return f"{len(clients)} connections"
+
+
+def default_steps():
+    """
+    The warm-up steps as (name, function) pairs.
+    """
+    return [("installer", _warm_installer), ("llm", _warm_llm)]
+
+
+def _run_step(name, fn):
+    start = time.perf_counter()
+    try:
+        detail = fn() or ""
+        error = None
+    except Exception as e:
+        detail, error = "", str(e) or type(e).__name__
+    seconds = time.perf_counter() - start
+    metrics.observe(f"warmup.{name}", seconds)
+    return StepResult(name, seconds, detail, error)
+
+
+def run(steps=None, max_workers=WARMUP_WORKERS):
+    """
+    Run the warm-up steps concurrently and return a WarmupReport. A failing
+    step is reported, never raised: everything it would have prepared is
+    simply done on first use instead.
+    """
+    steps = default_steps() if steps is None else steps
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(steps))), thread_name_prefix="warmup") as pool:
+        futures = [pool.submit(_run_step, name, fn) for name, fn in steps]
+        results = [future.result() for future in futures]
+    return WarmupReport(results, time.perf_counter() - start)
+
+
+def start():
+    """
+    Warm up in a background thread and print the report when done.
+    Returns the thread, or None if SANE_WARMUP=0.
+    """
+    if os.environ.get("SANE_WARMUP", "1") == "0":
+        return None
+
+    def warm():
+        print(f"[LOG] {run().summary()}")
+
+    thread = threading.Thread(target=warm, name="warmup", daemon=True)
+    thread.start()
+    return thread